@@ -0,0 +1,4 @@
+"""Benchmarks for the game engine.
+
+Run one with `python -m benchmarks.<name>` from the project root.
+"""
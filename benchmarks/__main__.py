@@ -0,0 +1,121 @@
+"""Run the benchmark suite, and compare it against the saved baselines.
+
+    python -m benchmarks run [name prefix ...] [--save]
+    python -m benchmarks compare [name prefix ...] [--threshold 0.25]
+
+Each benchmark is timed over several rounds, and its result is the median round along with how far the rounds
+strayed from it. `run --save` records both as the new baselines in benchmarks/baselines.json. `compare` runs the
+suite and exits non-zero if anything got slower than its baseline by more than the threshold, or by more than the
+baseline's and the new result's spreads together where the rounds varied more than that. A machine can also be
+slower for a whole run, so anything that looks slower is timed again, up to `--retries` times, and only counts as a
+regression if every attempt was.
+"""
+import argparse
+import json
+import os
+import sys
+from typing import List
+
+from benchmarks.suite import Measurement, run, format_ns
+
+
+BASELINES = os.path.join(os.path.dirname(__file__), 'baselines.json')
+
+
+def load_baselines() -> dict:
+    if not os.path.exists(BASELINES):
+        return {}
+    with open(BASELINES) as f:
+        baselines = json.load(f)
+    # baselines saved before spreads were recorded are just the nanoseconds
+    return {name: Measurement(b, 0.0) if isinstance(b, (int, float)) else Measurement(b['ns'], b['spread'])
+            for name, b in baselines.items()}
+
+
+def save_baselines(results: dict) -> None:
+    baselines = load_baselines()
+    baselines.update(results)
+    with open(BASELINES, 'w') as f:
+        json.dump({name: {'ns': round(b.ns, 1), 'spread': round(b.spread, 3)} for name, b in sorted(baselines.items())},
+                  f, indent=2)
+        f.write('\n')
+    print(f'Saved {len(results)} baselines to {BASELINES}')
+
+
+def allowed(result: Measurement, baseline: Measurement, threshold: float) -> float:
+    """How much slower than its baseline a result can be before it counts as a regression."""
+    return max(threshold, baseline.spread + result.spread)
+
+
+def regressed(results: dict, baselines: dict, threshold: float) -> List[str]:
+    """The benchmarks slower than their baselines by more than they're allowed."""
+    return [name for name, result in results.items()
+            if name in baselines and result.ns / baselines[name].ns - 1 > allowed(result, baselines[name], threshold)]
+
+
+def compare(results: dict, baselines: dict, threshold: float) -> int:
+    """ Print each result next to its baseline.
+
+    Args:
+        results: the measurement of each benchmark
+        baselines: the baseline measurement of each benchmark
+        threshold: how much slower counts as a regression, unless the measurements are noisier than that
+
+    Returns:
+        how many benchmarks regressed past what their noise allows
+    """
+    regressions = 0
+    print()
+    print(f'{"benchmark":<40} {"baseline":>12} {"now":>12} {"change":>8} {"allowed":>8}')
+    for name, result in results.items():
+        baseline = baselines.get(name)
+        if baseline is None:
+            print(f'{name:<40} {"-":>12} {format_ns(result.ns):>12} {"new":>8}')
+            continue
+        change = result.ns / baseline.ns - 1
+        limit = allowed(result, baseline, threshold)
+        flag = ''
+        if change > limit:
+            flag = '  REGRESSION'
+            regressions += 1
+        print(f'{name:<40} {format_ns(baseline.ns):>12} {format_ns(result.ns):>12} {change:>+8.0%} '
+              f'{limit:>8.0%}{flag}')
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='The game engine benchmark suite.')
+    parser.add_argument('command', choices=['run', 'compare'])
+    parser.add_argument('names', nargs='*', help='only run benchmarks whose names start with these')
+    parser.add_argument('--save', action='store_true', help='save the results as the new baselines')
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help='how much slower than the baseline counts as a regression (default: 0.25, i.e. 25%%)')
+    parser.add_argument('--seconds', type=float, default=0.2, help='roughly how long to time each round')
+    parser.add_argument('--repeat', type=int, default=7, help='how many rounds to time, the median one counts')
+    parser.add_argument('--retries', type=int, default=2,
+                        help='how many more times to time anything that looks slower, the fastest attempt counts')
+    args = parser.parse_args()
+
+    results = run(args.names, seconds=args.seconds, repeat=args.repeat)
+    if args.command == 'run':
+        if args.save:
+            save_baselines(results)
+        return 0
+
+    baselines = load_baselines()
+    for _ in range(args.retries):
+        suspects = regressed(results, baselines, args.threshold)
+        if not suspects:
+            break
+        print(f'\nTiming {len(suspects)} benchmark(s) again.')
+        again = run(suspects, seconds=args.seconds, repeat=args.repeat)
+        results.update({name: min(results[name], again[name]) for name in suspects})
+    regressions = compare(results, baselines, args.threshold)
+    if regressions:
+        print(f'\n{regressions} regression(s) beyond {args.threshold:.0%} or their spread.')
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,99 @@
+"""Bytes allocated per processed wilderness message, measured with tracemalloc.
+
+Plays messages through an engine on a quest and keeps every result alive, so the total is what the events
+themselves cost (the result, its children, and their fight contexts), plus the engine's own working allocations.
+
+With --sessions, measures instead what it costs to hold every quest in diablo2 open in that many sessions at once,
+with every enemy in every area spawned, before and after each is hit once.
+
+    python -m benchmarks.allocations [--messages 5000] [--sessions 0]
+"""
+import argparse
+import gc
+import random
+import tracemalloc
+from typing import Tuple
+
+import diablo2
+from game.events import HeroEvent, GameEventType
+from benchmarks.suite import reset_db, engine_on_quest
+
+
+def measure(messages: int) -> float:
+    """ Play messages and keep their results.
+
+    Returns:
+        the bytes still allocated per message
+    """
+    random.seed(0)
+    reset_db()
+    engine = engine_on_quest()
+    heroes = engine.heroes
+    incoming = [HeroEvent(GameEventType.SEARCH, hero=random.choice(heroes), message='hi') for _ in range(messages)]
+
+    def play():
+        results = []
+        for event in incoming:
+            if engine.current_quest is None:
+                engine.current_quest = engine.quests[0].clone()
+            results.append(engine.process_event(event))
+        return results
+
+    # warm up any caches first, so they aren't counted
+    play()
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    results = play()
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    assert len(results) == messages
+    return (after - before) / messages
+
+
+def measure_quests(sessions: int, hit: bool) -> Tuple[float, float]:
+    """ Open every quest in that many sessions and spawn all their enemies, maybe hitting each one.
+
+    Returns:
+        the bytes allocated per session, and per enemy
+    """
+    rng = random.Random(0)
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    opened = []
+    enemies = 0
+    for _ in range(sessions):
+        for quest in diablo2.quests:
+            quest = quest.clone()
+            spawned = [quest.area.boss]
+            while quest.area.has_enemies:
+                spawned.append(quest.area.next_enemy(rng))
+            if hit:
+                for enemy in spawned:
+                    enemy.wound(player='hero')
+            enemies += len(spawned)
+            opened.append((quest, spawned))
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return (after - before) / sessions, (after - before) / enemies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--messages', type=int, default=5000)
+    parser.add_argument('--sessions', type=int, default=0)
+    args = parser.parse_args()
+    if args.sessions:
+        for hit in (False, True):
+            per_session, per_enemy = measure_quests(args.sessions, hit)
+            label = 'hit' if hit else 'spawned'
+            print(f'{label}: {per_session:.0f} bytes per session, {per_enemy:.0f} bytes per enemy')
+    else:
+        print(f'{measure(args.messages):.0f} bytes per message')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""How long the game takes to start, each case timed in a fresh interpreter so nothing is already imported.
+
+    python -m benchmarks.coldstart [--runs 7] [--quests 500]
+
+The cases are importing diablo2, playing one message headless (see game/console.py), importing the Discord client,
+and defining a synthetic campaign of --quests quests, to keep an eye on how start up grows with the campaign.
+Each is timed from starting the interpreter to it exiting, and the median of --runs is reported, next to an empty
+interpreter for comparison.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+from benchmarks.suite import format_ns
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CAMPAIGN = '''
+from diablo2 import Beastiary as B
+from game.areas import AreaDefinition
+from game.quests import Quest
+quests = [Quest(f'Quest {i}', AreaDefinition(f'Area {i}', 30, {B.FALLEN: 5, B.ZOMBIE: 3, B.SKELETON: 2},
+                                             B.BOSS_ANDARIEL), xp=50)
+          for i in range(%d)]
+'''
+
+HEADLESS = '''
+import io, sys
+from game import console
+sys.stdin = io.StringIO('/quest start\\nhello\\n')
+console.main([])
+assert 'discord' not in sys.modules, 'the headless client imported discord'
+'''
+
+
+def cases(quests: int) -> Dict[str, str]:
+    return {
+        'python': 'pass',
+        'import diablo2': 'import diablo2',
+        'headless': HEADLESS,
+        'import discord client': 'import game.ext.discord_client',
+        f'campaign[{quests} quests]': CAMPAIGN % quests,
+    }
+
+
+def time_case(code: str, runs: int) -> List[float]:
+    """ Run some code in a fresh interpreter, a few times.
+
+    Returns:
+        how long each run took, in ns
+    """
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter_ns()
+        subprocess.run([sys.executable, '-c', code], cwd=ROOT, env=env, check=True,
+                       stdout=subprocess.DEVNULL)
+        times.append(time.perf_counter_ns() - start)
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=7)
+    parser.add_argument('--quests', type=int, default=500)
+    args = parser.parse_args()
+    for name, code in cases(args.quests).items():
+        # the first run compiles anything not yet cached, don't count it
+        times = time_case(code, args.runs + 1)[1:]
+        print(f'{name:<40} {format_ns(statistics.median(times)):>12}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+"""Hero writes per second under each database profile.
+
+Each write is one `hero.save()` in its own transaction, which is what the engine did per message before writes
+were batched, so it is the worst case for the commit path.
+
+    python -m benchmarks.db_profiles [--writes 2000] [--heroes 50]
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from game.database import db, configure_db, create_tables, DB_PROFILES, Hero
+
+
+def run(profile: str, writes: int, heroes: int, directory: str) -> float:
+    """ Time `writes` single-row saves against a fresh database.
+
+    Returns:
+        the writes per second
+    """
+    configure_db(path=os.path.join(directory, f'{profile}.db'), profile=profile)
+    db.connect()
+    try:
+        create_tables()
+        roster = [Hero.create(name=f'hero {i}', hp=20) for i in range(heroes)]
+        start = time.perf_counter()
+        for _ in range(writes):
+            hero = random.choice(roster)
+            hero.xp += 1
+            hero.save()
+        elapsed = time.perf_counter() - start
+    finally:
+        db.drop_tables([Hero])
+        db.close()
+    return writes / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--writes', type=int, default=2000)
+    parser.add_argument('--heroes', type=int, default=50)
+    parser.add_argument('--profile', action='append', choices=list(DB_PROFILES),
+                        help='profiles to run (default: all of them)')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        for profile in args.profile or DB_PROFILES:
+            rate = run(profile, args.writes, args.heroes, directory)
+            print(f'{profile:>10}: {rate:10.0f} writes/sec')
+
+
+if __name__ == '__main__':
+    main()
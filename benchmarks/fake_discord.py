@@ -0,0 +1,218 @@
+"""An offline stand-in for the parts of Discord the Discord client uses, with API latency and rate limits.
+
+`FakeDiscord` holds guilds made of `FakeTextChannel`s, `FakeRole`s and `FakeMember`s, and `FakeDiscordClient` plays
+in them without connecting. Every API call the client makes (`TextChannel.send`, `Message.add_reaction`) waits for
+the transport's latency, and for its rate limit if the call is over it, then is counted.
+
+Rate limits work like Discord's: each route (sending to a channel, reacting in a channel) allows so many calls per
+window. A call over the limit gets a 429 back, and waits out the rest of the window before it's retried, as
+discord.py does for the client. Rate limited calls are counted too, they're what a busy server costs.
+
+    discord = FakeDiscord(latency=0.05, send_limit=RateLimit(5, 5.0))
+    guild = discord.guild(DiscordClient.SERVER_NAME, heroes=1000)
+    client = FakeDiscordClient(discord, sessions=SessionManager(quests=diablo2.quests))
+    await client.start_offline()
+    await guild.members[0].say(client, guild.town, 'quest start')
+"""
+import asyncio
+import itertools
+import random
+import time
+from types import SimpleNamespace
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from game.ext.discord_client import DiscordClient
+
+
+# apart from the stubs' ids, so they can be used together
+_ids = itertools.count(1_000_000)
+
+
+class RateLimit(NamedTuple):
+    """So many calls per window of `per` seconds, for each route."""
+    calls: int
+    per: float
+
+    @classmethod
+    def parse(cls, spec: str) -> Optional['RateLimit']:
+        """ A limit written as calls/seconds, e.g. '5/5', or 'none' for no limit. """
+        if spec == 'none':
+            return None
+        calls, per = spec.split('/')
+        return cls(int(calls), float(per))
+
+
+class FakeDiscord(object):
+    """ The Discord API, as far as the client can tell.
+
+    Args:
+        latency: how long each API call takes, in seconds
+        jitter: how much each call's latency varies either way, as a fraction of it
+        send_limit: the rate limit for sending messages to a channel, None for none
+        reaction_limit: the rate limit for adding reactions in a channel, None for none
+    """
+    def __init__(self, latency: float = 0.05, jitter: float = 0.2,
+                 send_limit: Optional[RateLimit] = RateLimit(5, 5.0),
+                 reaction_limit: Optional[RateLimit] = RateLimit(1, 0.25)):
+        self.latency = latency
+        self.jitter = jitter
+        self.limits = {'send': send_limit, 'add_reaction': reaction_limit}
+        self.guilds: List['FakeGuild'] = []
+        self.user = FakeUser(next(_ids), DiscordClient.BOT_NAME)
+        self.calls: Dict[str, int] = {'send': 0, 'add_reaction': 0}
+        self.rate_limited = 0
+        # (reset time, calls made) for each route's current window
+        self._windows: Dict[Tuple[str, int], Tuple[float, int]] = {}
+
+    @property
+    def api_calls(self) -> int:
+        return sum(self.calls.values())
+
+    def guild(self, name: str, heroes: int = 0, others: int = 0) -> 'FakeGuild':
+        """ Add a guild set up for the game: a town, a wilderness and a Hero role.
+
+        Args:
+            name: the guild's name
+            heroes: how many members have the Hero role
+            others: how many members don't
+        """
+        guild = FakeGuild(next(_ids), name)
+        guild.town = guild.add_channel(DiscordClient.CHANNEL_TOWN_NAME, self)
+        guild.wilderness = guild.add_channel(DiscordClient.CHANNEL_WILDERNESS_NAME, self)
+        guild.hero_role = FakeRole(next(_ids), DiscordClient.ROLE_NAME)
+        guild.roles.append(guild.hero_role)
+        for i in range(heroes + others):
+            member = FakeMember(next(_ids), f'{name} member {i}', guild)
+            if i < heroes:
+                member.roles.append(guild.hero_role)
+                guild.hero_role.members.append(member)
+            guild.members.append(member)
+        self.guilds.append(guild)
+        return guild
+
+    async def call(self, route: str, channel_id: int) -> None:
+        """ Make an API call: wait for its rate limit, then for the round trip. """
+        limit = self.limits.get(route)
+        while limit:
+            now = time.perf_counter()
+            reset, made = self._windows.get((route, channel_id), (0.0, 0))
+            if now >= reset:
+                reset, made = now + limit.per, 0
+            if made < limit.calls:
+                self._windows[route, channel_id] = (reset, made + 1)
+                break
+            # 429, retry once the window resets
+            self.rate_limited += 1
+            await asyncio.sleep(reset - now)
+        delay = self.latency * (1 + random.uniform(-self.jitter, self.jitter))
+        if delay > 0:
+            await asyncio.sleep(delay)
+        self.calls[route] += 1
+
+
+class FakeUser(object):
+    def __init__(self, id: int, name: str):
+        self.id = id
+        self.name = name
+
+    def __str__(self):
+        return self.name
+
+    async def edit(self, **kwargs) -> None:
+        self.name = kwargs.get('username', self.name)
+
+
+class FakeRole(object):
+    def __init__(self, id: int, name: str):
+        self.id = id
+        self.name = name
+        self.members: List['FakeMember'] = []
+
+
+class FakeMember(FakeUser):
+    def __init__(self, id: int, name: str, guild: 'FakeGuild', administrator: bool = False):
+        super().__init__(id, name)
+        self.guild = guild
+        self.roles: List[FakeRole] = []
+        self.guild_permissions = SimpleNamespace(administrator=administrator)
+
+    async def say(self, client: DiscordClient, channel: 'FakeTextChannel', content: str) -> 'FakeMessage':
+        """ Send a message as this member, and hand it to the client as Discord would. """
+        message = FakeMessage(next(_ids), self, channel, content)
+        await client.on_message(message)
+        return message
+
+
+class FakeGuild(object):
+    def __init__(self, id: int, name: str):
+        self.id = id
+        self.name = name
+        self.channels: List['FakeTextChannel'] = []
+        self.roles: List[FakeRole] = []
+        self.members: List[FakeMember] = []
+        # set by `FakeDiscord.guild()`
+        self.town: Optional[FakeTextChannel] = None
+        self.wilderness: Optional[FakeTextChannel] = None
+        self.hero_role: Optional[FakeRole] = None
+
+    def add_channel(self, name: str, discord: FakeDiscord) -> 'FakeTextChannel':
+        channel = FakeTextChannel(next(_ids), name, self, discord)
+        self.channels.append(channel)
+        return channel
+
+
+class FakeTextChannel(object):
+    def __init__(self, id: int, name: str, guild: FakeGuild, discord: FakeDiscord):
+        self.id = id
+        self.name = name
+        self.guild = guild
+        self.discord = discord
+
+    def __str__(self):
+        return self.name
+
+    async def send(self, content: str = None, embed: Any = None, embeds: List[Any] = None, **kwargs) -> 'FakeMessage':
+        await self.discord.call('send', self.id)
+        return FakeMessage(next(_ids), self.discord.user, self, content or '')
+
+
+class FakeMessage(object):
+    def __init__(self, id: int, author: FakeUser, channel: FakeTextChannel, content: str):
+        self.id = id
+        self.author = author
+        self.channel = channel
+        self.guild = channel.guild
+        self.content = content
+        self.created = time.perf_counter()
+        # no mentions to clean up
+        self.clean_content = content
+        self.reactions: List[str] = []
+
+    async def add_reaction(self, emoji: str) -> None:
+        await self.channel.discord.call('add_reaction', self.channel.id)
+        self.reactions.append(emoji)
+
+
+class FakeDiscordClient(DiscordClient):
+    """ A Discord client that plays in a `FakeDiscord` instead of connecting.
+
+    Args:
+        discord: where to play
+        kwargs: as for `DiscordClient`
+    """
+    def __init__(self, discord: FakeDiscord, **kwargs):
+        self.discord = discord
+        super().__init__(**kwargs)
+
+    @property
+    def user(self) -> FakeUser:
+        return self.discord.user
+
+    @property
+    def guilds(self) -> List[FakeGuild]:
+        return self.discord.guilds
+
+    async def start_offline(self) -> None:
+        """Do what connecting would: set up, then get ready. Call from inside the running event loop."""
+        await self.setup_hook()
+        await self.on_ready()
@@ -0,0 +1,223 @@
+"""End to end load on the Discord client, from members chatting in a `FakeDiscord` to the client's API calls.
+
+    python -m benchmarks.load [--profile steady] [--seconds 10] [--guilds 1] [--heroes 2000] [--latency 0.05]
+
+Hero-role members send messages at the profile's rate, as a Poisson process, into #wilderness and #town. Each one
+goes through `on_message`, the ingest queue and the engine, and its results are sent back through the fake API
+with its latency and rate limits. Messages keep arriving at the same rate however far behind the client gets,
+like a real server. Once the profile's time is up, the queue gets --drain seconds to empty.
+
+It reports the messages per second the client got through against the rate offered, saying so if it couldn't keep
+up, since the latencies then measure the backlog more than the client. Then the p50 and p99 latency from
+`on_message` to the last API call for the message, and how many API calls each handled message took, rate limited
+retries not included.
+If any messages are still waiting once --drain is up, it says so and exits with 1, since the latencies leave out
+the slowest messages.
+"""
+import argparse
+import asyncio
+import logging
+import random
+import sys
+import time
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from benchmarks.fake_discord import FakeDiscord, FakeDiscordClient, FakeMember, RateLimit
+from benchmarks.suite import format_ns
+from game import events
+from game.database import db, configure_db, create_tables
+from game.ext.discord_client import DiscordClient, emojis
+from game.gateway import Gateway, InProcessConnection
+from game.ingest import OverflowPolicy
+from game.sessions import Session, SessionManager
+from game.worker import EngineWorker
+
+import diablo2
+
+
+class TrafficProfile(NamedTuple):
+    """How a server's heroes chat."""
+    rate: float                 # messages a second, across every guild
+    town: float                 # the share of messages sent in #town, the rest go to #wilderness
+    elements: float             # the share of #wilderness messages that are an element's emoji
+    commands: Dict[str, float]  # the #town commands sent, and how often relative to each other
+
+
+PROFILES = {
+    # a server getting on with a quest, at a pace Discord's rate limits let one guild keep up with: 5 messages per
+    # 5 seconds in each channel comes to about two handled messages a second
+    'steady': TrafficProfile(rate=2, town=0.1, elements=0.2,
+                             commands={'quest start': 1, 'quest': 2, 'rank': 4, 'score': 2, 'help': 1}),
+    # everyone piling into a boss fight at once, far more than the rate limits let through, to find where the
+    # client saturates
+    'raid': TrafficProfile(rate=400, town=0.02, elements=0.5, commands={'quest start': 1, 'rank': 1}),
+    # a quiet wilderness and a busy town, mostly leaderboard queries, also past what the rate limits let through
+    'town': TrafficProfile(rate=50, town=0.8, elements=0.2,
+                           commands={'quest start': 1, 'quest': 2, 'rank': 6, 'score': 6, 'help': 1}),
+}
+
+CHATTER = ['hello?', 'anyone here', 'attack!', 'hit it', 'over here', 'ow']
+
+
+class LoadClient(FakeDiscordClient):
+    """A fake Discord client that times each message from `on_message` until the last API call for it."""
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.latencies: List[float] = []
+        # when the last message was handled
+        self.finished: Optional[float] = None
+
+    async def absorb(self, event: events.GameEvent, session: Session = None):
+        # the message's API calls are all made by the time its results are emitted
+        await super().absorb(event, session)
+        self.finished = time.perf_counter()
+        self.latencies.append(self.finished - event.context.created)
+
+
+def message(profile: TrafficProfile, commands: Tuple[List[str], List[float]]) -> Tuple[bool, str]:
+    """ What a hero says next.
+
+    Returns:
+        whether it's said in the town, and what it is
+    """
+    if random.random() < profile.town:
+        return True, random.choices(*commands)[0]
+    if random.random() < profile.elements:
+        return False, random.choice(emojis).discord.decode('utf-8')
+    return False, random.choice(CHATTER)
+
+
+async def generate(client: LoadClient, heroes: List[FakeMember], profile: TrafficProfile, seconds: float) -> int:
+    """ Have heroes chat following a profile, without waiting for the client to keep up.
+
+    Returns:
+        how many messages were sent
+    """
+    commands = (list(profile.commands), list(profile.commands.values()))
+    tasks = set()
+    sent = 0
+    start = time.perf_counter()
+    due = start
+    while True:
+        due += random.expovariate(profile.rate)
+        if due - start > seconds:
+            break
+        now = time.perf_counter()
+        if due > now:
+            await asyncio.sleep(due - now)
+        hero = random.choice(heroes)
+        in_town, content = message(profile, commands)
+        channel = hero.guild.town if in_town else hero.guild.wilderness
+        # Discord hands each message to the client in a task of its own
+        task = asyncio.create_task(hero.say(client, channel, content))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+        sent += 1
+    await asyncio.gather(*tasks)
+    return sent
+
+
+async def drain(client: LoadClient, seconds: float) -> None:
+    """Wait for everything queued to be handled, for up to `seconds`."""
+    ingest = client.ingest
+    deadline = time.perf_counter() + seconds
+    while ingest.handled + ingest.dropped + ingest.merged < ingest.received and time.perf_counter() < deadline:
+        await asyncio.sleep(0.01)
+
+
+def percentile(values: List[float], q: float) -> float:
+    """The value `q` of the way through the sorted values, e.g. 0.99 for the p99."""
+    values = sorted(values)
+    return values[min(int(q * len(values)), len(values) - 1)]
+
+
+async def run(args: argparse.Namespace) -> bool:
+    """ Generate the load and report on it.
+
+    Returns:
+        whether every message was handled, dropped or merged before the drain ran out
+    """
+    profile = PROFILES[args.profile]._replace(**({'rate': args.rate} if args.rate else {}))
+    discord = FakeDiscord(latency=args.latency, jitter=args.jitter, send_limit=RateLimit.parse(args.send_limit),
+                          reaction_limit=RateLimit.parse(args.reaction_limit))
+    guilds = [discord.guild(DiscordClient.SERVER_NAME if i == 0 else f'Guild {i}', heroes=args.heroes)
+              for i in range(args.guilds)]
+    sessions = SessionManager(quests=diablo2.quests)
+    gateway = Gateway([InProcessConnection(EngineWorker(sessions))]) if args.gateway else None
+    client = LoadClient(discord, servers=None, sessions=SessionManager(quests=diablo2.quests) if gateway else sessions,
+                        queue_size=args.queue_size, queue_policy=OverflowPolicy(args.queue_policy),
+                        queue_workers=args.queue_workers, gateway=gateway)
+    await client.start_offline()
+    for guild in guilds:
+        await guild.members[0].say(client, guild.town, 'quest start')
+    await drain(client, args.drain)
+    client.latencies.clear()
+    client.finished = None
+    discord.calls = dict.fromkeys(discord.calls, 0)
+    discord.rate_limited = 0
+    ingest = client.ingest
+    ingest.received = ingest.handled = ingest.dropped = ingest.merged = 0
+
+    start = time.perf_counter()
+    heroes = [member for guild in guilds for member in guild.hero_role.members]
+    sent = await generate(client, heroes, profile, args.seconds)
+    await drain(client, args.drain)
+    # up to the last message handled, so the time spent waiting on the drain doesn't count against the client
+    elapsed = max((client.finished or start) - start, args.seconds)
+    stats = ingest.stats()
+    await client.close()
+
+    print(f'{args.profile} profile: {sent} messages over {args.seconds:.0f}s ({profile.rate:.0f}/s) '
+          f'to {args.guilds} guild(s) of {args.heroes} heroes')
+    unfinished = stats['received'] - stats['handled'] - stats['dropped'] - stats['merged']
+    print(f'{"handled":<16} {stats["handled"]} (dropped {stats["dropped"]}, merged {stats["merged"]}, '
+          f'unfinished {unfinished}, queue high water {stats["high_water"]})')
+    offered, throughput = sent / args.seconds, stats['handled'] / elapsed
+    print(f'{"throughput":<16} {throughput:.1f} messages/sec, of {offered:.1f} offered')
+    if unfinished or throughput < 0.9 * offered:
+        print(f'{"saturated":<16} about {throughput:.1f} messages/sec is all the client keeps up with here, '
+              f'the latencies are mostly queueing')
+    if unfinished:
+        # their latencies would be the longest, so the percentiles below are better than the client really did
+        print(f'{"warning":<16} {unfinished} messages were still waiting after --drain {args.drain:g}s, the '
+              f'latencies only cover the {len(client.latencies)} that were handled')
+    if client.latencies:
+        print(f'{"latency p50":<16} {format_ns(percentile(client.latencies, 0.5) * 1e9)}')
+        print(f'{"latency p99":<16} {format_ns(percentile(client.latencies, 0.99) * 1e9)}')
+    calls = ', '.join(f'{route} {n}' for route, n in discord.calls.items())
+    # dropped and merged messages make no calls, and unfinished ones haven't yet
+    print(f'{"api calls":<16} {discord.api_calls / max(stats["handled"], 1):.2f} per message handled ({calls}), '
+          f'{discord.rate_limited} rate limited')
+    return not unfinished
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--profile', default='steady', choices=list(PROFILES))
+    parser.add_argument('--rate', type=float, help="messages a second, instead of the profile's")
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--drain', type=float, default=30, help='how long to wait for the queue to empty afterwards')
+    parser.add_argument('--guilds', type=int, default=1)
+    parser.add_argument('--heroes', type=int, default=2000, help='Hero-role members in each guild')
+    parser.add_argument('--latency', type=float, default=0.05, help='seconds each API call takes')
+    parser.add_argument('--jitter', type=float, default=0.2, help='how much the latency varies, as a fraction')
+    parser.add_argument('--send-limit', default='5/5', help='messages per channel per seconds, or "none"')
+    parser.add_argument('--reaction-limit', default='1/0.25', help='reactions per channel per seconds, or "none"')
+    parser.add_argument('--queue-size', type=int, default=256)
+    parser.add_argument('--queue-policy', default=OverflowPolicy.MERGE_SEARCH.value,
+                        choices=[p.value for p in OverflowPolicy])
+    parser.add_argument('--queue-workers', type=int, default=4)
+    parser.add_argument('--gateway', action='store_true',
+                        help='send events through an in-process engine worker, see game/gateway.py')
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.WARNING)
+
+    random.seed(0)
+    configure_db(profile='memory')
+    db.connect()
+    create_tables()
+    return 0 if asyncio.run(run(args)) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
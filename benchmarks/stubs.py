@@ -0,0 +1,55 @@
+"""Stand-ins for the bits of discord.py the Discord client touches, so it can be benchmarked offline."""
+import itertools
+from types import SimpleNamespace
+
+from game.ext.discord_client import DiscordClient, guild_context
+from game.objects import Location
+from game.sessions import SessionManager
+
+
+_ids = itertools.count(1)
+
+
+class StubChannel(object):
+    """A text channel that counts what is sent to it."""
+    def __init__(self, name: str):
+        self.id = next(_ids)
+        self.name = name
+        self.sent = 0
+
+    async def send(self, content=None, **kwargs):
+        self.sent += 1
+
+
+class StubMessage(object):
+    """A message that counts the reactions added to it."""
+    def __init__(self, author=None, channel=None, content: str = ''):
+        self.id = next(_ids)
+        self.author = author
+        self.channel = channel
+        self.clean_content = content
+        self.reactions = 0
+
+    async def add_reaction(self, emoji):
+        self.reactions += 1
+
+
+class StubDiscordClient(DiscordClient):
+    """A Discord client that never connects."""
+    user = SimpleNamespace(name=DiscordClient.BOT_NAME)
+
+
+def stub_client(sessions: SessionManager, key: str = SessionManager.DEFAULT_SESSION):
+    """ Make a Discord client with one session played in stub channels.
+
+    Returns:
+        the client and the session
+    """
+    client = StubDiscordClient(sessions=sessions)
+    session = sessions.open(key)
+    session.town, session.wilderness = StubChannel('town'), StubChannel('wilderness')
+    session.context = guild_context(guild=None, hero_role=SimpleNamespace(name=DiscordClient.ROLE_NAME, members=[]),
+                                    hero_ids=set())
+    sessions.bind(session.town.id, session, Location.TOWN)
+    sessions.bind(session.wilderness.id, session, Location.WILDERNESS)
+    return client, session
@@ -0,0 +1,339 @@
+"""The engine hot path benchmarks.
+
+Each benchmark is a function that sets up its state and returns the operation to time. Everything runs against the
+in-memory database profile, so nothing outside the project is needed.
+"""
+import asyncio
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+from game import content
+from game.database import db, configure_db, create_tables, Hero, Game
+from game.enemy import Enemy, EnemyTemplate
+from game.areas import Area
+from game.engine import Engine
+from game.events import GameEvent, GameEventType, GameMultiEvent
+from game.sessions import SessionManager
+from game.util import ElementalDamageType
+
+import diablo2
+from benchmarks.stubs import StubMessage, stub_client
+
+
+benchmarks: Dict[str, Callable[[], Callable[[], None]]] = {}
+
+
+def benchmark(name: str):
+    """Register a benchmark under a name."""
+    def register(setup):
+        benchmarks[name] = setup
+        return setup
+    return register
+
+
+def reset_db() -> None:
+    configure_db(profile='memory')
+    db.connect(reuse_if_open=True)
+    db.drop_tables([Hero, Game])
+    create_tables()
+
+
+def engine_on_quest(quest=diablo2.QUEST_DEN_OF_EVIL) -> Engine:
+    """An engine partway through a quest, with heroes to play it."""
+    engine = Engine(quests=[quest])
+    engine.heroes = [engine.get_hero(f'hero {i}', discord_client_id=str(i)) for i in range(10)]
+    engine.start_quest()
+    return engine
+
+
+def immortal_enemy() -> Enemy:
+    return EnemyTemplate('Training Dummy', hp=10 ** 9, xp=1).clone()
+
+
+# engine
+
+def _fight(damage_type: Optional[ElementalDamageType]):
+    def setup():
+        engine = engine_on_quest()
+        engine.current_enemy = immortal_enemy()
+        heroes = engine.heroes
+
+        def op():
+            engine.fight(random.choice(heroes), damage_type=damage_type)
+        return op
+    return setup
+
+
+benchmark('engine.fight[normal]')(_fight(None))
+for _damage_type in ElementalDamageType:
+    benchmark(f'engine.fight[{_damage_type.name.lower()}]')(_fight(_damage_type))
+
+
+@benchmark('engine.search[no quest]')
+def _search_no_quest():
+    engine = Engine(quests=[])
+    hero = engine.get_hero('hero', discord_client_id='0')
+
+    def op():
+        engine.search(hero)
+    return op
+
+
+@benchmark('engine.search[on quest]')
+def _search_on_quest():
+    engine = engine_on_quest()
+    heroes = engine.heroes
+
+    def op():
+        if engine.current_quest is None or engine.current_quest.complete:
+            engine.current_quest = engine.quests[0].clone()
+        engine.current_enemy = None
+        engine.search(random.choice(heroes))
+    return op
+
+
+@benchmark('engine.check_game_state')
+def _check_game_state():
+    engine = engine_on_quest()
+    engine.current_enemy = immortal_enemy()
+
+    def op():
+        engine.check_game_state()
+    return op
+
+
+@benchmark('engine.command[quest]')
+def _command():
+    engine = engine_on_quest()
+    event = GameEvent(GameEventType.COMMAND, message='quest')
+
+    def op():
+        engine.process_event(event)
+    return op
+
+
+# enemies and areas
+
+@benchmark('enemy.wound')
+def _wound():
+    enemy = immortal_enemy()
+    heroes = list(range(10))
+    damage_types = [None] + list(ElementalDamageType)
+
+    def op():
+        enemy.wound(player=random.choice(heroes), damage_type=random.choice(damage_types))
+    return op
+
+
+@benchmark('enemy.award_xp')
+def _award_xp():
+    enemy = immortal_enemy()
+    for hero in range(10):
+        enemy.wound(player=hero)
+
+    def op():
+        enemy.award_xp()
+    return op
+
+
+@benchmark('area.next_enemy[whole area]')
+def _whole_area():
+    # populating only resets a count, meeting the enemies is where an area's cost went
+    area = diablo2.SISTERS_TO_THE_SLAUGHTER.area.clone()
+
+    def op():
+        area.populate()
+        while area.next_enemy() is not None:
+            pass
+    return op
+
+
+@benchmark('area.spawn_random_enemy')
+def _spawn_random_enemy():
+    area = diablo2.SISTERS_TO_THE_SLAUGHTER.area.clone()
+
+    def op():
+        area.spawn_random_enemy()
+    return op
+
+
+@benchmark('area.clone.horde')
+def _clone_horde():
+    horde = Area('Horde', 10_000, enemies=diablo2.SISTERS_TO_THE_SLAUGHTER.area.weights(),
+                 boss=diablo2.SISTERS_TO_THE_SLAUGHTER.area.boss)
+
+    def op():
+        horde.clone()
+    return op
+
+
+# scores
+
+def _score(heroes: int, cold: bool):
+    def setup():
+        engine = Engine(quests=[])
+        with db.atomic():
+            Hero.insert_many([{'name': f'hero {i}', 'hp': 20, 'xp': random.randint(0, 10000)}
+                              for i in range(heroes)]).execute()
+
+        def op():
+            if cold:
+                engine.leaderboard = type(engine.leaderboard)()
+            engine.score()
+        return op
+    return setup
+
+
+for _heroes in (100, 1000, 10000):
+    benchmark(f'engine.score[{_heroes} heroes]')(_score(_heroes, cold=False))
+    benchmark(f'engine.score[{_heroes} heroes, cold]')(_score(_heroes, cold=True))
+
+
+# rosters
+
+def _roster(members: int):
+    def setup():
+        engine = Engine(quests=[])
+        roster = [(f'hero {i}', str(i)) for i in range(members)]
+        engine.get_heroes(roster)
+
+        def op():
+            engine.get_heroes(roster)
+        return op
+    return setup
+
+
+for _members in (1000, 50000):
+    benchmark(f'engine.get_heroes[{_members} members]')(_roster(_members))
+
+
+# content packs
+
+def _content(quests: int, cached: bool):
+    def setup():
+        directory = tempfile.TemporaryDirectory()
+        path = os.path.join(directory.name, 'pack.json')
+        with open(path, 'w') as f:
+            json.dump(content.export(diablo2.quests * (quests // len(diablo2.quests)), name='pack'), f)
+        cache_directory = os.path.join(directory.name, 'cache') if cached else None
+        content.load(path, cache_directory=cache_directory)
+
+        def op():
+            content.load(path, cache_directory=cache_directory)
+        # the directory is removed once it's garbage collected, so keep it until the benchmark is done
+        op.directory = directory
+        return op
+    return setup
+
+
+benchmark('content.load[1000 quests]')(_content(1000, cached=True))
+benchmark('content.load[1000 quests, uncached]')(_content(1000, cached=False))
+
+
+# discord client
+
+def _emit(make_event: Callable[[Engine, List[Hero], StubMessage], GameEvent]):
+    def setup():
+        loop = asyncio.new_event_loop()
+        client, session = stub_client(SessionManager(quests=[diablo2.QUEST_DEN_OF_EVIL]))
+        session.engine.start_quest()
+        heroes = [session.engine.get_hero(f'hero {i}', discord_client_id=str(i)) for i in range(5)]
+        message = StubMessage(content='attack!')
+
+        def op():
+            loop.run_until_complete(client.emit(make_event(session.engine, heroes, message), session))
+        return op
+    return setup
+
+
+def _fight_event(engine: Engine, heroes: List[Hero], message: StubMessage) -> GameEvent:
+    engine.current_enemy = immortal_enemy()
+    return engine.fight(heroes[0], force_hit=True, client_context=message)
+
+
+def _kill_event(engine: Engine, heroes: List[Hero], message: StubMessage) -> GameEvent:
+    # everyone gets a hit in, then the first hero finishes it off
+    engine.current_enemy = EnemyTemplate('Zombie', hp=len(heroes), xp=30).clone()
+    for hero in heroes[1:]:
+        engine.current_enemy.wound(player=hero)
+    return engine.fight(heroes[0], force_hit=True, client_context=message)
+
+
+def _quest_start_event(engine: Engine, heroes: List[Hero], message: StubMessage) -> GameEvent:
+    return GameMultiEvent(events=[GameEvent(GameEventType.QUEST_START, context=engine.current_quest)])
+
+
+benchmark('discord.emit[fight]')(_emit(_fight_event))
+benchmark('discord.emit[kill]')(_emit(_kill_event))
+benchmark('discord.emit[quest start]')(_emit(_quest_start_event))
+
+
+class Measurement(NamedTuple):
+    """How long an operation took."""
+    ns: float      # the median round's nanoseconds per operation
+    spread: float  # how far the furthest round was from the median, as a fraction of it
+
+
+def measure(setup: Callable[[], Callable[[], None]], seconds: float = 0.2, repeat: int = 7) -> Measurement:
+    """ Time an operation.
+
+    Args:
+        setup: the benchmark to run
+        seconds: roughly how long each timed round should take
+        repeat: how many rounds to time
+
+    Returns:
+        the median round's nanoseconds per operation, and how much the rounds varied
+    """
+    random.seed(0)
+    reset_db()
+    op = setup()
+
+    # work out how many calls fill a round
+    calls, elapsed = 1, 0
+    while elapsed < seconds / 10:
+        start = time.perf_counter_ns()
+        for _ in range(calls):
+            op()
+        elapsed = (time.perf_counter_ns() - start) / 1e9
+        calls *= 2
+    calls = max(int(calls * seconds / (elapsed * 2 or seconds)), 1)
+
+    rounds = []
+    for _ in range(repeat):
+        start = time.perf_counter_ns()
+        for _ in range(calls):
+            op()
+        rounds.append((time.perf_counter_ns() - start) / calls)
+    median = statistics.median(rounds)
+    return Measurement(median, max(abs(r - median) for r in rounds) / median)
+
+
+def run(names: List[str] = None, **kwargs) -> Dict[str, Measurement]:
+    """ Run benchmarks, printing each result as it finishes.
+
+    Args:
+        names: only run benchmarks whose names start with one of these
+
+    Returns:
+        the measurement of each benchmark
+    """
+    results = {}
+    for name, setup in benchmarks.items():
+        if names and not any(name.startswith(n) for n in names):
+            continue
+        results[name] = measure(setup, **kwargs)
+        print(f'{name:<40} {format_ns(results[name].ns):>12}  ±{results[name].spread:.0%}')
+    return results
+
+
+def format_ns(ns: float) -> str:
+    for unit, scale in (('s', 1e9), ('ms', 1e6), ('us', 1e3)):
+        if ns >= scale:
+            return f'{ns / scale:.2f} {unit}'
+    return f'{ns:.0f} ns'
@@ -1,39 +1,39 @@
 from game.quests import Quest
-from game.areas import Area
-from game.enemy import Enemy
+from game.areas import AreaDefinition
+from game.enemy import EnemyTemplate
 from game.util import ElementalDamageType
 
 
 class Beastiary(object):
-    ZOMBIE = Enemy('Zombie', hp=1, xp=3)
-    ZOMBIE_2 = Enemy('Hungry Dead', hp=3, xp=7)
-    GHOUL = Enemy('Ghoul', hp=3, xp=6, kind=ElementalDamageType.NECROTIC)
+    ZOMBIE = EnemyTemplate('Zombie', hp=1, xp=3)
+    ZOMBIE_2 = EnemyTemplate('Hungry Dead', hp=3, xp=7)
+    GHOUL = EnemyTemplate('Ghoul', hp=3, xp=6, kind=ElementalDamageType.NECROTIC)
 
-    SKELETON = Enemy('Skeleton', hp=2, xp=4)
-    SKELETAL_ARCHER = Enemy('Skeletal Archer', hp=4, xp=7)
+    SKELETON = EnemyTemplate('Skeleton', hp=2, xp=4)
+    SKELETAL_ARCHER = EnemyTemplate('Skeletal Archer', hp=4, xp=7)
 
-    FALLEN = Enemy('Fallen', hp=1, xp=3, kind=ElementalDamageType.FIRE)
-    FALLEN_SHAMAN = Enemy('Fallen Shaman', hp=2, xp=5, kind=ElementalDamageType.FIRE)
+    FALLEN = EnemyTemplate('Fallen', hp=1, xp=3, kind=ElementalDamageType.FIRE)
+    FALLEN_SHAMAN = EnemyTemplate('Fallen Shaman', hp=2, xp=5, kind=ElementalDamageType.FIRE)
 
-    CARVER = Enemy('Carver', hp=2, xp=7, kind=ElementalDamageType.ICE)
-    CARVER_SHAMAN = Enemy('Carver Shaman', hp=5, xp=8, kind=ElementalDamageType.ICE)
+    CARVER = EnemyTemplate('Carver', hp=2, xp=7, kind=ElementalDamageType.ICE)
+    CARVER_SHAMAN = EnemyTemplate('Carver Shaman', hp=5, xp=8, kind=ElementalDamageType.ICE)
 
-    DARK_ONE = Enemy('Dark One', hp=3, xp=10)
-    DARK_SHAMAN = Enemy('Dark Shaman', hp=6, xp=11)
+    DARK_ONE = EnemyTemplate('Dark One', hp=3, xp=10)
+    DARK_SHAMAN = EnemyTemplate('Dark Shaman', hp=6, xp=11)
 
-    GARGANTUAN_BEAST = Enemy('Gargantuan Beast', hp=4, xp=8, kind=ElementalDamageType.ICE)
-    AFFLICTED = Enemy('Afflicted', hp=6, xp=12, kind=ElementalDamageType.LIGHTNING)
-    THE_BANISHED = Enemy('The Banished', hp=8, xp=16, kind=ElementalDamageType.LIGHTNING)
+    GARGANTUAN_BEAST = EnemyTemplate('Gargantuan Beast', hp=4, xp=8, kind=ElementalDamageType.ICE)
+    AFFLICTED = EnemyTemplate('Afflicted', hp=6, xp=12, kind=ElementalDamageType.LIGHTNING)
+    THE_BANISHED = EnemyTemplate('The Banished', hp=8, xp=16, kind=ElementalDamageType.LIGHTNING)
 
     # Bosses
-    BOSS_CORPSEFIRE = Enemy('Corpsefire', hp=8, xp=80, kind=ElementalDamageType.ICE)
-    BOSS_BLOOD_RAVEN = Enemy('Blood Raven', hp=12, xp=100, kind=ElementalDamageType.WIND)
-    BOSS_GRISWOLD = Enemy('Griswold', hp=16, xp=160)
-    BOSS_ANDARIEL = Enemy('Andariel', hp=25, xp=300, kind=ElementalDamageType.NECROTIC)
+    BOSS_CORPSEFIRE = EnemyTemplate('Corpsefire', hp=8, xp=80, kind=ElementalDamageType.ICE)
+    BOSS_BLOOD_RAVEN = EnemyTemplate('Blood Raven', hp=12, xp=100, kind=ElementalDamageType.WIND)
+    BOSS_GRISWOLD = EnemyTemplate('Griswold', hp=16, xp=160)
+    BOSS_ANDARIEL = EnemyTemplate('Andariel', hp=25, xp=300, kind=ElementalDamageType.NECROTIC)
 
     # Test
-    TEST = Enemy('Test Dummy', hp=2, xp=4)
-    TEST_BOSS = Enemy('Large Test Dummy', hp=4, xp=12, kind=ElementalDamageType.EARTH)
+    TEST = EnemyTemplate('Test Dummy', hp=2, xp=4)
+    TEST_BOSS = EnemyTemplate('Large Test Dummy', hp=4, xp=12, kind=ElementalDamageType.EARTH)
 
 
 pl = """
@@ -57,20 +57,21 @@ I will let Kashya know of your good deed."
 """
 
 QUEST_DEN_OF_EVIL = Quest('Den of Evil',
-                          Area('The Den of Evil',
-                               prologue='The party finds the Den after hours searching in the Blood Moor. '
-                                        'As the heroes descend, the air becomes thick and wet, making it harder to '
-                                        'breathe. You hear sounds of distant demonic babbling.',
-                               num_enemies=24,
-                               enemies={
-                                   Beastiary.ZOMBIE: 10,
-                                   Beastiary.FALLEN: 70,
-                                   Beastiary.FALLEN_SHAMAN: 15,
-                                   Beastiary.GARGANTUAN_BEAST: 5,
-                               },
-                               boss=Beastiary.BOSS_CORPSEFIRE,
-                               epilogue='The heroes slay every last beast in the Den. After only a brief moment to '
-                                        'tend to any wounds, the party heads back to the surface.'),
+                          AreaDefinition(
+                              'The Den of Evil',
+                              prologue='The party finds the Den after hours searching in the Blood Moor. '
+                                       'As the heroes descend, the air becomes thick and wet, making it harder to '
+                                       'breathe. You hear sounds of distant demonic babbling.',
+                              num_enemies=24,
+                              enemies={
+                                  Beastiary.ZOMBIE: 10,
+                                  Beastiary.FALLEN: 70,
+                                  Beastiary.FALLEN_SHAMAN: 15,
+                                  Beastiary.GARGANTUAN_BEAST: 5,
+                              },
+                              boss=Beastiary.BOSS_CORPSEFIRE,
+                              epilogue='The heroes slay every last beast in the Den. After only a brief moment to '
+                                       'tend to any wounds, the party heads back to the surface.'),
                           prologue=pl, epilogue=el, xp=300)
 
 pl = """
@@ -89,18 +90,19 @@ The party returns to Kashya after vanquishing Blood Raven.
 tortured spirit remains banished forever. You have earned my respect, stranger...and the allegiance of the Rogues."
 """
 QUEST_SISTERS_BURIAL_GROUNDS = Quest('Sisters\' Burial Grounds',
-                                     Area('Burial Grounds',
-                                          prologue='The group sets forth to the lands beyond the Blood Moor, through '
-                                                   'the Cold Plains and onto the Burial Grounds. Once a respected '
-                                                   'place within the Sisterhood, it is now desecrated.',
-                                          num_enemies=15,
-                                          enemies={
-                                              Beastiary.SKELETON: 50,
-                                              Beastiary.ZOMBIE_2: 50,
-                                          },
-                                          boss=Beastiary.BOSS_BLOOD_RAVEN,
-                                          epilogue='After Blood Raven is vanquished, a calmness falls over the Burial '
-                                                   'Grounds. What is left of the dead may rest in peace once more.'),
+                                     AreaDefinition(
+                                         'Burial Grounds',
+                                         prologue='The group sets forth to the lands beyond the Blood Moor, through '
+                                                  'the Cold Plains and onto the Burial Grounds. Once a respected '
+                                                  'place within the Sisterhood, it is now desecrated.',
+                                         num_enemies=15,
+                                         enemies={
+                                             Beastiary.SKELETON: 50,
+                                             Beastiary.ZOMBIE_2: 50,
+                                         },
+                                         boss=Beastiary.BOSS_BLOOD_RAVEN,
+                                         epilogue='After Blood Raven is vanquished, a calmness falls over the Burial '
+                                                  'Grounds. What is left of the dead may rest in peace once more.'),
                                      prologue=pl, epilogue=el, xp=550)
 
 
@@ -144,23 +146,24 @@ Diablo will become more powerful than ever before.
 You must stop him or all will be lost."
 """
 QUEST_SEARCH_FOR_CAIN = Quest('Search for Cain',
-                              Area('Tristram',
-                                   prologue='The party treks to the lands of Old Tristram. The air is hot and almost '
-                                            'everything is charred black, some buildings still smoldering.',
-                                   num_enemies=25,
-                                   enemies={
-                                       Beastiary.SKELETON: 25,
-                                       Beastiary.SKELETAL_ARCHER: 15,
-                                       Beastiary.ZOMBIE_2: 25,
-                                       Beastiary.FALLEN: 20,
-                                       Beastiary.FALLEN_SHAMAN: 15,
-                                   },
-                                   boss=Beastiary.BOSS_GRISWOLD,
-                                   epilogue='Just in time, the Heroes rescue Deckard Cain from a makeshift prison cell '
-                                            'hoisted into the air. Only the Prime Evils themselves know what they '
-                                            'had planned for one of the last of the Horadrim. You toss him a town '
-                                            'town portal scroll which he casts. Jumping through the newly opened '
-                                            'portal, the party escapes back to the Rogue Encampment.'),
+                              AreaDefinition(
+                                  'Tristram',
+                                  prologue='The party treks to the lands of Old Tristram. The air is hot and almost '
+                                           'everything is charred black, some buildings still smoldering.',
+                                  num_enemies=25,
+                                  enemies={
+                                      Beastiary.SKELETON: 25,
+                                      Beastiary.SKELETAL_ARCHER: 15,
+                                      Beastiary.ZOMBIE_2: 25,
+                                      Beastiary.FALLEN: 20,
+                                      Beastiary.FALLEN_SHAMAN: 15,
+                                  },
+                                  boss=Beastiary.BOSS_GRISWOLD,
+                                  epilogue='Just in time, the Heroes rescue Deckard Cain from a makeshift prison cell '
+                                           'hoisted into the air. Only the Prime Evils themselves know what they '
+                                           'had planned for one of the last of the Horadrim. You toss him a town '
+                                           'town portal scroll which he casts. Jumping through the newly opened '
+                                           'portal, the party escapes back to the Rogue Encampment.'),
                               prologue=pl, epilogue=el, xp=650)
 
 
@@ -191,20 +194,21 @@ Warriv walks over to the party and lets them know the path is now clear.
 "The caravan is prepared. We may now journey eastward to Lut Gholein."
 """
 SISTERS_TO_THE_SLAUGHTER = Quest('Sisters to the Slaughter',
-                           Area('The Catacombs',
-                                prologue='The party heads deep into the monastery Catacombs- the source from which '
-                                         'the undead seem to be emanating.',
-                                num_enemies=50,
-                                enemies={
-                                    Beastiary.DARK_ONE: 30,
-                                    Beastiary.AFFLICTED: 20,
-                                    Beastiary.GHOUL: 25,
-                                    Beastiary.THE_BANISHED: 10,
-                                    Beastiary.DARK_SHAMAN: 15,
-                                },
-                                boss=Beastiary.BOSS_ANDARIEL,
-                                epilogue='The party makes the long trek back to the surface. It will be great to see '
-                                         'the light once more...'),
+                           AreaDefinition(
+                               'The Catacombs',
+                               prologue='The party heads deep into the monastery Catacombs- the source from which '
+                                        'the undead seem to be emanating.',
+                               num_enemies=50,
+                               enemies={
+                                   Beastiary.DARK_ONE: 30,
+                                   Beastiary.AFFLICTED: 20,
+                                   Beastiary.GHOUL: 25,
+                                   Beastiary.THE_BANISHED: 10,
+                                   Beastiary.DARK_SHAMAN: 15,
+                               },
+                               boss=Beastiary.BOSS_ANDARIEL,
+                               epilogue='The party makes the long trek back to the surface. It will be great to see '
+                                        'the light once more...'),
                            prologue=pl, epilogue=el, xp=1200)
 
 quests = [
@@ -0,0 +1,249 @@
+"""Works out how hard each quest is, without playing it.
+
+The engine's odds are simple enough to model exactly. Fighting one enemy is a Markov chain on its hp, where each
+message the hero misses, hits or crits. Waiting for the next enemy is geometric on the search odds. A quest is the
+sum of its enemies, so its distribution is the convolution of theirs. That gives the same answers as simulating
+millions of fights, in a fraction of a second per quest, so the numbers can be swept freely.
+
+    python -m game.analyzer [--module diablo2] [--heroes 5] [--element best]
+
+The odds come from `game.combat`, including any combat profiles a quest overrides. The damage rules mirror
+`Enemy.wound`, change them there, change them here.
+"""
+import argparse
+import math
+from collections import namedtuple
+from typing import Dict, List, Optional, Tuple
+
+from game.areas import Area
+from game.combat import CombatTable, ENEMY_APPEAR_CHANCE, ENEMY_HIT_CHANCE
+from game.enemy import Enemy
+from game.quests import Quest
+from game.util import ElementalDamageType, elemental_weakness_for
+
+
+# probabilities smaller than this are dropped from the ends of a distribution
+EPSILON = 1e-12
+MAX_MESSAGES = 10000
+
+
+class Distribution(object):
+    """ A probability distribution over whole numbers, stored as a list starting at `offset`.
+
+    Args:
+        p: the probability of each value, from `offset` up
+        offset: the value `p[0]` is the probability of
+    """
+    def __init__(self, p: List[float], offset: int = 0):
+        self.p = p
+        self.offset = offset
+        self._trim()
+
+    def _trim(self):
+        start, end = 0, len(self.p)
+        while start < end and self.p[start] < EPSILON:
+            start += 1
+        while end > start and self.p[end - 1] < EPSILON:
+            end -= 1
+        self.p = self.p[start:end]
+        self.offset += start
+
+    def __add__(self, other: 'Distribution') -> 'Distribution':
+        """The distribution of the sum of independent draws from both."""
+        p = [0.0] * (len(self.p) + len(other.p) - 1)
+        for i, a in enumerate(self.p):
+            for j, b in enumerate(other.p):
+                p[i + j] += a * b
+        return Distribution(p, self.offset + other.offset)
+
+    def __mul__(self, n: int) -> 'Distribution':
+        """The distribution of the sum of `n` independent draws."""
+        result, power = Distribution([1.0]), self
+        while n:
+            if n & 1:
+                result = result + power
+            n >>= 1
+            if n:
+                power = power + power
+        return result
+
+    @classmethod
+    def mixture(cls, parts: List[Tuple[float, 'Distribution']]) -> 'Distribution':
+        """Draw from one of the distributions, picked with the given weights."""
+        total = sum(w for w, _ in parts)
+        offset = min(d.offset for _, d in parts)
+        p = [0.0] * (max(d.offset + len(d.p) for _, d in parts) - offset)
+        for w, d in parts:
+            for i, x in enumerate(d.p):
+                p[d.offset - offset + i] += x * w / total
+        return cls(p, offset)
+
+    @property
+    def mean(self) -> float:
+        return sum((self.offset + i) * x for i, x in enumerate(self.p))
+
+    @property
+    def variance(self) -> float:
+        mean = self.mean
+        return sum((self.offset + i - mean) ** 2 * x for i, x in enumerate(self.p))
+
+    def percentile(self, q: float) -> int:
+        total = 0
+        for i, x in enumerate(self.p):
+            total += x
+            if total >= q:
+                return self.offset + i
+        return self.offset + len(self.p) - 1
+
+
+def damage_per_hit(element: Optional[ElementalDamageType], kind: Optional[ElementalDamageType]) -> int:
+    """How much one wound from an attack takes off an enemy, like `Enemy.wound`."""
+    damage = 1
+    if element and element == elemental_weakness_for(kind):
+        damage += 1
+    if element and element == kind:
+        damage -= 1
+    return max(damage, 0)
+
+
+def choose_element(strategy: str, kind: Optional[ElementalDamageType]) -> Optional[ElementalDamageType]:
+    """ The attack the heroes use against an enemy.
+
+    Args:
+        strategy: 'normal', 'best' (whatever the enemy is weak to) or the name of an element
+        kind: the enemy's element
+    """
+    if strategy == 'normal':
+        return None
+    if strategy == 'best':
+        return elemental_weakness_for(kind)
+    return ElementalDamageType[strategy.upper()]
+
+
+def messages_to_kill(enemy: Enemy, element: Optional[ElementalDamageType],
+                     combat: CombatTable = None) -> Optional[Distribution]:
+    """ How many fight messages it takes to kill an enemy, counting the attack of opportunity.
+
+    Returns:
+        the distribution, or None if the attack can't hurt the enemy
+    """
+    hit, crit, _ = (combat or CombatTable()).profile(element)
+    damage = damage_per_hit(element, enemy.kind)
+    if damage == 0 or hit == 0:
+        return None
+
+    # chance of each amount of damage from one message. a crit wounds twice.
+    step = {0: 1 - hit, damage: hit * (1 - crit), 2 * damage: hit * crit}
+    alive = {enemy.max_hp: 1.0}
+    p = [0.0]
+    while sum(alive.values()) > EPSILON and len(p) <= MAX_MESSAGES:
+        dead, next_alive = 0.0, {}
+        for hp, x in alive.items():
+            for d, y in step.items():
+                if hp - d <= 0:
+                    dead += x * y
+                else:
+                    next_alive[hp - d] = next_alive.get(hp - d, 0.0) + x * y
+        p.append(dead)
+        alive = next_alive
+    return Distribution(p)
+
+
+def messages_to_find() -> Distribution:
+    """How many search messages it takes for the next enemy to appear, counting the one that finds it."""
+    p, miss = [0.0], 1.0
+    while miss > EPSILON:
+        p.append(miss * ENEMY_APPEAR_CHANCE)
+        miss *= 1 - ENEMY_APPEAR_CHANCE
+    return Distribution(p)
+
+
+enemy_report = namedtuple('enemy_report', ['enemy', 'element', 'fight_messages'])
+quest_report = namedtuple('quest_report', ['quest', 'messages', 'fight_messages', 'search_messages',
+                                           'hp_lost', 'hp_lost_sd', 'xp_per_hero', 'enemies'])
+
+
+def analyze_quest(quest: Quest, heroes: int = 5, strategy: str = 'best',
+                  profiles: Dict = None) -> Optional[quest_report]:
+    """ Work out how a quest plays out.
+
+    Args:
+        quest: the quest to analyze
+        heroes: how many heroes play, sharing messages evenly
+        strategy: how the heroes pick their attacks, see `choose_element()`
+        profiles: combat profiles to use instead of `COMBAT_PROFILES`, the quest's own overrides still apply
+
+    Returns:
+        the report, or None if the heroes can't beat some enemy in the quest
+    """
+    area: Area = quest.area
+    combat = CombatTable(profiles, quest.combat_profiles)
+    weights = area.weights()
+    enemies = {}
+    for enemy in list(weights) + [area.boss]:
+        element = choose_element(strategy, enemy.kind)
+        enemies[enemy] = enemy_report(enemy, element, messages_to_kill(enemy, element, combat))
+    if any(r.fight_messages is None for r in enemies.values()):
+        return None
+
+    find = messages_to_find()
+    # the message that finds an enemy is also the attack of opportunity
+    fights = Distribution.mixture([(w, enemies[e].fight_messages) for e, w in weights.items()])
+    fights = fights * (area.num_enemies - 1) + enemies[area.boss].fight_messages
+    searches = find * area.num_enemies
+    messages = fights + searches + Distribution([1.0], offset=-area.num_enemies)
+
+    # the enemy gets a turn on every fight message but the attack of opportunity
+    turns_mean = fights.mean - area.num_enemies
+    hp_lost = turns_mean * ENEMY_HIT_CHANCE
+    hp_lost_variance = (turns_mean * ENEMY_HIT_CHANCE * (1 - ENEMY_HIT_CHANCE)
+                        + fights.variance * ENEMY_HIT_CHANCE ** 2)
+
+    # xp from enemies is split between everyone who hit them, assume that is everyone
+    total_weight = sum(weights.values())
+    enemy_xp = (area.num_enemies - 1) * sum(e.xp_when_killed * w / total_weight
+                                            for e, w in weights.items())
+    enemy_xp += area.boss.xp_when_killed
+    xp_per_hero = (enemy_xp + searches.mean) / heroes + quest.xp_upon_completion
+
+    return quest_report(quest, messages, fights, searches, hp_lost, math.sqrt(hp_lost_variance),
+                        xp_per_hero, list(enemies.values()))
+
+
+def print_report(report: quest_report, heroes: int) -> None:
+    m = report.messages
+    print(f'{report.quest.name} ({report.quest.area.name}, {report.quest.area.num_enemies} enemies)')
+    print(f'  messages to clear:  mean {m.mean:.1f}, p5 {m.percentile(.05)}, p50 {m.percentile(.5)}, '
+          f'p95 {m.percentile(.95)}  ({report.search_messages.mean:.1f} searching, '
+          f'{report.fight_messages.mean:.1f} fighting)')
+    print(f'  hero hp lost:       {report.hp_lost:.1f} ± {report.hp_lost_sd:.1f} in total, '
+          f'{report.hp_lost / heroes:.1f} per hero')
+    print(f'  xp per participant: {report.xp_per_hero:.0f}')
+    for r in report.enemies:
+        element = r.element.name.lower() if r.element else 'normal'
+        print(f'    {r.enemy.name:<20} {element:<10} {r.fight_messages.mean:5.1f} fight messages')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Work out how hard each quest in a campaign is.')
+    parser.add_argument('--module', default='diablo2',
+                        help='the module with the `quests` list, or a content pack (default: diablo2)')
+    parser.add_argument('--heroes', type=int, default=5, help='how many heroes are playing (default: 5)')
+    parser.add_argument('--element', default='best',
+                        choices=['best', 'normal'] + [e.name.lower() for e in ElementalDamageType],
+                        help='what the heroes attack with, best is whatever each enemy is weak to (default: best)')
+    args = parser.parse_args()
+
+    from game.content import load_quests
+    quests = load_quests(args.module)
+    for quest in quests:
+        report = analyze_quest(quest, heroes=args.heroes, strategy=args.element)
+        if report is None:
+            print(f'{quest.name}: some enemy can never be killed attacking with {args.element}.')
+        else:
+            print_report(report, args.heroes)
+        print()
+
+
+if __name__ == '__main__':
+    main()
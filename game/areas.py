@@ -1,20 +1,39 @@
+import bisect
 import random
-from collections import defaultdict
+from itertools import accumulate
+from typing import Dict, NamedTuple, Optional
 
-from game.enemy import Enemy
+from game.enemy import Enemy, EnemyTemplate
 
 
 class Area(object):
+    """ Somewhere the heroes go on a quest, full of enemies and a boss at the end.
+
+    The enemies aren't made up front. The area only counts how many are left, and picks which one turns up, using
+    the spawn weights, when the heroes find it (see `next_enemy()`). An area of thousands costs no more than an area
+    of one until the heroes meet them.
+
+    Args:
+        name: the name of the area
+        num_enemies: how many enemies there are, counting the boss
+        enemies: each kind of enemy and its spawn weight
+        boss: the enemy that turns up last
+        prologue: what happens when the heroes get there
+        epilogue: what happens when they leave
+    """
     def __init__(self,
                  name: str,
                  num_enemies: int,
                  enemies: dict = None,
-                 boss: Enemy = None,
+                 boss: EnemyTemplate = None,
                  prologue: str = None,
                  epilogue: str = None):
         self.name = name
         self._probabilities = enemies or {}
-        self.enemies = []
+        # weights are relative, so a cumulative table and one random number pick an enemy
+        self._kinds = list(self._probabilities.keys())
+        self._cumulative = list(accumulate(self._probabilities.values()))
+        self.remaining = 0
         self.num_enemies = num_enemies
         self.boss = boss.clone()
         self.populate()
@@ -23,28 +42,76 @@ class Area(object):
 
     def __str__(self):
         s = self.name
-        if any(self.enemies):
-            s += f' (enemies: {len(self.enemies) + 1})'
+        if self.remaining:
+            s += f' (enemies: {self.remaining + 1})'
         if self.boss:
             s += f' (boss: {self.boss})'
-        if not any(self.enemies) and not self.boss:
+        if not self.remaining and not self.boss:
             s += ' (empty)'
         return s
 
-    def spawn_random_enemy(self):
-        enemy = random.choices(
-            list(self._probabilities.keys()),
-            list(map(lambda p: p / 100, self._probabilities.values())))[0]
-        self.enemies.append(enemy.clone())
+    def clone(self):
+        """A fresh copy of this area, with its own enemies."""
+        return self.__class__(
+            name=self.name,
+            num_enemies=self.num_enemies,
+            enemies=self._probabilities,
+            boss=self.boss,
+            prologue=self.prologue,
+            epilogue=self.epilogue)
+
+    def weights(self) -> Dict[EnemyTemplate, int]:
+        """Each kind of enemy and its spawn weight."""
+        return dict(self._probabilities)
+
+    @property
+    def has_enemies(self) -> bool:
+        """Whether there are any enemies left, not counting the boss."""
+        return self.remaining > 0
+
+    def spawn_random_enemy(self, rng: random.Random = random) -> Enemy:
+        """ Make a new enemy of a kind picked by the spawn weights.
+
+        Args:
+            rng: where the randomness comes from
+        """
+        i = bisect.bisect_right(self._cumulative, rng.random() * self._cumulative[-1])
+        return self._kinds[min(i, len(self._kinds) - 1)].clone()
+
+    def next_enemy(self, rng: random.Random = random) -> Optional[Enemy]:
+        """ The next enemy the heroes meet, or None if there are no more (not counting the boss).
+
+        Args:
+            rng: where the randomness comes from
+        """
+        if self.remaining <= 0:
+            return None
+        self.remaining -= 1
+        return self.spawn_random_enemy(rng)
 
     def populate(self):
-        for spawn in range(self.num_enemies - 1):
-            self.spawn_random_enemy()
+        self.remaining = max(self.num_enemies - 1, 0) if self._kinds else 0
         self.boss.heal()
 
     def enemy_count(self):
-        counts = defaultdict(int)
-        for e in self.enemies:
-            counts[e.name] += 1
-        for enemy, count in sorted(counts.items(), key=lambda x: x[1], reverse=True):
-            print(f'{count} {enemy}')
+        """Print how many of each enemy are expected to be left."""
+        total = self._cumulative[-1] if self._cumulative else 0
+        for enemy, weight in sorted(self._probabilities.items(), key=lambda x: x[1], reverse=True):
+            print(f'{self.remaining * weight / total:.1f} {enemy.name}')
+
+
+class AreaDefinition(NamedTuple):
+    """ What an area is made from, without making it. A campaign can define hundreds of these at import for the cost
+    of a tuple each, and a quest builds its area from one the first time it's played (see `Quest.area`).
+
+    The arguments are the same as `Area`'s.
+    """
+    name: str
+    num_enemies: int
+    enemies: Dict[EnemyTemplate, int] = None
+    boss: EnemyTemplate = None
+    prologue: str = None
+    epilogue: str = None
+
+    def build(self) -> Area:
+        return Area(**self._asdict())
@@ -1,33 +1,117 @@
+import asyncio
 import logging
+import time
 
-from typing import Optional
+from typing import List, Optional
 
 from game import events
 from game.engine import Engine
-from game.objects import Location
+from game.gateway import Gateway
+from game.profiler import Profiler, parse_spec
+from game.reloader import ContentReloader
+from game.sessions import Session, SessionManager
 
 
 logger = logging.getLogger(__name__)
 
 
 class GameClient(object):
+    """ Shows the game to players, and turns what they do into events for the engine.
+
+    Pass either `engine`, to play a single game, or `sessions`, to play many at once. A single engine is run as
+    the `SessionManager.DEFAULT_SESSION` session.
+
+    Pass `profile`, a spec like 'every=10 seconds=300', to start profiling straight away (see `game.profiler`). Its
+    time window is only timed once the event loop is running, see `schedule_profiling_stop()`.
+
+    Pass `reloader` to swap in changed quest content while the client runs (see `game.reloader`). Subclasses start
+    it once their event loop is running, and stop it when they close.
+
+    Pass `gateway` to have engine workers in other processes process the events instead (see `game.gateway`). The
+    sessions then only say where events come from and where results go, and results hold views of the game's
+    objects rather than the objects themselves. Subclasses connect it once their event loop is running.
+    """
     def __init__(self, **kwargs):
         logger.debug('Setting up game client.')
-        self.engine: Engine = kwargs.pop('engine')
-        self.town: Optional[Location] = None
-        self.wilderness: Optional[Location] = None
+        self.engine: Optional[Engine] = kwargs.pop('engine', None)
+        self.sessions: Optional[SessionManager] = kwargs.pop('sessions', None)
+        if self.sessions is None:
+            self.sessions = SessionManager(quests=self.engine.quests if self.engine else None)
+        if self.engine:
+            self.sessions.open(SessionManager.DEFAULT_SESSION, engine=self.engine)
+        self.reloader: Optional[ContentReloader] = kwargs.pop('reloader', None)
+        self.gateway: Optional[Gateway] = kwargs.pop('gateway', None)
+        self.profiler = Profiler()
+        self._profiling_stop: Optional[asyncio.TimerHandle] = None
+        self._profiling_stop_task: Optional[asyncio.Task] = None
+        profile = kwargs.pop('profile', None)
+        if profile:
+            self.profiler.start(**parse_spec(profile))
 
-    async def emit(self, event: events.GameEvent):
+    async def emit(self, event: events.GameEvent, session: Session = None):
         """ Prints out a game event
 
         You probably want to override this if you are making a subclass of `GameClient`.
 
         Args:
             event: the event to print
+            session: the session the event happened in
+        """
+        logger.info(f'[{session}] {event}' if session else f'{event}')
+
+    async def absorb(self, event: events.GameEvent, session: Session = None):
+        """ Ingest an event into the engine.
+
+        Args:
+            event: the event to process
+            session: the session the event happened in, the default session if not given
         """
-        logger.info(f'{event}')
+        session = session or self.sessions.open(SessionManager.DEFAULT_SESSION)
+        if self.gateway:
+            result = await self.gateway.process(session.key, event)
+            return await self.emit(result, session)
+        if self.profiler.active:
+            if self.profiler.sample():
+                result = await session.engine.run_async(self.profiler.call, session.engine.process_event, event)
+                with self.profiler.client():
+                    return await self.emit(result, session)
+            if self.profiler.expired:
+                await self.stop_profiling()
+        result = await session.engine.process_event_async(event)
+        return await self.emit(result, session)
 
-    async def absorb(self, event: events.GameEvent):
-        """ Ingest an event into the engine."""
-        result = self.engine.process_event(event)
-        return await self.emit(result)
+    def start_profiling(self, spec: str = '') -> None:
+        """ Start the profiler, and have it stop on its own once its time window is up. Call from inside the running
+        event loop.
+
+        Args:
+            spec: the profiling options, see `game.profiler.parse_spec()`
+        """
+        self.profiler.start(**parse_spec(spec))
+        self.schedule_profiling_stop()
+
+    def schedule_profiling_stop(self) -> None:
+        """Stop the profiler when its time window ends, even if no events come in. Call from inside the event loop."""
+        if self._profiling_stop:
+            self._profiling_stop.cancel()
+            self._profiling_stop = None
+        if self.profiler.active and self.profiler.until is not None:
+            loop = asyncio.get_running_loop()
+            self._profiling_stop = loop.call_later(max(self.profiler.until - time.monotonic(), 0),
+                                                   self._stop_profiling_later)
+
+    def _stop_profiling_later(self) -> None:
+        self._profiling_stop = None
+        # kept, so the task isn't collected before it's done
+        self._profiling_stop_task = asyncio.create_task(self.stop_profiling())
+
+    async def stop_profiling(self) -> List[str]:
+        """ Stop the profiler, if it's on, and write its reports.
+
+        Returns:
+            the files written
+        """
+        if self._profiling_stop:
+            self._profiling_stop.cancel()
+            self._profiling_stop = None
+        return await self.profiler.stop(Engine.executor)
@@ -0,0 +1,73 @@
+import random
+from typing import Dict, NamedTuple, Optional, Tuple
+
+from game.util import ElementalDamageType
+
+
+class CombatProfile(NamedTuple):
+    """ How a hero's attack of one kind plays out.
+
+    Args:
+        hit: the chance the attack hits
+        crit: the chance a hit is a critical hit
+        verbs: what the hero does to the enemy, one is picked at random, e.g. 'stabs'
+    """
+    hit: float
+    crit: float
+    verbs: Tuple[str, ...]
+
+
+# the attack for each damage type, None being a normal attack. a quest can override any of these.
+COMBAT_PROFILES: Dict[Optional[ElementalDamageType], CombatProfile] = {
+    None: CombatProfile(hit=1 / 2, crit=1 / 4, verbs=('swings at', 'stabs', 'smashes', 'gouges', 'stomps')),
+    ElementalDamageType.FIRE: CombatProfile(hit=1, crit=1 / 7, verbs=('scorches', 'torches', 'carbonizes')),
+    ElementalDamageType.ICE: CombatProfile(hit=1 / 3, crit=1 / 2, verbs=('freezes', 'ices', 'chills')),
+    ElementalDamageType.WATER: CombatProfile(hit=1 / 2, crit=1 / 4, verbs=('drowns', 'submerges')),
+    ElementalDamageType.LIGHTNING: CombatProfile(hit=1 / 2, crit=1 / 4, verbs=('zaps', 'electrocutes')),
+    ElementalDamageType.EARTH: CombatProfile(hit=1 / 2, crit=1 / 4,
+                                             verbs=('throws a boulder at', 'chucks a sharp rock at')),
+    ElementalDamageType.WIND: CombatProfile(hit=1 / 2, crit=1 / 4,
+                                            verbs=('channels a gust of wind at', 'summons a tornado on top of')),
+    ElementalDamageType.HOLY: CombatProfile(hit=1 / 2, crit=1 / 4, verbs=('smites', 'casts holy light on')),
+    ElementalDamageType.NECROTIC: CombatProfile(hit=1 / 2, crit=1 / 4, verbs=('withers', 'drains the life from')),
+}
+
+# the chance the enemy hits back when a hero attacks
+ENEMY_HIT_CHANCE = 1 / 3
+# the chance a search turns up an enemy, when there are any left
+ENEMY_APPEAR_CHANCE = 2 / 3
+
+
+class CombatTable(object):
+    """ Combat profiles compiled for rolling attacks quickly.
+
+    Args:
+        profiles: the profiles to use
+        overrides: profiles to use instead of some of those, e.g. from a quest
+    """
+    def __init__(self, profiles: Dict[Optional[ElementalDamageType], CombatProfile] = None,
+                 overrides: Dict[Optional[ElementalDamageType], CombatProfile] = None):
+        self.profiles = dict(profiles or COMBAT_PROFILES)
+        self.profiles.update(overrides or {})
+        # damage type -> (hit, crit, verbs, number of verbs)
+        self._rolls = {t: (p.hit, p.crit, p.verbs, len(p.verbs)) for t, p in self.profiles.items()}
+        self._normal = self._rolls[None]
+
+    def profile(self, damage_type: Optional[ElementalDamageType]) -> CombatProfile:
+        """The profile for a damage type, the normal attack's if it doesn't have one."""
+        return self.profiles.get(damage_type, self.profiles[None])
+
+    def roll(self, damage_type: Optional[ElementalDamageType] = None,
+             rng: random.Random = random) -> Tuple[str, bool, bool]:
+        """ Roll a hero's attack.
+
+        Args:
+            damage_type: the kind of attack
+            rng: where the randomness comes from
+
+        Returns:
+            the verb, whether it hit, and whether it crit (crits only count if it hit)
+        """
+        hit, crit, verbs, n = self._rolls.get(damage_type, self._normal)
+        r = rng.random
+        return verbs[int(r() * n)], r() < hit, r() < crit
@@ -1,6 +1,214 @@
+import time
+from copy import copy
 from enum import Enum
+from typing import TYPE_CHECKING, Callable, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from game.events import GameEvent, GameEventType, HeroEvent
+from game.exceptions import AlreadyOnQuest
+
+if TYPE_CHECKING:
+    from game.engine import Engine
 
 
 class GameCommand(Enum):
     SCORE_GET = 'score'
     QUEST_START = 'quest'
+
+
+# runs a command: the engine, the event that asked for it, and anything typed after the command's name
+CommandHandler = Callable[['Engine', GameEvent, str], GameEvent]
+
+
+class Command(NamedTuple):
+    """ A town command.
+
+    Args:
+        name: what is typed to run it, e.g. 'quest start'
+        handler: what runs it
+        aliases: other things that can be typed to run it
+        usage: how it is typed, for help, e.g. 'score <page>'
+        help: what it does, for help. left out of help if empty
+        takes_args: whether anything can be typed after the name
+    """
+    name: str
+    handler: CommandHandler
+    aliases: Tuple[str, ...] = ()
+    usage: Optional[str] = None
+    help: str = ''
+    takes_args: bool = False
+
+
+class CommandStats(object):
+    """How often a command has run and how long it took, in seconds."""
+    __slots__ = ('calls', 'total', 'max')
+
+    def __init__(self):
+        self.calls = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def __repr__(self):
+        return f'CommandStats(calls={self.calls}, mean={self.mean * 1e6:.1f}us, max={self.max * 1e6:.1f}us)'
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.calls if self.calls else 0.0
+
+    def add(self, seconds: float) -> None:
+        self.calls += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+
+class CommandRouter(object):
+    """ Turns town messages into commands, with one dict lookup per word typed instead of a chain of comparisons.
+
+    Names and aliases are normalized once, when they are registered, and messages the same way when they come in:
+    lower case, with runs of whitespace collapsed. A message runs the longest command name it starts with, and the
+    rest of the message is handed to the command (which may not take any, see `Command.takes_args`).
+
+    Args:
+        commands: the commands to start with
+    """
+    def __init__(self, commands: List[Command] = None):
+        self._commands: Dict[str, Command] = {}
+        self._routes: Dict[str, Command] = {}
+        self.stats: Dict[str, CommandStats] = {}
+        for command in commands or []:
+            self.register(command)
+
+    def __iter__(self) -> Iterator[Command]:
+        return iter(self._commands.values())
+
+    def __len__(self):
+        return len(self._commands)
+
+    def __contains__(self, name: str):
+        return self.normalize(name) in self._routes
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        return ' '.join(text.lower().split())
+
+    def register(self, command: Command) -> Command:
+        """ Add a command, replacing any with the same name.
+
+        Args:
+            command: the command to add
+
+        Raises:
+            ValueError: if one of its aliases is already another command's name or alias
+        """
+        command = command._replace(name=self.normalize(command.name),
+                                   aliases=tuple(self.normalize(a) for a in command.aliases))
+        old = self._commands.get(command.name)
+        # checked before the old command goes, so a conflict leaves it as it was
+        for route in (command.name, *command.aliases):
+            taken = self._routes.get(route)
+            if taken is not None and taken is not old:
+                raise ValueError(f'"{route}" already runs the {taken.name} command')
+        if old:
+            self.unregister(old.name)
+        self._commands[command.name] = command
+        for route in (command.name, *command.aliases):
+            self._routes[route] = command
+        self.stats.setdefault(command.name, CommandStats())
+        return command
+
+    def unregister(self, name: str) -> None:
+        command = self._commands.pop(self.normalize(name), None)
+        if command:
+            for route in (command.name, *command.aliases):
+                self._routes.pop(route, None)
+
+    def command(self, name: str, aliases: Tuple[str, ...] = (), usage: str = None, help: str = '',
+                takes_args: bool = False) -> Callable[[CommandHandler], CommandHandler]:
+        """A decorator to register a function as a command, see `Command`."""
+        def decorator(handler: CommandHandler) -> CommandHandler:
+            self.register(Command(name=name, handler=handler, aliases=aliases, usage=usage, help=help,
+                                  takes_args=takes_args))
+            return handler
+        return decorator
+
+    def resolve(self, message: str) -> Optional[Tuple[Command, str]]:
+        """ Find the command a message runs.
+
+        Returns:
+            the command and what was typed after it, or None if the message isn't a command
+        """
+        text = self.normalize(message)
+        command = self._routes.get(text)
+        if command:
+            return command, ''
+        # try shorter and shorter prefixes, a word at a time
+        cut = len(text)
+        while True:
+            cut = text.rfind(' ', 0, cut)
+            if cut < 0:
+                return None
+            command = self._routes.get(text[:cut])
+            if command:
+                return (command, text[cut + 1:]) if command.takes_args else None
+
+    def dispatch(self, engine: 'Engine', event: GameEvent) -> GameEvent:
+        """ Run the command an event's message asks for.
+
+        Returns:
+            what the command did, or a NOOP event if the message isn't a command
+        """
+        resolved = self.resolve(event.message or '')
+        if resolved is None:
+            return GameEvent(GameEventType.NOOP)
+        command, args = resolved
+        start = time.perf_counter()
+        try:
+            return command.handler(engine, event, args)
+        finally:
+            self.stats[command.name].add(time.perf_counter() - start)
+
+    def help(self) -> Tuple[Tuple[str, str], ...]:
+        """The usage and help text of each command with any help, in the order they were registered."""
+        return tuple((c.usage or c.name, c.help) for c in self._commands.values() if c.help)
+
+
+def default_commands() -> CommandRouter:
+    """A router with the game's own town commands. Each engine gets its own, so extensions can add to it."""
+    router = CommandRouter()
+
+    @router.command('quest start', help='starts a quest.')
+    def quest_start(engine: 'Engine', event: GameEvent, args: str) -> GameEvent:
+        try:
+            return engine.start_quest()
+        except AlreadyOnQuest:
+            return GameEvent(GameEventType.QUEST_GET_CURRENT, context=engine.current_quest)
+
+    @router.command('quest', help='prints the current quest.')
+    def quest(engine: 'Engine', event: GameEvent, args: str) -> GameEvent:
+        return GameEvent(GameEventType.QUEST_GET_CURRENT, context=engine.current_quest)
+
+    @router.command('quest abandon', help='abandons the current quest.')
+    def quest_abandon(engine: 'Engine', event: GameEvent, args: str) -> GameEvent:
+        quest_abandoned = copy(engine.current_quest)
+        engine.current_quest = None
+        return GameEvent(GameEventType.QUEST_ABANDON, context=quest_abandoned)
+
+    @router.command('score', usage='score <page>', help='prints the high scores, or more of them.', takes_args=True)
+    def score(engine: 'Engine', event: GameEvent, args: str) -> GameEvent:
+        if not args:
+            return engine.score()
+        if args.isdigit():
+            return engine.score(page=int(args))
+        return GameEvent(GameEventType.NOOP)
+
+    @router.command('rank', help='prints your place on the leaderboard.')
+    def rank(engine: 'Engine', event: GameEvent, args: str) -> GameEvent:
+        if isinstance(event, HeroEvent):
+            return engine.rank(event.hero)
+        return GameEvent(GameEventType.NOOP)
+
+    @router.command('help', help='prints this.')
+    def help_(engine: 'Engine', event: GameEvent, args: str) -> GameEvent:
+        return GameEvent(GameEventType.HELP, context=engine.commands.help())
+
+    return router
@@ -0,0 +1,125 @@
+"""Play the game in a terminal, with no Discord. Nothing here imports discord.py, so it starts quickly.
+
+    python -m game.console [--module diablo2] [--hero NAME] [--db-path PATH]
+
+Lines starting with '/' are town commands, e.g. '/quest start' or '/score'. Anything else is a message in the
+wilderness, which searches or fights. A wilderness message that is just an element's name, e.g. 'fire', attacks
+with that element. Reads from stdin until it ends, so a file of messages can be piped in too.
+"""
+import argparse
+import asyncio
+import logging
+import sys
+from typing import Optional, TextIO
+
+from game import events
+from game.client import GameClient
+from game.database import Hero
+from game.engine import Engine
+from game.objects import Location
+from game.sessions import Session, SessionManager
+from game.util import ElementalDamageType
+
+
+logger = logging.getLogger(__name__)
+
+
+class ConsoleClient(GameClient):
+    """ A client that plays one hero through text.
+
+    Args:
+        out: where to write what happens
+    """
+    def __init__(self, out: TextIO = sys.stdout, **kwargs):
+        self.out = out
+        super().__init__(**kwargs)
+
+    async def emit(self, event: events.GameEvent, session: Session = None):
+        if event is None or event.type is events.GameEventType.NOOP:
+            return
+        if isinstance(event, events.GameMultiEvent):
+            for child in event.events:
+                await self.emit(child, session)
+            return
+        print(event, file=self.out)
+
+    @staticmethod
+    def event_for(engine: Engine, hero: Hero, line: str) -> Optional[events.GameEvent]:
+        """ The event a line of input makes, if any.
+
+        Args:
+            engine: the engine it's for
+            hero: who typed it
+            line: what they typed
+        """
+        line = line.strip()
+        if not line:
+            return None
+        if line.startswith('/'):
+            return events.HeroEvent(events.GameEventType.COMMAND, hero=hero, message=line[1:].lower(),
+                                    location=Location.TOWN)
+        # the engine has the final say on search or fight, as it does for the Discord client
+        event = events.HeroEvent(events.GameEventType.FIGHT if engine.current_enemy else events.GameEventType.SEARCH,
+                                 hero=hero, message=line, location=Location.WILDERNESS)
+        augment = ElementalDamageType.__members__.get(line.upper())
+        if augment:
+            event.add_augment(augment)
+        return event
+
+    async def play(self, hero_name: str, lines: TextIO = None) -> None:
+        """ Play lines of input as a hero until they run out, then write the profiler's reports, if it's on, and any
+        pending hero changes. The reloader, if there is one, watches for new content while it plays.
+
+        Args:
+            hero_name: who to play as
+            lines: where the input comes from (default: stdin)
+        """
+        lines = lines or sys.stdin
+        session = self.sessions.open(SessionManager.DEFAULT_SESSION)
+        self.schedule_profiling_stop()
+        self.sessions.start_flushing()
+        if self.reloader:
+            self.reloader.start()
+        try:
+            hero = await session.engine.run_async(session.engine.get_hero, hero_name)
+            loop = asyncio.get_running_loop()
+            while True:
+                line = await loop.run_in_executor(None, lines.readline)
+                if not line:
+                    break
+                event = self.event_for(session.engine, hero, line)
+                if event:
+                    await self.absorb(event, session)
+        finally:
+            await self.sessions.stop_flushing()
+            if self.reloader:
+                await self.reloader.stop()
+            await self.stop_profiling()
+            await session.engine.run_async(self.sessions.flush)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Play the game in a terminal.')
+    parser.add_argument('--module', default='diablo2',
+                        help='the module with the `quests` list, or a content pack (default: diablo2)')
+    parser.add_argument('--hero', default='Hero', help='the name of the hero to play as')
+    parser.add_argument('--db-path', help='a database file to play in (default: a fresh one in memory)')
+    args = parser.parse_args(argv)
+
+    from game.database import db, configure_db, create_tables
+    configure_db(path=args.db_path, profile=None if args.db_path else 'memory')
+    db.connect()
+    create_tables()
+
+    from game.content import load_quests
+    quests = load_quests(args.module)
+    client = ConsoleClient(sessions=SessionManager(quests=quests))
+    try:
+        asyncio.run(client.play(args.hero))
+    finally:
+        db.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
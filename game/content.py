@@ -0,0 +1,362 @@
+"""Content packs: a campaign's enemies, areas, spawn weights and quests, described in JSON instead of Python.
+
+    {
+      "name": "diablo2",
+      "enemies": {
+        "fallen": {"name": "Fallen", "hp": 1, "xp": 3, "kind": "fire"},
+        "corpsefire": {"name": "Corpsefire", "hp": 8, "xp": 80, "kind": "ice"}
+      },
+      "quests": [
+        {
+          "name": "Den of Evil", "xp": 300, "prologue": "...", "epilogue": "...",
+          "area": {
+            "name": "The Den of Evil", "enemies": 24, "prologue": "...", "epilogue": "...",
+            "spawns": {"fallen": 70}, "boss": "corpsefire"
+          },
+          "combat": {"fire": {"hit": 1, "crit": 0.5, "verbs": ["scorches"]}}
+        }
+      ]
+    }
+
+Enemies are named by their key, and `kind` is an element (see `ElementalDamageType`), or left out. A quest's
+`combat` is optional, its keys are elements or "normal", see `CombatProfile`. Quests are played in order.
+
+A pack is checked against that shape as it's loaded, and everything wrong with it is reported at once
+(`ContentError`). Once it's compiled into quests, they're pickled into a cache keyed by the hash of the pack's bytes,
+so starting up again with the same pack only hashes the file and unpickles it. The cache is trusted like code, keep
+it somewhere only the bot can write.
+
+    python -m game.content export diablo2 diablo2.json    # write a module's quests as a pack
+    python -m game.content check diablo2.json             # check a pack, and compile it into the cache
+
+Anything that takes a module with a `quests` list, e.g. `main.py --content`, takes the path of a pack too.
+"""
+import argparse
+import glob
+import hashlib
+import importlib
+import json
+import logging
+import os
+import pickle
+import re
+import sys
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from game.areas import AreaDefinition
+from game.combat import CombatProfile
+from game.enemy import EnemyTemplate
+from game.exceptions import ContentError
+from game.quests import Quest
+from game.util import ElementalDamageType
+
+
+logger = logging.getLogger(__name__)
+
+# part of every cache key, bump it whenever what a pack compiles into changes
+COMPILED_VERSION = 1
+# the name of the cache directory, next to the pack unless `load()` is told otherwise
+CACHE_DIRECTORY = '.content-cache'
+NORMAL_ATTACK = 'normal'
+
+_ELEMENTS = {e.name.lower(): e for e in ElementalDamageType}
+
+
+class ContentPack(NamedTuple):
+    """ A loaded content pack.
+
+    Args:
+        name: the pack's name
+        enemies: every enemy, by its key in the pack
+        quests: the quests, in order, ready for `Engine(quests=...)`
+    """
+    name: str
+    enemies: Dict[str, EnemyTemplate]
+    quests: List[Quest]
+
+
+class _Checker(object):
+    # collects problems, each with the path to where it is in the pack
+    def __init__(self):
+        self.problems: List[str] = []
+
+    def fail(self, path: str, problem: str) -> None:
+        self.problems.append(f'{path}: {problem}')
+
+    def object(self, path: str, value: Any, required: tuple = (), optional: Optional[tuple] = None) -> bool:
+        # optional=None allows any other keys, for objects keyed by name
+        if not isinstance(value, dict):
+            self.fail(path, f'should be an object, not {type(value).__name__}')
+            return False
+        for key in required:
+            if key not in value:
+                self.fail(path, f'is missing "{key}"')
+        if optional is not None:
+            for key in value:
+                if key not in required and key not in optional:
+                    self.fail(f'{path}.{key}', 'is not a known field')
+        return True
+
+    def string(self, path: str, value: Any) -> None:
+        if not isinstance(value, str):
+            self.fail(path, 'should be a string')
+
+    def number(self, path: str, value: Any, low: float = None, high: float = None, whole: bool = True) -> None:
+        types = int if whole else (int, float)
+        if isinstance(value, bool) or not isinstance(value, types):
+            self.fail(path, f'should be a {"whole " if whole else ""}number')
+        elif (low is not None and value < low) or (high is not None and value > high):
+            self.fail(path, f'should be between {low} and {high}' if high is not None else f'should be at least {low}')
+
+    def element(self, path: str, value: Any, allow_normal: bool = False) -> None:
+        if not isinstance(value, str) or (value not in _ELEMENTS and not (allow_normal and value == NORMAL_ATTACK)):
+            choices = sorted(_ELEMENTS) + ([NORMAL_ATTACK] if allow_normal else [])
+            self.fail(path, f'"{value}" is not one of {", ".join(choices)}')
+
+
+def validate(data: Any) -> List[str]:
+    """ Check a pack, as parsed from JSON, has the right shape.
+
+    Returns:
+        everything wrong with it, empty if nothing is
+    """
+    check = _Checker()
+    if not check.object('pack', data, required=('enemies', 'quests'), optional=('name',)):
+        return check.problems
+    if 'name' in data:
+        check.string('name', data['name'])
+
+    enemies = data.get('enemies', {})
+    if check.object('enemies', enemies):
+        for key, enemy in enemies.items():
+            path = f'enemies.{key}'
+            if check.object(path, enemy, required=('name',), optional=('hp', 'xp', 'kind')):
+                check.string(f'{path}.name', enemy.get('name'))
+                check.number(f'{path}.hp', enemy.get('hp', 1), low=1)
+                check.number(f'{path}.xp', enemy.get('xp', 0), low=0)
+                if enemy.get('kind') is not None:
+                    check.element(f'{path}.kind', enemy['kind'])
+    else:
+        enemies = {}
+
+    quests = data.get('quests', [])
+    if not isinstance(quests, list):
+        check.fail('quests', 'should be a list')
+        quests = []
+    for i, quest in enumerate(quests):
+        path = f'quests[{i}]'
+        if not check.object(path, quest, required=('name', 'area'),
+                            optional=('xp', 'prologue', 'epilogue', 'combat')):
+            continue
+        check.string(f'{path}.name', quest.get('name'))
+        check.number(f'{path}.xp', quest.get('xp', 0), low=0)
+        for text in ('prologue', 'epilogue'):
+            if quest.get(text) is not None:
+                check.string(f'{path}.{text}', quest[text])
+
+        area = quest.get('area')
+        if area is not None and check.object(f'{path}.area', area, required=('name', 'enemies', 'boss'),
+                                             optional=('spawns', 'prologue', 'epilogue')):
+            check.string(f'{path}.area.name', area.get('name'))
+            check.number(f'{path}.area.enemies', area.get('enemies'), low=0)
+            for text in ('prologue', 'epilogue'):
+                if area.get(text) is not None:
+                    check.string(f'{path}.area.{text}', area[text])
+            if not isinstance(area.get('boss'), str) or area['boss'] not in enemies:
+                check.fail(f'{path}.area.boss', f'"{area.get("boss")}" is not one of the enemies')
+            spawns = area.get('spawns', {})
+            if check.object(f'{path}.area.spawns', spawns):
+                for key, weight in spawns.items():
+                    if key not in enemies:
+                        check.fail(f'{path}.area.spawns.{key}', 'is not one of the enemies')
+                    check.number(f'{path}.area.spawns.{key}', weight, low=1)
+                if not spawns and isinstance(area.get('enemies'), int) and area['enemies'] > 0:
+                    check.fail(f'{path}.area.spawns', f'is empty, so none of its {area["enemies"]} enemies can spawn')
+
+        combat = quest.get('combat', {})
+        if check.object(f'{path}.combat', combat):
+            for key, profile in combat.items():
+                profile_path = f'{path}.combat.{key}'
+                check.element(profile_path, key, allow_normal=True)
+                if check.object(profile_path, profile, required=('hit', 'crit', 'verbs'), optional=()):
+                    for chance in ('hit', 'crit'):
+                        if chance in profile:
+                            check.number(f'{profile_path}.{chance}', profile[chance], low=0, high=1, whole=False)
+                    verbs = profile.get('verbs', ['missing'])
+                    if not isinstance(verbs, list) or not verbs or not all(isinstance(v, str) for v in verbs):
+                        check.fail(f'{profile_path}.verbs', 'should be a list of at least one string')
+    return check.problems
+
+
+def compile_pack(data: Dict[str, Any], default_name: str = 'content') -> ContentPack:
+    """ Turn a valid pack, as parsed from JSON, into quests. Check it with `validate()` first. """
+    enemies = {key: EnemyTemplate(e['name'], **{field: e[field] for field in ('hp', 'xp') if field in e},
+                                  kind=_ELEMENTS[e['kind']] if e.get('kind') else None)
+               for key, e in data['enemies'].items()}
+    quests = []
+    for quest in data['quests']:
+        area = quest['area']
+        combat = {None if key == NORMAL_ATTACK else _ELEMENTS[key]: CombatProfile(profile['hit'], profile['crit'],
+                                                                               tuple(profile['verbs']))
+                  for key, profile in quest.get('combat', {}).items()}
+        quests.append(Quest(
+            name=quest['name'],
+            area=AreaDefinition(name=area['name'],
+                                num_enemies=area['enemies'],
+                                enemies={enemies[key]: weight for key, weight in area.get('spawns', {}).items()},
+                                boss=enemies[area['boss']],
+                                prologue=area.get('prologue'),
+                                epilogue=area.get('epilogue')),
+            prologue=quest.get('prologue'),
+            epilogue=quest.get('epilogue'),
+            xp=quest.get('xp'),
+            combat=combat))
+    return ContentPack(name=data.get('name', default_name), enemies=enemies, quests=quests)
+
+
+def parse(text: bytes, source: str = 'content') -> ContentPack:
+    """ Parse, check and compile a pack, without the cache.
+
+    Raises:
+        ContentError: if it isn't valid JSON, or isn't a valid pack
+    """
+    try:
+        data = json.loads(text)
+    except ValueError as e:
+        raise ContentError(source, [f'is not valid JSON: {e}'])
+    problems = validate(data)
+    if problems:
+        raise ContentError(source, problems)
+    return compile_pack(data, default_name=os.path.splitext(os.path.basename(source))[0])
+
+
+def load(path: str, cache_directory: Optional[str] = '') -> ContentPack:
+    """ Load a pack, from the cache if it has been compiled before.
+
+    Args:
+        path: the pack's file
+        cache_directory: where compiled packs are kept, `CACHE_DIRECTORY` next to the pack by default. None to not
+            use a cache
+
+    Raises:
+        ContentError: if the pack isn't valid
+    """
+    with open(path, 'rb') as f:
+        text = f.read()
+    if cache_directory is None:
+        return parse(text, source=path)
+
+    cache_directory = cache_directory or os.path.join(os.path.dirname(path), CACHE_DIRECTORY)
+    stem = os.path.splitext(os.path.basename(path))[0]
+    key = hashlib.sha256(f'{COMPILED_VERSION}:'.encode() + text).hexdigest()
+    cached = os.path.join(cache_directory, f'{stem}-{key[:32]}.pickle')
+    try:
+        with open(cached, 'rb') as f:
+            return ContentPack(*pickle.load(f))
+    except FileNotFoundError:
+        pass
+    except Exception:
+        logger.warning(f'Could not read the compiled {path} from {cached}, compiling it again.', exc_info=True)
+
+    pack = parse(text, source=path)
+    try:
+        os.makedirs(cache_directory, exist_ok=True)
+        # only the latest compile of each pack is kept
+        for old in glob.glob(os.path.join(cache_directory, f'{glob.escape(stem)}-*.pickle')):
+            os.remove(old)
+        tmp = f'{cached}.{os.getpid()}.tmp'
+        with open(tmp, 'wb') as f:
+            # a plain tuple, since this module may be __main__ when it's written
+            pickle.dump(tuple(pack), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, cached)
+    except OSError:
+        logger.warning(f'Could not cache the compiled {path} in {cache_directory}.', exc_info=True)
+    return pack
+
+
+def load_quests(source: str) -> List[Quest]:
+    """ The quests from a content pack's path, or from a module's `quests` list, e.g. 'diablo2'. """
+    if source.endswith('.json'):
+        return load(source).quests
+    return importlib.import_module(source).quests
+
+
+def _key(name: str, taken: Dict[str, Any]) -> str:
+    key = re.sub(r'[^a-z0-9]+', '_', name.lower()).strip('_') or 'enemy'
+    unique, n = key, 2
+    while unique in taken:
+        unique, n = f'{key}_{n}', n + 1
+    return unique
+
+
+def export(quests: List[Quest], name: str = 'content') -> Dict[str, Any]:
+    """ Describe quests as a pack, ready for `json.dump()`. Loading it gives the same quests back.
+
+    Args:
+        quests: the quests, as defined, not partway through being played
+        name: the pack's name
+    """
+    keys: Dict[EnemyTemplate, str] = {}
+    enemies: Dict[str, Dict[str, Any]] = {}
+
+    def enemy_key(enemy: EnemyTemplate) -> str:
+        if enemy not in keys:
+            key = keys[enemy] = _key(enemy.name, enemies)
+            enemies[key] = {'name': enemy.name, 'hp': enemy.hp, 'xp': enemy.xp}
+            if enemy.kind:
+                enemies[key]['kind'] = enemy.kind.name.lower()
+        return keys[enemy]
+
+    described = []
+    for quest in quests:
+        area = quest.area
+        described_area = {'name': area.name, 'enemies': area.num_enemies}
+        if area.prologue:
+            described_area['prologue'] = area.prologue
+        described_area['spawns'] = {enemy_key(e): weight for e, weight in area.weights().items()}
+        described_area['boss'] = enemy_key(area.boss.template)
+        if area.epilogue:
+            described_area['epilogue'] = area.epilogue
+        described_quest = {'name': quest.name, 'xp': quest.xp_upon_completion}
+        if quest.prologue:
+            described_quest['prologue'] = quest.prologue
+        if quest.epilogue:
+            described_quest['epilogue'] = quest.epilogue
+        described_quest['area'] = described_area
+        if quest.combat_profiles:
+            described_quest['combat'] = {
+                NORMAL_ATTACK if t is None else t.name.lower(): {'hit': p.hit, 'crit': p.crit, 'verbs': list(p.verbs)}
+                for t, p in quest.combat_profiles.items()}
+        described.append(described_quest)
+    return {'name': name, 'enemies': enemies, 'quests': described}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Export quests as a content pack, or check a pack.')
+    commands = parser.add_subparsers(dest='command', required=True)
+    export_command = commands.add_parser('export', help="write a module's quests as a pack")
+    export_command.add_argument('module', help='the module with the `quests` list, e.g. diablo2')
+    export_command.add_argument('path', help='the pack to write')
+    check_command = commands.add_parser('check', help='check a pack, and compile it into the cache')
+    check_command.add_argument('path', help='the pack to check')
+    args = parser.parse_args(argv)
+
+    if args.command == 'export':
+        pack = export(importlib.import_module(args.module).quests, name=args.module.rpartition('.')[2])
+        with open(args.path, 'w') as f:
+            json.dump(pack, f, indent=2, ensure_ascii=False)
+            f.write('\n')
+        print(f'Wrote {len(pack["quests"])} quests and {len(pack["enemies"])} enemies to {args.path}.')
+        return 0
+
+    try:
+        pack = load(args.path)
+    except ContentError as e:
+        print(e)
+        return 1
+    print(f'{args.path} is fine: {len(pack.quests)} quests and {len(pack.enemies)} enemies.')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,12 +1,101 @@
 import os
 import datetime
+import logging
+import time
 import uuid
 
 from pathlib import Path
-from peewee import Model, SqliteDatabase, UUIDField, CharField, DateTimeField, IntegerField
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from peewee import Case, Model, SqliteDatabase, UUIDField, CharField, DateTimeField, IntegerField
+
+from game import metrics
 
 project_root = Path(__file__).parent.parent.absolute()
-db = SqliteDatabase(os.path.join(project_root, 'game.db'))
+
+logger = logging.getLogger(__name__)
+
+# connection profiles for the sqlite database, selectable with GAME_DB_PROFILE or `configure_db()`
+#   wal:     readers don't block the writer, and commits don't wait on a full fsync
+#   default: plain sqlite settings, a rollback journal and a full fsync on every commit
+#   memory:  nothing touches the disk, for tests and benchmarks. shared between threads, gone at exit.
+DB_PROFILES = {
+    'wal': {
+        'pragmas': {
+            'journal_mode': 'wal',
+            'synchronous': 'normal',
+            'cache_size': -64 * 1024,  # in KiB when negative, so 64MiB
+            'mmap_size': 256 * 1024 * 1024,
+            'temp_store': 'memory',
+        },
+        'timeout': 5,
+    },
+    'default': {
+        'pragmas': {},
+        'timeout': 5,
+    },
+    'memory': {
+        'path': 'file:game?mode=memory&cache=shared',
+        'uri': True,
+        'pragmas': {
+            'journal_mode': 'memory',
+            'synchronous': 'off',
+            'cache_size': -64 * 1024,
+            'temp_store': 'memory',
+        },
+        'timeout': 5,
+    },
+}
+DEFAULT_DB_PROFILE = 'wal'
+DEFAULT_DB_PATH = os.path.join(project_root, 'game.db')
+
+# the most bound parameters one statement can have on any sqlite still around (newer ones allow 32766)
+MAX_VARIABLES = 999
+
+
+class GameDatabase(SqliteDatabase):
+    """A sqlite database that counts and times the statements and commits run on it, see `game.metrics`."""
+    def execute_sql(self, sql, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return super().execute_sql(sql, *args, **kwargs)
+        finally:
+            metrics.DB_QUERY_SECONDS.observe(time.perf_counter() - start)
+            metrics.DB_QUERIES.inc(sql.partition(' ')[0].upper())
+
+    def commit(self):
+        start = time.perf_counter()
+        try:
+            return super().commit()
+        finally:
+            metrics.DB_COMMIT_SECONDS.observe(time.perf_counter() - start)
+
+
+db = GameDatabase(None)
+
+
+def configure_db(path: str = None, profile: str = None) -> SqliteDatabase:
+    """ Point the global `db` at a database file using one of the `DB_PROFILES`.
+
+    Any open connection is closed first. Arguments left out are read from the environment
+    (GAME_DB_PATH and GAME_DB_PROFILE), and fall back to `game.db` in the project root with the wal profile.
+
+    Args:
+        path: the path to the database file. ignored by profiles that bring their own (memory).
+        profile: the name of the profile in `DB_PROFILES` to use.
+    """
+    profile = profile or os.environ.get('GAME_DB_PROFILE') or DEFAULT_DB_PROFILE
+    try:
+        settings = dict(DB_PROFILES[profile])
+    except KeyError:
+        raise ValueError(f'Unknown database profile "{profile}", expected one of: {", ".join(DB_PROFILES)}')
+    path = settings.pop('path', None) or path or os.environ.get('GAME_DB_PATH') or DEFAULT_DB_PATH
+    db.init(path, uri=settings.pop('uri', False), **settings)
+    logger.debug(f'Using database {path} with the {profile} profile.')
+    return db
+
+
+configure_db()
 
 
 class GameModel(Model):
@@ -18,7 +107,7 @@ class GameModel(Model):
 
 class Hero(Model):
     name = CharField(null=False, unique=True)
-    xp = IntegerField(null=False, default=0)
+    xp = IntegerField(null=False, default=0, index=True)
     hp = IntegerField(null=False)
     join_date = DateTimeField(default=datetime.datetime.utcnow())
     discord_client_id = CharField(null=True, unique=True)
@@ -31,18 +120,169 @@ class Hero(Model):
 
 
 class Game(Model):
+    # one row per game session, see `game.sessions`
+    key = CharField(null=False, unique=True, default='default')
     current_quest = IntegerField(null=False, default=0)
 
     class Meta:
         database = db
 
     def __str__(self):
-        return self.name
+        return self.key
+
+
+class HeroWriteBehind(object):
+    """ Collects changes to Heroes in memory and writes them out in batches.
+
+    Instead of calling `hero.save()` after every action, mark the fields that changed. Pending changes are
+    flushed in a single transaction once `max_pending` heroes are dirty, once `max_delay` seconds have passed
+    since the oldest pending change, or when `flush()` is called directly (e.g. at shutdown). `max_delay` is checked
+    as changes are marked, so a game that has gone quiet relies on `SessionManager.start_flushing()` to write out
+    its last changes.
+
+    Heroes handed out while they have pending changes are the same instances that hold those changes (see
+    `pending()`), so reads through the engine always see the latest values.
+
+    A flush is one UPDATE statement, using a CASE on the hero's id for each changed field, so writing out 200
+    heroes costs about the same as writing one. Counters (`ADDITIVE`) of heroes passed to `loaded()` are written as
+    what changed since they were loaded or last written, `xp = xp + ?`, so processes playing the same heroes add to
+    each other's changes rather than overwriting them. Their in-memory heroes only see their own changes until the
+    heroes are next loaded.
+
+    Args:
+        database: the database to write to
+        max_pending: flush once this many heroes have pending changes
+        max_delay: flush once the oldest pending change is this many seconds old
+    """
+    ADDITIVE = frozenset({'hp', 'xp'})
+
+    def __init__(self, database: SqliteDatabase = db, max_pending: int = 50, max_delay: float = 5.0):
+        self.db = database
+        self.max_pending = max_pending
+        self.max_delay = max_delay
+        self._dirty: Dict[int, Tuple[Hero, Set[str]]] = {}
+        self._oldest: Optional[float] = None
+        # the counters of each hero as the database had them, when loaded or last written by this process
+        self._saved: Dict[int, Dict[str, int]] = {}
+
+    def __len__(self):
+        return len(self._dirty)
+
+    def loaded(self, hero: Hero) -> None:
+        """ Note a hero fresh from the database, so its counters are written as changes from here on.
+
+        Args:
+            hero: the hero, before any change is made to it
+        """
+        self._saved[hero.id] = {f: getattr(hero, f) for f in self.ADDITIVE}
+
+    def mark(self, hero: Hero, *fields: str, defer: bool = False) -> None:
+        """ Mark fields on a hero as changed.
+
+        Args:
+            hero: the hero that changed
+            fields: the names of the fields that changed
+            defer: don't flush, even if it's due, because the caller is about to (e.g. a batch of xp awards)
+        """
+        if hero.id is None:
+            # never saved, nothing to batch against
+            hero.save()
+            return
+        _, dirty_fields = self._dirty.setdefault(hero.id, (hero, set()))
+        dirty_fields.update(fields)
+        if self._oldest is None:
+            self._oldest = time.monotonic()
+        if not defer and self.due():
+            self.flush()
+
+    def due(self) -> bool:
+        """Whether the pending changes should be written out now."""
+        if not self._dirty:
+            return False
+        return len(self._dirty) >= self.max_pending or time.monotonic() - self._oldest >= self.max_delay
+
+    def pending(self, hero_id: int) -> Optional[Hero]:
+        """ Get the in-memory hero holding pending changes, if there is one.
+
+        Args:
+            hero_id: the id of the hero
+        """
+        entry = self._dirty.get(hero_id)
+        return entry[0] if entry else None
+
+    def heroes(self) -> Iterable[Hero]:
+        """The heroes that currently have pending changes."""
+        return [hero for hero, _ in self._dirty.values()]
+
+    def flush(self) -> int:
+        """ Write every pending change in one transaction.
+
+        Returns:
+            the number of heroes written
+        """
+        if not self._dirty:
+            return 0
+        with self.db.atomic():
+            for batch in self._batches():
+                self._update(batch)
+        for hero, fields in self._dirty.values():
+            saved = self._saved.get(hero.id)
+            if saved is not None:
+                saved.update((f, getattr(hero, f)) for f in fields & self.ADDITIVE)
+        count = len(self._dirty)
+        self._dirty, self._oldest = {}, None
+        logger.debug(f'Flushed {count} heroes.')
+        return count
+
+    def _batches(self) -> Iterable[List[Tuple[Hero, Set[str]]]]:
+        # each hero takes an id in the WHERE, and an id and a value in the CASE of every field that changed
+        batch, variables = [], 0
+        for hero, fields in self._dirty.values():
+            needed = 1 + 2 * len(fields)
+            if batch and variables + needed > MAX_VARIABLES:
+                yield batch
+                batch, variables = [], 0
+            batch.append((hero, fields))
+            variables += needed
+        if batch:
+            yield batch
+
+    def _update(self, batch: List[Tuple[Hero, Set[str]]]) -> None:
+        # UPDATE hero SET xp = CASE id WHEN ? THEN xp + ? ... ELSE xp END, ... WHERE id IN (...)
+        cases: Dict[str, list] = {}
+        for hero, fields in batch:
+            saved = self._saved.get(hero.id)
+            for f in fields:
+                value = getattr(hero, f)
+                if saved is not None and f in saved:
+                    value = Hero._meta.fields[f] + (value - saved[f])
+                cases.setdefault(f, []).append((hero.id, value))
+        update = {}
+        for f, values in cases.items():
+            field = Hero._meta.fields[f]
+            update[field] = Case(Hero.id, values, field)
+        Hero.update(update).where(Hero.id.in_([hero.id for hero, _ in batch])).execute()
+
+
+def create_tables() -> None:
+    """Create any game tables that don't exist yet, and add any columns missing from older ones."""
+    db.create_tables([Hero], safe=True)
+
+    # games from before sessions existed become the 'default' session
+    table = Game._meta.table_name
+    if db.table_exists(table) and 'key' not in [c.name for c in db.get_columns(table)]:
+        logger.info('Adding the session key to the game table.')
+        from playhouse.migrate import SqliteMigrator, migrate
+        migrator = SqliteMigrator(db)
+        with db.atomic():
+            migrate(migrator.add_column(table, 'key', Game.key))
+
+    db.create_tables([Game], safe=True)
 
 
 if __name__ == '__main__':
+    # GAME_DB_PATH/GAME_DB_PROFILE pick the database, same as main.py
     print('Making table.')
     db.connect()
-    db.create_tables([Hero], safe=True)
-    db.create_tables([Game], safe=True)
+    create_tables()
     print('Done.')
@@ -1,22 +1,51 @@
-from collections import defaultdict
-from typing import Optional, List, Tuple
+from typing import TYPE_CHECKING, Dict, NamedTuple, Optional, List, Tuple
 
-from game.database import Hero
 from game.util import MarkdownStyle, wrap, ElementalDamageType, elemental_weakness_for
 
+if TYPE_CHECKING:
+    from game.database import Hero
+
+
+class EnemyTemplate(NamedTuple):
+    """ What a kind of foe is like. Every enemy of the kind shares one of these and it never changes.
+
+    Args:
+        name: what the foe is called
+        hp: how many hit points it starts with
+        xp: how much xp is shared out when it dies
+        kind: the element it resists, if any
+    """
+    name: str
+    hp: int = 1
+    xp: int = 3
+    kind: Optional[ElementalDamageType] = None
+
+    def __str__(self):
+        return f'{wrap(self.name, w=Enemy.fancy.value)} [hp: {self.hp}]'
+
+    @property
+    def max_hp(self) -> int:
+        return self.hp
+
+    @property
+    def xp_when_killed(self) -> int:
+        return self.xp
+
+    def clone(self) -> 'Enemy':
+        """A new foe of this kind, at full health."""
+        return Enemy(self)
+
 
 class Enemy(object):
-    """A foe to """
+    """A foe to fight. Only its hp and who hit it are its own, the rest comes from its template."""
+    __slots__ = ('template', 'hp', '_hitmap')
     fancy = MarkdownStyle.BOLD
 
-    def __init__(self, name, hp=1, xp=3, kind: Optional[ElementalDamageType] = None):
-        super().__init__()
-        self.name = name
-        self.max_hp = hp
-        self.hp = self.max_hp
-        self.xp_when_killed = xp
-        self._hitmap = defaultdict(int)
-        self.kind = kind
+    def __init__(self, template: EnemyTemplate):
+        self.template = template
+        self.hp = template.hp
+        # most foes die to one hero, or not at all, so don't pay for this until something hits them
+        self._hitmap: Optional[Dict['Hero', int]] = None
 
     def __str__(self):
         return f'{wrap(self.name, w=self.fancy.value)} [hp: {self.hp}]'
@@ -24,48 +53,68 @@ class Enemy(object):
     def __repr__(self):
         return self.__str__()
 
+    @property
+    def name(self) -> str:
+        return self.template.name
+
+    @property
+    def max_hp(self) -> int:
+        return self.template.hp
+
+    @property
+    def xp_when_killed(self) -> int:
+        return self.template.xp
+
+    @property
+    def kind(self) -> Optional[ElementalDamageType]:
+        return self.template.kind
+
     def clone(self):
-        return self.__class__(
-            name=self.name,
-            hp=self.max_hp,
-            xp=self.xp_when_killed,
-            kind=self.kind)
+        return self.__class__(self.template)
+
+    def _hit(self, player, damage_amount: int):
+        if self._hitmap is None:
+            self._hitmap = {}
+        self._hitmap[player] = self._hitmap.get(player, 0) + damage_amount
 
     def wound(self, player=None, damage_type: ElementalDamageType = None):
         that_really_hurt = False
         not_a_scratch = False
 
         damage_amount = 1
+        kind = self.template.kind
 
         # process weakness
-        if damage_type and damage_type == elemental_weakness_for(self.kind):
+        if damage_type and damage_type == elemental_weakness_for(kind):
             that_really_hurt = True
             damage_amount += 1
 
         # process resistance
-        if damage_type and damage_type == self.kind:
+        if damage_type and damage_type == kind:
             not_a_scratch = True
             damage_amount -= 1
 
         self.hp -= max(damage_amount, 0)
 
         if player:
-            self._hitmap[player] += damage_amount
+            self._hit(player, damage_amount)
 
         return that_really_hurt, not_a_scratch
 
     def kill(self, player=None):
         if player:
-            self._hitmap[player] += max(self.hp, 0)
+            self._hit(player, max(self.hp, 0))
         self.hp = 0
 
     def heal(self):
-        self.hp = self.max_hp
+        self.hp = self.template.hp
 
     @property
     def dead(self):
         return self.hp <= 0
 
-    def award_xp(self) -> List[Tuple[Hero, int]]:
+    def award_xp(self) -> List[Tuple['Hero', int]]:
+        if not self._hitmap:
+            return []
         participation_count = len(self._hitmap.keys())
         return list(map(lambda p: (p[0], int(self.xp_when_killed/participation_count)), self._hitmap.items()))
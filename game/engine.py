@@ -1,12 +1,23 @@
+import asyncio
+import datetime
+import json
 import logging
 import random
-from copy import copy
-from typing import Optional, Union, List, Any
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Union, List, Any, Callable, Dict, Iterable, Tuple
 
-from game.database import db, Hero, Game
+from peewee import SQL, Select, Value, fn
+
+from game import metrics
+from game.combat import CombatProfile, CombatTable, ENEMY_APPEAR_CHANCE, ENEMY_HIT_CHANCE
+from game.commands import CommandRouter, default_commands
+from game.database import db, Hero, Game, HeroWriteBehind
 from game.enemy import Enemy
 from game.events import FightResultEvent, SearchResultEvent, GameEvent, GameEventType, HeroEvent, GameMultiEvent
 from game.exceptions import AlreadyOnQuest
+from game.journal import Journal
+from game.leaderboard import Leaderboard
 from game.quests import Quest
 from game.util import ElementalDamageType
 
@@ -16,15 +27,43 @@ logger = logging.getLogger(__name__)
 
 class Engine(object):
     XP_FOR_SEARCHING = 1
+    SCORES_PER_PAGE = 10
+
+    # every engine does its work on this one thread, away from the client's event loop. one thread keeps the
+    # game state changes, and the database writes that go with them, in the order the events came in.
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='engine')
 
-    def __init__(self, quests=None):
+    def __init__(self, quests=None, session_key: str = 'default',
+                 hero_writes: HeroWriteBehind = None, leaderboard: Leaderboard = None,
+                 combat_profiles: Dict[Optional[ElementalDamageType], CombatProfile] = None,
+                 journal: Journal = None, commands: CommandRouter = None, hero_map: Dict[int, Hero] = None):
         self.db = db
+        self.session_key = session_key
+        # these have a length, so an empty shared one is falsy and `or` would quietly replace it
+        self.hero_writes = hero_writes if hero_writes is not None else HeroWriteBehind(self.db)
+        self.leaderboard = leaderboard if leaderboard is not None else Leaderboard()
+        # the one instance of each hero loaded so far, by id. changes are marked on the instance, so two copies of
+        # a hero would each hold some of them
+        self.hero_map = hero_map if hero_map is not None else {}
         self.heroes = []
         self.quests = quests
         self.current_quest: Optional[Quest] = None
         self.current_enemy: Optional[Enemy] = None
+        self.quest_index: Optional[int] = None
         self.game_engine = None
 
+        # all of the engine's dice come from here, so a journaled event can be replayed with its seed
+        self.random = random.Random()
+        self.journal = journal
+
+        # attacks are rolled from a compiled table, quests with their own combat profiles get their own table
+        self.base_combat = CombatTable(combat_profiles)
+        self.combat = self.base_combat
+        self._quest_combat: Dict[int, CombatTable] = {}
+
+        # town commands, which extensions can add to
+        self.commands = commands if commands is not None else default_commands()
+
     def get_hero(self, name: str, discord_client_id: str = None):
         """ Add a hero to the engine.
 
@@ -35,12 +74,68 @@ class Engine(object):
         h, created = Hero.get_or_create(name=name,
                                         discord_client_id=discord_client_id,
                                         defaults={'hp': 20})
+        h = self._known(h)
         if created:
             logger.info(f'New hero: {h}, ID: {h.id}')
         else:
             logger.debug(f'Existing hero: {h}, ID: {h.id}')
         return h
 
+    def get_heroes(self, members: Iterable[Tuple[str, str]]) -> Dict[str, Hero]:
+        """ Add a whole roster of heroes to the engine at once, e.g. everyone with the Hero role in a guild.
+
+        Heroes already in the database are loaded with one query, and the rest are made with one insert, instead
+        of a `get_hero()` round trip for every member.
+
+        Args:
+            members: the name and Discord id of each hero
+
+        Returns:
+            each hero, by Discord id
+        """
+        names = {discord_client_id: name for name, discord_client_id in members}
+        heroes: Dict[str, Hero] = {}
+        # join_date is left out, parsing 50k datetimes would take longer than everything else put together
+        fields = (Hero.id, Hero.name, Hero.xp, Hero.hp, Hero.discord_client_id)
+
+        def load(ids: List[str]):
+            # the ids go in as one json parameter, so it's one statement however many there are
+            in_ids = Select((fn.json_each(json.dumps(ids)),), (SQL('value'),))
+            for h in Hero.select(*fields).where(Hero.discord_client_id.in_(in_ids)):
+                heroes[h.discord_client_id] = h
+
+        with db.atomic():
+            load(list(names))
+            missing = [i for i in names if i not in heroes]
+            if missing:
+                # a new member can't take a name another hero already has, same as `get_hero()` couldn't
+                # each member goes in as [discord id, name]
+                member = SQL('value')
+                rows = Select((fn.json_each(json.dumps([[i, names[i]] for i in missing])),),
+                              (fn.json_extract(member, '$[1]'), fn.json_extract(member, '$[0]'), Value(0), Value(20),
+                               Value(Hero.join_date.db_value(datetime.datetime.utcnow()))))
+                (Hero.insert_from(rows, [Hero.name, Hero.discord_client_id, Hero.xp, Hero.hp, Hero.join_date])
+                 .on_conflict_ignore()
+                 .execute())
+                load(missing)
+        if missing:
+            logger.info(f'{len(missing)} new heroes, {len(heroes)} in all.')
+        for discord_client_id in names.keys() - heroes.keys():
+            logger.warning(f'Could not add hero {names[discord_client_id]} ({discord_client_id}), '
+                           f'the name is taken.')
+        return {i: self._known(h) for i, h in heroes.items()}
+
+    def _known(self, hero: Hero) -> Hero:
+        # the instance already handed out for this hero, if there is one, else this one from now on
+        known = self.hero_map.get(hero.id)
+        if known is None:
+            known = self.hero_writes.pending(hero.id)
+            if known is None:
+                known = hero
+                self.hero_writes.loaded(hero)
+            self.hero_map[hero.id] = known
+        return known
+
     def start_quest(self, quest: Quest = None) -> GameEvent:
         """ Start a quest.
 
@@ -50,34 +145,43 @@ class Engine(object):
         if self.current_quest:
             raise AlreadyOnQuest(f'You are already on quest {self.current_quest}')
         try:
-            game, created = Game.get_or_create()
+            game, created = Game.get_or_create(key=self.session_key)
             if game.current_quest is not None:
-                self.current_quest = self.quests[game.current_quest]
+                # quests are templates shared between sessions, play a copy
+                self.current_quest = self.quests[game.current_quest].clone()
+                self.quest_index = game.current_quest
+                self.combat = self._combat_for(game.current_quest)
         except IndexError:
             # no more quests
             return GameEvent(GameEventType.NOOP)
-        self.current_quest.area.populate()
         return GameEvent(GameEventType.QUEST_START, context=self.current_quest)
 
+    def replace_quests(self, quests: List[Quest]) -> None:
+        """ Play new quest templates from now on, e.g. reloaded content. Only call this on the engine thread.
+
+        The quest in progress, and its enemy, carry on as they are. The next quest started comes from the new ones.
+
+        Args:
+            quests: the new templates, indexed the same way as the old ones
+        """
+        self._quest_combat = {}
+        self.quests = quests
+
+    def _combat_for(self, quest_index: int) -> CombatTable:
+        """The combat table for a quest, compiled the first time it's needed."""
+        quest = self.quests[quest_index]
+        if not quest.combat_profiles:
+            return self.base_combat
+        if quest_index not in self._quest_combat:
+            self._quest_combat[quest_index] = CombatTable(self.base_combat.profiles, quest.combat_profiles)
+        return self._quest_combat[quest_index]
+
     def fight(self, hero: Hero, damage_type: ElementalDamageType = None,
               force_hit: bool = False, force_crit: bool = False,
               opportunity: bool = False, client_context: Any = None) -> Union[FightResultEvent, GameMultiEvent]:
         """A hero fights the current enemy"""
-        fight_method_for = {
-            None: self._fight_normal,
-            ElementalDamageType.FIRE: self._fight_fire,
-            ElementalDamageType.ICE: self._fight_ice,
-            ElementalDamageType.WATER: self._fight_water,
-            ElementalDamageType.LIGHTNING: self._fight_lightning,
-            ElementalDamageType.EARTH: self._fight_earth,
-            ElementalDamageType.WIND: self._fight_wind,
-        }
-
         # hero turn
-        try:
-            verb,  hit, crit = fight_method_for[damage_type]()
-        except KeyError:
-            verb, hit, crit = self._fight_normal()
+        verb, hit, crit = self.combat.roll(damage_type, self.random)
 
         crit = hit and crit  # don't allow non-hits to crit
 
@@ -90,11 +194,11 @@ class Engine(object):
         # enemy turn
         got_hit = False
         if not opportunity:
-            if random.choice([True, False, False]):
+            if self.random.random() < ENEMY_HIT_CHANCE:
                 # you get hit
                 got_hit = True
                 hero.hp -= 1
-                hero.save()
+                self.hero_writes.mark(hero, 'hp')
 
         fight_event = FightResultEvent(hero.hp, self.current_enemy.hp, verb=verb,
                                        hit=hit, crit=crit, weak=weak,
@@ -108,44 +212,6 @@ class Engine(object):
         events.insert(0, fight_event)
         return GameMultiEvent(events=events)
 
-    def _fight_normal(self):
-        verb = random.choice(['swings at', 'stabs', 'smashes', 'gouges', 'stomps'])
-        hit = random.choice([True, False])
-        crit = random.choice([True, False, False, False])
-        return verb, hit, crit
-
-    def _fight_fire(self):
-        verb = random.choice(['scorches', 'torches', 'carbonizes'])
-        hit = True
-        crit = random.choice([True, False, False, False, False, False, False])
-        return verb, hit, crit
-
-    def _fight_ice(self):
-        verb = random.choice((['freezes', 'ices', 'chills']))
-        hit = random.choice([True, False, False])
-        crit = random.choice([True, False])
-        return verb, hit, crit
-
-    def _fight_water(self):
-        _, hit, crit = self._fight_normal()
-        verb = random.choice(['drowns', 'submerges'])
-        return verb, hit, crit
-
-    def _fight_lightning(self):
-        _, hit, crit = self._fight_normal()
-        verb = random.choice(['zaps', 'electrocutes'])
-        return verb, hit, crit
-
-    def _fight_earth(self):
-        _, hit, crit = self._fight_normal()
-        verb = random.choice(['throws a boulder at', 'chucks a sharp rock at'])
-        return verb, hit, crit
-
-    def _fight_wind(self):
-        _, hit, crit = self._fight_normal()
-        verb = random.choice(['channels a gust of wind at', 'summons a tornado on top of'])
-        return verb, hit, crit
-
     def search(self, hero: Hero, client_context: Any = None) -> GameMultiEvent:
         """ Search for clues
 
@@ -156,12 +222,13 @@ class Engine(object):
         search_result = SearchResultEvent(hero=hero, context=client_context)
         fight_result, appear_event, boss_event = None, None, None
         if self.current_quest:
-            if any(self.current_quest.area.enemies) or not self.current_quest.area.boss.dead:
-                if random.choice([False, True, True]):
-                    if any(self.current_quest.area.enemies):
+            area = self.current_quest.area
+            if area.has_enemies or not area.boss.dead:
+                if self.random.random() < ENEMY_APPEAR_CHANCE:
+                    if area.has_enemies:
                         # a monster appears!
                         search_result.found_enemy = True
-                        self.current_enemy = self.current_enemy or self.current_quest.area.enemies.pop()
+                        self.current_enemy = self.current_enemy or area.next_enemy(self.random)
                         appear_event = GameEvent(GameEventType.ENEMY_APPEAR,
                                                  context=self.current_enemy,
                                                  message=f'{self.current_enemy} appears')
@@ -169,10 +236,10 @@ class Engine(object):
                                                   opportunity=True,
                                                   client_context=client_context)  # player gets an attack of opportunity
                         fight_result.message = f'{hero} gets an attack of opportunity on {self.current_enemy}'
-                    elif not self.current_quest.area.boss.dead:
+                    elif not area.boss.dead:
                         # the boss appears!
                         search_result.found_enemy = True
-                        self.current_enemy = self.current_quest.area.boss
+                        self.current_enemy = area.boss
                         boss_event = GameEvent(GameEventType.BOSS_APPEAR, context=self.current_enemy)
                         fight_result = self.fight(hero, opportunity=True, client_context=client_context)
                         fight_result.message = f'{hero} gets an attack of opportunity on {self.current_enemy}'
@@ -182,8 +249,7 @@ class Engine(object):
                         pass
 
         # just get search xp
-        hero.xp += self.XP_FOR_SEARCHING
-        hero.save()
+        self.give_xp(hero, self.XP_FOR_SEARCHING)
 
         # tie up the events that happened
         events = [search_result]
@@ -200,21 +266,31 @@ class Engine(object):
         """ Check the game state and clean up anything that needs to be reset.
         """
         events = []
+        killed = self.current_enemy.dead
 
         # slain enemy, award xp
-        if self.current_enemy.dead:
+        if killed:
             events.extend(self.award_enemy_xp(self.current_enemy))
             self.current_enemy = None
 
         # completed quest, award xp
         if self.current_quest.complete:
             events.append(GameEvent(GameEventType.QUEST_COMPLETE, context=self.current_quest))
-            for p in self.current_quest.players_participated:
-                events.append(self.award_quest_xp(p, self.current_quest))
+            # a set of heroes iterates in a different order in every process, so awards go out by name (ids can
+            # differ in a replay's database) and replay the same
+            participants = sorted(self.current_quest.players_participated, key=lambda h: h.name)
+            events.extend(self.award_quest_xp(participants, self.current_quest))
             self.current_quest = None
-            game, created = Game.get_or_create()
-            game.current_quest = game.current_quest + 1
-            game.save()
+            # moving on to the next quest and writing out what everyone earned for this one happen together, so a
+            # crash can't skip the quest without the xp for it, or award the xp twice
+            with self.db.atomic():
+                game, created = Game.get_or_create(key=self.session_key)
+                game.current_quest = game.current_quest + 1
+                game.save()
+                self.hero_writes.flush()
+        elif killed and self.hero_writes.due():
+            # the awards were held back so that however many heroes shared the kill, it's one statement
+            self.hero_writes.flush()
 
         return events
 
@@ -228,52 +304,115 @@ class Engine(object):
         """
         events = []
         for hero, xp_gained in enemy.award_xp():
-            hero.xp += xp_gained
-            hero.save()
+            self.give_xp(hero, xp_gained, defer=True)
             events.append(HeroEvent(GameEventType.ENEMY_XP,
                                     hero=hero,
                                     context=(xp_gained, enemy)))
             self.current_quest.players_participated.add(hero)
         return events
 
-    def award_quest_xp(self, hero: Hero, quest: Quest) -> HeroEvent:
+    def award_quest_xp(self, heroes: Iterable[Hero], quest: Quest) -> List[HeroEvent]:
         """ Award xp for the completion of a quest.
 
         Args:
-            hero: the hero to award xp to
+            heroes: the heroes to award xp to
             quest: the quest completed
         """
         amt = quest.xp_upon_completion
-        hero.xp += amt
-        hero.save()
-        return HeroEvent(GameEventType.QUEST_XP, hero=hero, context=(amt, quest))
+        events = []
+        for hero in heroes:
+            self.give_xp(hero, amt, defer=True)
+            events.append(HeroEvent(GameEventType.QUEST_XP, hero=hero, context=(amt, quest)))
+        return events
+
+    def give_xp(self, hero: Hero, amount: int, defer: bool = False) -> None:
+        """ Give a hero xp, keeping the leaderboard current.
 
-    def score(self) -> GameEvent:
-        scores = [(str(h), h.xp) for h in Hero.select().where(Hero.xp > 0).order_by(Hero.xp.desc())]
+        Args:
+            hero: the hero to give xp to
+            amount: how much xp to give
+            defer: leave writing it out to the caller, see `HeroWriteBehind.mark()`
+        """
+        hero.xp += amount
+        self.hero_writes.mark(hero, 'xp', defer=defer)
+        self.leaderboard.update(hero)
+
+    def flush(self) -> None:
+        """Write any pending hero changes to the database."""
+        self.hero_writes.flush()
+
+    def _load_leaderboard(self) -> None:
+        self.leaderboard.load()
+        # the database doesn't have the xp that hasn't been written yet
+        for hero in self.hero_writes.heroes():
+            self.leaderboard.update(hero)
+
+    def score(self, page: int = 1) -> GameEvent:
+        """ Get a page of the high scores.
+
+        Args:
+            page: which page of scores to get, starting at 1
+        """
+        if not self.leaderboard.loaded:
+            self._load_leaderboard()
+        scores = self.leaderboard.top(self.SCORES_PER_PAGE, offset=(max(page, 1) - 1) * self.SCORES_PER_PAGE)
         return GameEvent(GameEventType.SCORE, context=scores)
 
+    def rank(self, hero: Hero) -> HeroEvent:
+        """ Get a hero's place on the leaderboard.
+
+        Args:
+            hero: the hero to rank
+        """
+        if not self.leaderboard.loaded:
+            self._load_leaderboard()
+        return HeroEvent(GameEventType.RANK, hero=hero, context=(self.leaderboard.rank(hero), hero.xp))
+
+    async def run_async(self, method: Callable, *args, **kwargs) -> Any:
+        """ Call an engine method on the engine thread, without blocking the event loop.
+
+        Args:
+            method: the method to call
+            args: positional arguments for the method
+            kwargs: keyword arguments for the method
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, lambda: method(*args, **kwargs))
+
+    async def process_event_async(self, event: GameEvent) -> GameEvent:
+        """ Process an event on the engine thread, without blocking the event loop.
+
+        Events are processed one at a time, in the order this is called.
+
+        Args:
+            event: the event to process
+        """
+        return await self.run_async(self.process_event, event)
+
     def process_event(self, event: GameEvent) -> GameEvent:
-        if event.type == GameEventType.SEARCH:
+        start = time.perf_counter()
+        try:
+            if self.journal is None:
+                return self._process_event(event)
             if isinstance(event, HeroEvent):
-                return self.search(event.hero, client_context=event.context)
-        elif event.type == GameEventType.FIGHT:
+                self.journal.saw(self.session_key, event.hero)
+            seed = self.journal.next_seed()
+            self.random.seed(seed)
+            result = self._process_event(event)
+            started = self.quest_index if result is not None and result.type is GameEventType.QUEST_START else None
+            self.journal.record(self.session_key, seed, event, result, quest_index=started)
+            return result
+        finally:
+            metrics.EVENT_SECONDS.observe(time.perf_counter() - start, event.type.name)
+
+    def _process_event(self, event: GameEvent) -> GameEvent:
+        if event.type in (GameEventType.SEARCH, GameEventType.FIGHT):
             if isinstance(event, HeroEvent):
-                return self.fight(event.hero, damage_type=event.augment, client_context=event.context)
+                # the client picks search or fight from what it last saw, which can be behind by a few events
+                if self.current_enemy:
+                    return self.fight(event.hero, damage_type=event.augment, client_context=event.context)
+                return self.search(event.hero, client_context=event.context)
         elif event.type == GameEventType.COMMAND:
-            if event.message == 'quest start':
-                try:
-                    return self.start_quest()
-                except AlreadyOnQuest:
-                    return GameEvent(GameEventType.QUEST_GET_CURRENT, context=self.current_quest)
-            elif event.message == 'quest':
-                return GameEvent(GameEventType.QUEST_GET_CURRENT, context=self.current_quest)
-            elif event.message == 'quest abandon':
-                quest_abandoned = copy(self.current_quest)
-                self.current_quest = None
-                return GameEvent(GameEventType.QUEST_ABANDON, context=quest_abandoned)
-            elif event.message == 'score':
-                return self.score()
-            else:
-                return GameEvent(GameEventType.NOOP)
+            return self.commands.dispatch(self, event)
         else:
             return GameEvent(GameEventType.NOOP)
@@ -1,5 +1,5 @@
 from enum import Enum
-from typing import Any, List
+from typing import Any, List, NamedTuple
 
 from game.database import Hero
 from game.objects import Location, GameObject
@@ -20,6 +20,8 @@ class GameEventType(Enum):
     BOSS_APPEAR = 12
     MULTI = 13
     SCORE = 14
+    RANK = 15
+    HELP = 16
 
 
 class GameEvent(object):
@@ -32,6 +34,8 @@ class GameEvent(object):
         context: the calling context of the event
         message: the string message of the event
     """
+    __slots__ = ('type', 'augment', 'location', 'message', 'context')
+
     def __init__(self, t: GameEventType,
                  location: Location = None,
                  augment: GameObject = None,
@@ -67,6 +71,8 @@ class GameMultiEvent(GameEvent):
     Contextually treat the event in timeline-order. That is, [0] is the first
     thing that happened, followed by [1].
     """
+    __slots__ = ('events',)
+
     def __init__(self, events: List[GameEvent]):
         super().__init__(GameEventType.MULTI)
         self.events = events
@@ -81,6 +87,8 @@ class HeroEvent(GameEvent):
     NOTE: This does not supply `engine` argument to the GameEvent,
           so you cannot use this event directly, it is essentially abstract.
     """
+    __slots__ = ('hero',)
+
     def __init__(self, t: GameEventType, hero: Hero, **kwargs):
         self.hero = hero
         super().__init__(t, **kwargs)
@@ -92,6 +100,8 @@ class SearchResultEvent(HeroEvent):
     Args:
         found_enemy: whether the hero found an enemy
     """
+    __slots__ = ('found_enemy',)
+
     def __init__(self, found_enemy: bool = False, **kwargs):
         super().__init__(GameEventType.SEARCH, **kwargs)
         self.found_enemy = found_enemy
@@ -106,19 +116,15 @@ class SearchResultEvent(HeroEvent):
 
 
 # TODO: maybe move this into contexts.py
-class EntityFightContext(object):
+class EntityFightContext(NamedTuple):
     """something happened to an entity during a fight. this is the aftermath
     """
-    def __init__(self, hp: int = None,
-                 hit: bool = False, crit: bool = False,
-                 weak: bool = False, strong: bool = False,
-                 context: Any = None):
-        self.hp = hp
-        self.hit = hit
-        self.crit = crit
-        self.weak = weak
-        self.strong = strong
-        self.context = context
+    hp: int = None
+    hit: bool = False
+    crit: bool = False
+    weak: bool = False
+    strong: bool = False
+    context: Any = None
 
 
 class FightResultEvent(HeroEvent):
@@ -138,6 +144,8 @@ class FightResultEvent(HeroEvent):
         hero_context: the client's context for the hero portion of the event
         enemy_context: the client's context for the enemy portion of the event
     """
+    __slots__ = ('verb', 'hero_result', 'enemy_result')
+
     def __init__(self, hp: int,
                  enemy_hp: int,
                  hit: bool = False,
@@ -150,13 +158,11 @@ class FightResultEvent(HeroEvent):
                  enemy_strong: bool = False,
                  **kwargs):
         self.verb = kwargs.pop('verb', 'hit')
-        self.hero_result = EntityFightContext(hp=hp, hit=hit, crit=crit, weak=weak, strong=strong,
-                                              context=kwargs.get('hero_context'))
-        self.enemy_result = EntityFightContext(hp=enemy_hp, hit=enemy_hit, crit=enemy_crit,
-                                               weak=enemy_weak, strong=enemy_strong,
-                                               context=kwargs.pop('enemy_context', None))
+        self.hero_result = EntityFightContext(hp, hit, crit, weak, strong, kwargs.pop('hero_context', None))
+        self.enemy_result = EntityFightContext(enemy_hp, enemy_hit, enemy_crit, enemy_weak, enemy_strong,
+                                               kwargs.pop('enemy_context', None))
         super().__init__(GameEventType.FIGHT, **kwargs)
 
     def __str__(self):
-        self.message = f'enemy={self.enemy_result.context.name}, hero={self.hero.name}'
-        return super().__str__()
+        s = f'{self.location.name}: ' if self.location else ''
+        return f'{s}e.{self.type.name}: enemy={self.enemy_result.context.name}, hero={self.hero.name}'
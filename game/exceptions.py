@@ -1,2 +1,18 @@
+from typing import List
+
+
 class AlreadyOnQuest(Exception):
     pass
+
+
+class ContentError(ValueError):
+    """ A content pack that can't be loaded.
+
+    Args:
+        source: where the pack came from
+        problems: everything wrong with it, each starting with where in the pack it is
+    """
+    def __init__(self, source: str, problems: List[str]):
+        self.source = source
+        self.problems = problems
+        super().__init__(f'{source} has {len(problems)} problem(s):\n  ' + '\n  '.join(problems))
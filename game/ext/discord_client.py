@@ -1,18 +1,22 @@
 import logging
 import random
+import time
 
 from collections import namedtuple
 from enum import Enum
 from queue import Queue
-from typing import Optional, Dict
+from typing import Optional, Dict, Iterable, Iterator, List, Tuple
 
 from discord import Embed, Colour
 
-from game import events
+from game import events, metrics
 from game.database import Hero, Game
 from game.client import GameClient
+from game.ingest import IngestQueue, OverflowPolicy
+from game.sessions import Session, SessionManager
 from game.util import wrap, ElementalDamageType, MarkdownStyle
 from game.objects import Location
+from game.wire import HeroView
 
 # noinspection PyPackageRequirements
 import discord
@@ -52,11 +56,106 @@ emojis = [
     emoji(str='⛰', enum=ElementalDamageType.EARTH, discord=b'\xe2\x9b\xb0\xef\xb8\x8f'),
     emoji(str='🌪️', enum=ElementalDamageType.WIND, discord=b'\xf0\x9f\x8c\xaa\xef\xb8\x8f')
 ]
+# what a wilderness message has to be, exactly, to attack with an element
+emoji_augments: Dict[str, ElementalDamageType] = {e.discord.decode('utf-8'): e.enum for e in emojis}
+
+# what a session needs to know about the guild it is played in. hero_ids are the ids of the members with the
+# hero role, kept current by the member events so messages don't have to search the role's member list.
+guild_context = namedtuple('guild_context', ['guild', 'hero_role', 'hero_ids'])
 
 
 logger = logging.getLogger(__name__)
 
 
+class Outbox(object):
+    """ Everything a batch of events has to say, sent in as few Discord API calls as it can be.
+
+    Lines for the same channel are joined into one message, with the embeds said after them attached to it.
+    Discord shows a message's embeds below its text, so a line said after an embed starts a new message, and
+    everything reads in the order it was said. Messages are otherwise only split where Discord's limits make them.
+    Reactions are sent once per emoji per message.
+    """
+    MAX_CONTENT = 2000
+    MAX_EMBEDS = 10
+
+    def __init__(self):
+        # each channel's messages so far, as their lines and the embeds below them
+        self.channels: Dict[discord.abc.Messageable, List[Tuple[List[str], List[Embed]]]] = {}
+        self.reactions: Dict[discord.Message, List[str]] = {}
+
+    def say(self, channel: discord.abc.Messageable, content: str = None, embed: Embed = None) -> None:
+        """ Add a line, an embed, or both, to what is sent to a channel.
+
+        Args:
+            channel: the channel to send to
+            content: a line of text
+            embed: an embed
+        """
+        messages = self.channels.setdefault(channel, [])
+        if content:
+            if not messages or messages[-1][1]:
+                # the text would show above the embeds already said
+                messages.append(([], []))
+            messages[-1][0].append(content)
+        if embed is not None:
+            if not messages:
+                messages.append(([], []))
+            messages[-1][1].append(embed)
+
+    def react(self, message: discord.Message, emoji: str) -> None:
+        """ Add a reaction to a message.
+
+        Args:
+            message: the message to react to
+            emoji: the emoji to react with
+        """
+        reactions = self.reactions.setdefault(message, [])
+        if emoji not in reactions:
+            reactions.append(emoji)
+
+    def messages(self) -> Iterator[Tuple[discord.abc.Messageable, Optional[str], List[Embed]]]:
+        """The messages to send, as (channel, content, embeds)."""
+        for channel, messages in self.channels.items():
+            for lines, embeds in messages:
+                yield from self._split(channel, lines, embeds)
+
+    def _split(self, channel: discord.abc.Messageable, lines: List[str],
+               embeds: List[Embed]) -> Iterator[Tuple[discord.abc.Messageable, Optional[str], List[Embed]]]:
+        chunks = []
+        for line in lines:
+            # a line too long for one message has to be cut up
+            for part in (line[i:i + self.MAX_CONTENT] for i in range(0, len(line), self.MAX_CONTENT)):
+                if chunks and len(chunks[-1]) + 1 + len(part) <= self.MAX_CONTENT:
+                    chunks[-1] += '\n' + part
+                else:
+                    chunks.append(part)
+        embed_groups = [embeds[i:i + self.MAX_EMBEDS] for i in range(0, len(embeds), self.MAX_EMBEDS)]
+
+        # embeds ride along with the last of the text
+        for content in chunks[:-1]:
+            yield channel, content, []
+        yield channel, chunks[-1] if chunks else None, embed_groups[0] if embed_groups else []
+        for group in embed_groups[1:]:
+            yield channel, None, group
+
+    async def send(self) -> int:
+        """ Send everything.
+
+        Returns:
+            how many API calls it took
+        """
+        calls = 0
+        for message, reactions in self.reactions.items():
+            for emoji in reactions:
+                await message.add_reaction(emoji)
+                calls += 1
+        for channel, content, embeds in self.messages():
+            if content or embeds:
+                await channel.send(content, embeds=embeds)
+                calls += 1
+        return calls
+
+
 class DiscordClient(GameClient, discord.Client):
     BOT_NAME = 'Dungeon Master'
     SERVER_NAME = 'A Professional Farmer'
@@ -64,14 +163,30 @@ class DiscordClient(GameClient, discord.Client):
     CHANNEL_WILDERNESS_NAME = 'wilderness'
     ROLE_NAME = 'Hero'
 
-    def __init__(self, **kwargs):
-        self.game_server: Optional[discord.Guild] = None
-        self.town: Optional[discord.TextChannel] = None
-        self.wilderness: Optional[discord.TextChannel] = None
-        self.hero_role: Optional[discord.Role] = None
+    def __init__(self, servers: Optional[Iterable[str]] = (SERVER_NAME,),
+                 queue_size: int = 256, queue_policy: OverflowPolicy = OverflowPolicy.MERGE_SEARCH,
+                 queue_workers: int = 4, **kwargs):
+        """ A Discord bot that runs a game in each server it is set up in.
+
+        A server is set up with a town channel, a wilderness channel and a Hero role. Each one plays its own game
+        session. `SERVER_NAME` plays the default session, so a single `engine` passed in is played there.
+
+        Messages are turned into events and queued, and worker tasks feed them to the engine and send the results.
+
+        Args:
+            servers: the names of the servers to play in, or None to play in every server that is set up
+            queue_size: how many events can wait for the engine
+            queue_policy: what to do with new events when that many are waiting
+            queue_workers: how many events can be worked on at once (one at a time per server)
+        """
+        self.servers = set(servers) if servers is not None else None
+        self.ingest = IngestQueue(self.absorb, maxsize=queue_size, policy=queue_policy, workers=queue_workers)
+
+        # Keep track of which member is which Hero, by member id
+        self.member_to_hero: Dict[int, Hero] = {}
 
-        # Keep track of which member is which Hero
-        self.member_to_hero: Dict[discord.Member, Hero] = {}
+        # embeds that only change when the commands do, built once each
+        self._help_embeds: Dict[Tuple[Tuple[str, str], ...], Embed] = {}
 
         bot_intents = discord.Intents.default()
         bot_intents.members = True
@@ -84,21 +199,151 @@ class DiscordClient(GameClient, discord.Client):
         GameClient.__init__(self, **kwargs)
         # super().__init__(**kwargs)
 
+    async def setup_hook(self):
+        """ Called once when the client is starting, before it connects.
+        """
+        if self.gateway:
+            await self.gateway.start()
+        self.ingest.start()
+        self.sessions.start_flushing()
+        if self.reloader:
+            self.reloader.start()
+        self.schedule_profiling_stop()
+
+    async def close(self):
+        await self.ingest.stop()
+        await self.sessions.stop_flushing()
+        if self.reloader:
+            await self.reloader.stop()
+        await self.stop_profiling()
+        if self.gateway:
+            await self.gateway.close()
+        await super().close()
+
     async def on_ready(self):
         """ Called when the discord client is ready to begin, all connections are established.
         """
         await self.user.edit(username=self.BOT_NAME)
-        self.game_server = next((g for g in self.guilds if g.name == self.SERVER_NAME), None)
-        if self.game_server:
-            self.town = next((ch for ch in self.game_server.channels if ch.name == self.CHANNEL_TOWN_NAME), None)
-            self.wilderness = next((ch for ch in self.game_server.channels if ch.name == self.CHANNEL_WILDERNESS_NAME), None)
-            self.hero_role = next((r for r in self.game_server.roles if r.name == self.ROLE_NAME), None)
-            if self.engine and self.town and self.wilderness:
-                # add hero players
-                for member in self.hero_role.members:
-                    logger.info(f'Getting Hero {member.name} for Discord member: {member} ({member.id})')
-                    new_hero = self.engine.get_hero(member.name, discord_client_id=str(member.id))
-                    self.member_to_hero[member] = new_hero
+        for guild in self.guilds:
+            if self.servers is None or guild.name in self.servers:
+                await self.open_session(guild)
+
+    async def on_guild_join(self, guild: discord.Guild):
+        """ Called when the bot is added to a guild, starts playing there if it's one of the servers to play in.
+        """
+        if self.servers is None or guild.name in self.servers:
+            await self.open_session(guild)
+
+    async def on_guild_remove(self, guild: discord.Guild):
+        """ Called when the bot is removed from a guild, or the guild is deleted. Stops the guild's session.
+        """
+        session = self._guild_session(guild)
+        if session:
+            # closing writes out the session's pending changes, which is database work for the engine thread
+            await session.engine.run_async(self.sessions.close, session.key)
+            logger.info(f'Stopped playing in {guild.name}.')
+
+    async def open_session(self, guild: discord.Guild) -> Optional[Session]:
+        """ Start playing the game in a guild, if it is set up for it.
+
+        Args:
+            guild: the guild to play in
+        """
+        town = next((ch for ch in guild.channels if ch.name == self.CHANNEL_TOWN_NAME), None)
+        wilderness = next((ch for ch in guild.channels if ch.name == self.CHANNEL_WILDERNESS_NAME), None)
+        hero_role = next((r for r in guild.roles if r.name == self.ROLE_NAME), None)
+        if not (town and wilderness and hero_role):
+            logger.info(f'Not playing in {guild.name}, it is not set up for the game.')
+            return None
+
+        session = self.sessions.open(self.session_key(guild))
+        session.town, session.wilderness = town, wilderness
+        session.context = guild_context(guild=guild, hero_role=hero_role,
+                                        hero_ids={member.id for member in hero_role.members})
+        self.sessions.bind(town.id, session, Location.TOWN)
+        self.sessions.bind(wilderness.id, session, Location.WILDERNESS)
+        logger.info(f'Playing session {session} in {guild.name}.')
+
+        # add hero players
+        members = hero_role.members
+        logger.info(f'Getting {len(members)} Heroes for {guild.name}.')
+        if self.gateway:
+            # the heroes themselves stay with the worker, the client only needs their names
+            await self.gateway.roster(session.key, [(member.name, str(member.id)) for member in members])
+            for member in members:
+                self.member_to_hero[member.id] = HeroView(member.name, str(member.id))
+            return session
+        heroes = await session.engine.run_async(session.engine.get_heroes,
+                                                [(member.name, str(member.id)) for member in members])
+        for member in members:
+            if str(member.id) in heroes:
+                self.member_to_hero[member.id] = heroes[str(member.id)]
+        return session
+
+    @staticmethod
+    def is_admin(member: discord.Member) -> bool:
+        """Whether a member can run admin commands, i.e. is an administrator of their server."""
+        permissions = getattr(member, 'guild_permissions', None)
+        return bool(permissions and permissions.administrator)
+
+    async def profile_command(self, command: str) -> str:
+        """ Run a profile admin command: `profile`, `profile start [spec]` or `profile stop`.
+
+        With a gateway, the engine isn't in this process and the commands only say so.
+
+        Args:
+            command: the command, as typed
+
+        Returns:
+            what to reply with
+        """
+        words = command.split(' ', 2)
+        action = words[1].lower() if len(words) > 1 else ''
+        if self.gateway and not self.profiler.active:
+            # events go straight to the workers, there's nothing here worth profiling
+            return 'The engine runs in its workers, so there is nothing here to profile.'
+        if action == 'start':
+            try:
+                # as typed, a directory's case matters
+                self.start_profiling(words[2] if len(words) > 2 else '')
+            except ValueError as e:
+                return f'Could not start profiling: {e}'
+            return f'Started {self.profiler}.'
+        elif action == 'stop':
+            paths = await self.stop_profiling()
+            return f'Wrote {", ".join(paths)}.' if paths else 'The profiler was not on.'
+        return f'{str(self.profiler).capitalize()}.'
+
+    def session_key(self, guild: discord.Guild) -> str:
+        """The session played in a guild."""
+        return SessionManager.DEFAULT_SESSION if guild.name == self.SERVER_NAME else str(guild.id)
+
+    def _guild_session(self, guild: discord.Guild) -> Optional[Session]:
+        session = self.sessions.get(self.session_key(guild))
+        return session if session and session.context else None
+
+    async def on_member_join(self, member: discord.Member):
+        """ Called when someone joins a guild. They may already have roles, if they were given them before.
+        """
+        await self.on_member_update(None, member)
+
+    async def on_member_update(self, before: Optional[discord.Member], after: discord.Member):
+        """ Called when a member changes, e.g. when they are given or lose the Hero role.
+        """
+        session = self._guild_session(after.guild)
+        if not session:
+            return
+        if session.context.hero_role in after.roles:
+            session.context.hero_ids.add(after.id)
+        else:
+            session.context.hero_ids.discard(after.id)
+
+    async def on_member_remove(self, member: discord.Member):
+        """ Called when someone leaves a guild.
+        """
+        session = self._guild_session(member.guild)
+        if session:
+            session.context.hero_ids.discard(member.id)
 
     async def on_message(self, message: discord.Message):
         """ Called when a message is sent in discord.
@@ -107,81 +352,110 @@ class DiscordClient(GameClient, discord.Client):
         if self.user == message.author:
             return
 
+        # only the town and wilderness of a game are played in
+        route = self.sessions.route(message.channel.id)
+        if not route:
+            return
+        session, location = route
+        engine = session.engine
+
+        if message.author.id not in session.context.hero_ids:
+            logger.debug(f'{message.author} is not a Hero, ignoring their message.')
+            return
         # add the hero to the engine if they are not already
-        if message.channel in (self.wilderness, self.town):
-            if message.author in self.hero_role.members and message.author not in self.member_to_hero.keys():
-                new_hero = self.engine.get_hero(message.author.name, discord_client_id=str(message.author.id))
-                self.member_to_hero[message.author] = new_hero
+        hero = self.member_to_hero.get(message.author.id)
+        if hero is None and self.gateway:
+            hero = HeroView(message.author.name, str(message.author.id))
+            self.member_to_hero[message.author.id] = hero
+        elif hero is None:
+            hero = await engine.run_async(engine.get_hero, message.author.name,
+                                          discord_client_id=str(message.author.id))
+            self.member_to_hero[message.author.id] = hero
 
         # make game event from message
         event = None
-        if message.channel == self.wilderness:
-            location = Location.WILDERNESS
-            if self.engine.current_enemy:
-                # fight
-                event = events.HeroEvent(
-                    events.GameEventType.FIGHT,
-                    hero=self.member_to_hero[message.author],
-                    message=str(message.clean_content),
-                    location=location,
-                    context=message)
-                augment = next((e for e in emojis if e.discord.decode('utf-8') == message.clean_content), None)
-                if augment:
-                    # TODO: why does type hinting not work for child classes? am I doing something wrong?
-                    #   either way this works just fine.
-                    event.add_augment(augment.enum)
-            else:
-                # search
-                event = events.HeroEvent(
-                    events.GameEventType.SEARCH,
-                    hero=self.member_to_hero[message.author],
-                    message=str(message.clean_content),
-                    location=location,
-                    context=message)
-
-        elif message.channel == self.town:
-            potential_command = str(message.clean_content).lower()
-            if potential_command == 'help':
-                # help with commands
-                commands = '\n'.join([
-                    f'{wrap("quest start", w=MarkdownStyle.BOLD.value)} - starts a quest.',
-                    f'{wrap("quest", w=MarkdownStyle.BOLD.value)} - prints the current quest.',
-                    f'{wrap("quest abandon", w=MarkdownStyle.BOLD.value)} - abandons the current quest.',
-                    f'{wrap("score", w=MarkdownStyle.BOLD.value)} - prints the high scores.',
-                ])
-                e = Embed(title='Help', colour=Colour.dark_grey())
-                e.add_field(name='Town Commands', value=commands)
-
-                wcommands = '\n'.join([
-                    f'{wrap("<any message>", w=MarkdownStyle.ITALIC.value)}'
-                    ' - searches the current room, or fights an enemy if one exists..',
-                    f'<{"|".join([e.str for e in emojis])}> - fights with the used element'
-                ])
-                e.add_field(name='Wilderness Commands', value=wcommands)
-
-                await self.town.send(embed=e)
+        if location is Location.WILDERNESS:
+            # fight if there is an enemy, otherwise search. the engine has the final say, it may have moved on
+            # by the time it gets to this message.
+            event = events.HeroEvent(
+                events.GameEventType.FIGHT if engine.current_enemy else events.GameEventType.SEARCH,
+                hero=hero,
+                message=str(message.clean_content),
+                location=location,
+                context=message)
+            augment = emoji_augments.get(message.clean_content)
+            if augment:
+                # TODO: why does type hinting not work for child classes? am I doing something wrong?
+                #   either way this works just fine.
+                event.add_augment(augment)
 
+        elif location is Location.TOWN:
+            potential_command = str(message.clean_content).lower()
+            if potential_command.split(' ', 1)[0] == 'profile' and self.is_admin(message.author):
+                # the profiler belongs to the client, not the game, so this doesn't go to the engine
+                await session.town.send(await self.profile_command(str(message.clean_content).strip()))
+                return
             # command
             event = events.HeroEvent(
                 events.GameEventType.COMMAND,
-                hero=self.member_to_hero[message.author],
+                hero=hero,
                 message=potential_command,
                 location=Location.TOWN,
                 context=message)
 
-        # send it
+        # queue it for the engine
         if event:
-            await self.absorb(event)
+            await self.ingest.put(event, session)
         else:
             logger.debug(f'No event captured for message "{message.clean_content}"')
 
-    async def emit(self, event: events.GameEvent):
+    async def emit(self, event: events.GameEvent, session: Session = None):
         """ Called when a game event happens.
 
-        Prints out the state of what just happened.
+        Prints out the state of what just happened, in as few messages as it can.
 
         Args:
             event: the event that occurred
+            session: the session the event happened in
+        """
+        start = time.perf_counter()
+        session = session or self.sessions.get(SessionManager.DEFAULT_SESSION)
+        outbox = Outbox()
+        self.render(event, session, outbox)
+        api_calls = await outbox.send()
+        metrics.EMIT_SECONDS.observe(time.perf_counter() - start, event.type.name)
+        metrics.API_CALLS.observe(api_calls, event.type.name)
+        logger.debug(f'Sent {event.type.name} to Discord in {api_calls} API call(s).')
+        await super().emit(event, session)
+
+    def help_embed(self, commands: Tuple[Tuple[str, str], ...]) -> Embed:
+        """ The help embed for a set of town commands, see `CommandRouter.help()`.
+
+        Args:
+            commands: the usage and help text of each command
+        """
+        e = self._help_embeds.get(commands)
+        if e is None:
+            e = Embed(title='Help', colour=Colour.dark_grey())
+            e.add_field(name='Town Commands',
+                        value='\n'.join(f'{wrap(usage, w=MarkdownStyle.BOLD.value)} - {text}'
+                                         for usage, text in commands))
+            wcommands = '\n'.join([
+                f'{wrap("<any message>", w=MarkdownStyle.ITALIC.value)}'
+                ' - searches the current room, or fights an enemy if one exists..',
+                f'<{"|".join([e.str for e in emojis])}> - fights with the used element'
+            ])
+            e.add_field(name='Wilderness Commands', value=wcommands)
+            self._help_embeds[commands] = e
+        return e
+
+    def render(self, event: events.GameEvent, session: Session, outbox: 'Outbox') -> None:
+        """ Write out what happened in an event.
+
+        Args:
+            event: the event that occurred
+            session: the session the event happened in
+            outbox: where to put the messages and reactions
         """
         event_queue = Queue()
         event_queue.put(event)
@@ -196,7 +470,7 @@ class DiscordClient(GameClient, discord.Client):
             # SearchResult
             elif isinstance(event, events.SearchResultEvent):
                 if not event.found_enemy:
-                    await event.context.add_reaction('🔍')
+                    outbox.react(event.context, '🔍')
 
             # FightResult
             elif isinstance(event, events.FightResultEvent):
@@ -207,85 +481,86 @@ class DiscordClient(GameClient, discord.Client):
                     fight_result_message += wrap(f'{event.hero} {event.verb} {event.enemy_result.context.name}!',
                                                  w=Emoji.ATTACK_HIT.value)
                 else:
-                    await event.context.add_reaction('💨')
+                    outbox.react(event.context, '💨')
 
                 # hero crit
                 if event.hero_result.crit:
                     fight_result_message += f'... and it\'s a critical hit {Emoji.ATTACK_CRIT.value}!!!'
-                    await event.context.add_reaction('🌟')
+                    outbox.react(event.context, '🌟')
                 if event.hero_result.hit or event.hero_result.crit:
-                    await self.wilderness.send(fight_result_message)
+                    outbox.say(session.wilderness, fight_result_message)
 
                 # enemy weaknesses and resistances
                 if event.hero_result.weak:
-                    await self.wilderness.send(f'{event.enemy_result.context} writhes in pain!')
+                    outbox.say(session.wilderness, f'{event.enemy_result.context} writhes in pain!')
                 if event.hero_result.strong:
-                    await self.wilderness.send(f"{event.enemy_result.context} doesn't seem to be that affected...")
+                    outbox.say(session.wilderness,
+                               f"{event.enemy_result.context} doesn't seem to be that affected...")
 
                 # hero damage
                 if event.enemy_result.hit:
-                    await event.context.add_reaction('🩸')
+                    outbox.react(event.context, '🩸')
                     # player hp indicator (if low enough)
                     indicator = {9: '9️⃣', 8: '8️⃣', 7: '7️⃣', 6: '6️⃣', 5: '5️⃣',
                                  4: '4️⃣', 3: '3️⃣', 2: '2️⃣', 1: '1️⃣', 0: '☠'}
                     if indicator.get(event.hero_result.hp):
-                        await event.context.add_reaction(indicator.get(event.hero_result.hp))
+                        outbox.react(event.context, indicator.get(event.hero_result.hp))
 
                 # enemy death
                 if event.enemy_result.hp <= 0:
                     death_animation = random.choice(['collapses', 'dies'])
-                    await self.wilderness.send(wrap(f'{event.enemy_result.context} {death_animation}.',
-                                                    w=Emoji.DEAD.value))
+                    outbox.say(session.wilderness, wrap(f'{event.enemy_result.context} {death_animation}.',
+                                                        w=Emoji.DEAD.value))
 
                 # hero death
                 if event.hero_result.hp <= 0:
-                    await self.town.send(wrap(f'{event.hero_result.context} died.',
-                                              w=Emoji.DEAD.value))
+                    outbox.say(session.town, wrap(f'{event.hero_result.context} died.',
+                                                  w=Emoji.DEAD.value))
 
             # Other less-complex events
             elif event.type is events.GameEventType.QUEST_START:
                 e = Embed(title='Quest Started', colour=Colour.dark_green(),
                           description=f'Starting quest "{event.context}".')
                 e.set_footer(text='You can abandon this quest by typing "quest abandon".')
-                await self.town.send(embed=e)
+                outbox.say(session.town, embed=e)
                 e = Embed(title=event.context, description=event.context.prologue)
                 e.set_footer(text='Head to the #wilderness to start searching for enemies!')
-                await self.town.send(embed=e)
-                await self.wilderness.send(embed=Embed(title=event.context.area.name,
-                                                       description=event.context.area.prologue))
+                outbox.say(session.town, embed=e)
+                outbox.say(session.wilderness, embed=Embed(title=event.context.area.name,
+                                                           description=event.context.area.prologue))
             elif event.type is events.GameEventType.QUEST_GET_CURRENT:
-                await self.town.send(f'Currently on the quest "{event.context}".')
+                outbox.say(session.town, f'Currently on the quest "{event.context}".')
             elif event.type is events.GameEventType.QUEST_ABANDON:
-                await self.town.send('If you say so...')
-                await self.wilderness.send(embed=Embed(title=event.context.area.name,
-                                                       description=event.context.area.epilogue))
+                outbox.say(session.town, 'If you say so...')
+                outbox.say(session.wilderness, embed=Embed(title=event.context.area.name,
+                                                           description=event.context.area.epilogue))
             elif event.type is events.GameEventType.QUEST_COMPLETE:
-                await self.wilderness.send(embed=Embed(title=event.context.area.name,
-                                                       description=event.context.area.epilogue))
-                await self.town.send(event.context.epilogue)
+                outbox.say(session.wilderness, embed=Embed(title=event.context.area.name,
+                                                           description=event.context.area.epilogue))
+                outbox.say(session.town, event.context.epilogue)
                 e = Embed(title='Quest Complete!', colour=Colour.dark_green(),
                           description=f'Our Heroes have completed the quest "{event.context}".')
-                await self.town.send(embed=e)
+                outbox.say(session.town, embed=e)
             elif event.type is events.GameEventType.QUEST_XP:
-                await self.town.send(f'{event.hero} gets {event.context[0]} xp '
-                                     f'for helping with the quest: "{event.context[1]}"')
+                outbox.say(session.town, f'{event.hero} gets {event.context[0]} xp '
+                                         f'for helping with the quest: "{event.context[1]}"')
             elif event.type is events.GameEventType.ENEMY_APPEAR:
                 kind = event.context.kind and event.context.kind.value or ''
-                await self.wilderness.send(f'Out of nowhere! {Emoji.ENEMY.value} {event.context} {kind}')
+                outbox.say(session.wilderness, f'Out of nowhere! {Emoji.ENEMY.value} {event.context} {kind}')
             elif event.type is events.GameEventType.BOSS_APPEAR:
                 kind = event.context.kind and event.context.kind.value or ''
-                await self.wilderness.send(f'From the shadows comes a formidable foe, "{event.context}" {kind}!')
+                outbox.say(session.wilderness, f'From the shadows comes a formidable foe, "{event.context}" {kind}!')
             elif event.type is events.GameEventType.ENEMY_XP:
-                await self.wilderness.send(f'{event.hero} received [{event.context[0]}] xp '
-                                           f'for helping to fight {event.context[1].name}')
+                outbox.say(session.wilderness, f'{event.hero} received [{event.context[0]}] xp '
+                                               f'for helping to fight {event.context[1].name}')
             elif event.type is events.GameEventType.SCORE:
-                awards = iter([Emoji.PLACE_1, Emoji.PLACE_2, Emoji.PLACE_3])
+                awards = {1: Emoji.PLACE_1, 2: Emoji.PLACE_2, 3: Emoji.PLACE_3}
                 first_place = None
                 e = Embed(title='High Scores', colour=Colour.gold())
-                for hero, score in event.context:
-                    a = next(awards, None)
+                for place, hero, score in event.context:
+                    a = awards.get(place)
                     first_place = first_place or hero
-                    e.add_field(name=f'{a.value if a else ""} {hero}', value=f'{score} xp.')
+                    e.add_field(name=f'{a.value if a else f"#{place}"} {hero}', value=f'{score} xp.')
 
                 # maybe add a snarky saying to the scorecard
                 snarky = [
@@ -296,6 +571,13 @@ class DiscordClient(GameClient, discord.Client):
                 ]
                 if random.choice([True, False, False, False]):
                     e.set_footer(text=f'{first_place} says, "{random.choice(snarky)}"')
-                await self.town.send(embed=e)
-
-            await super().emit(event)
+                outbox.say(session.town, embed=e)
+            elif event.type is events.GameEventType.HELP:
+                # help with commands
+                outbox.say(session.town, embed=self.help_embed(event.context or ()))
+            elif event.type is events.GameEventType.RANK:
+                place, xp = event.context
+                if place:
+                    outbox.say(session.town, f'{event.hero} is ranked #{place} with {xp} xp.')
+                else:
+                    outbox.say(session.town, f"{event.hero} isn't on the leaderboard yet.")
@@ -0,0 +1,225 @@
+"""The client's side of running the engine in other processes: sends events to engine workers and hands back their
+results (see `game.worker`, and `game.wire` for the messages).
+
+A gateway sends each session to one connection, always the same one, so a session's events are processed in the
+order the client absorbed them, while different sessions can be spread over several workers.
+
+`InProcessConnection` runs a worker in the same process, through the same encoding, for trying the split out
+without starting any.
+"""
+import asyncio
+import itertools
+import json
+import logging
+import zlib
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from game import wire
+from game.events import GameEvent
+from game.journal import event_to_record
+from game.worker import EngineWorker
+
+
+logger = logging.getLogger(__name__)
+
+
+class WorkerError(RuntimeError):
+    """An engine worker couldn't carry out a request."""
+
+
+class SocketConnection(object):
+    """ A connection to an engine worker listening on a Unix socket.
+
+    Requests are sent as they're made, without waiting for the ones before, and each waits for its own response.
+
+    If the worker goes away, the requests waiting on it fail with a `ConnectionError`, and the next request
+    reconnects, waiting longer between each attempt up to `max_backoff` seconds. A request that still can't get
+    through after `give_up_after` seconds fails too, so events are never dropped without a trace.
+
+    Args:
+        path: the worker's socket
+        max_backoff: the longest wait between attempts to reconnect, in seconds
+        give_up_after: how long a request keeps trying to reconnect before failing, in seconds
+    """
+    def __init__(self, path: str, max_backoff: float = 5.0, give_up_after: float = 60.0):
+        self.path = path
+        self.max_backoff = max_backoff
+        self.give_up_after = give_up_after
+        self._ids = itertools.count()
+        self._waiting: Dict[int, asyncio.Future] = {}
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._task: Optional[asyncio.Task] = None
+        self._reconnecting = asyncio.Lock()
+        self._closed = False
+
+    def __str__(self):
+        return self.path
+
+    @property
+    def connected(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def connect(self) -> None:
+        self._reader, self._writer = await asyncio.open_unix_connection(self.path)
+        self._task = asyncio.create_task(self._read(), name=f'engine-worker-{self.path}')
+        self._closed = False
+        logger.info(f'Connected to the engine worker on {self.path}.')
+
+    async def _reconnect(self) -> None:
+        # one request reconnects, the rest wait for it
+        async with self._reconnecting:
+            if self.connected:
+                return
+            if self._closed:
+                raise ConnectionError(f'The connection to the engine worker on {self.path} is closed.')
+            logger.warning(f'Reconnecting to the engine worker on {self.path}.')
+            loop = asyncio.get_running_loop()
+            give_up = loop.time() + self.give_up_after
+            backoff = 0.1
+            while True:
+                try:
+                    return await self.connect()
+                except OSError as e:
+                    if loop.time() + backoff > give_up:
+                        logger.error(f'Could not reconnect to the engine worker on {self.path}: {e}')
+                        raise ConnectionError(f'The engine worker on {self.path} is unavailable.') from e
+                    logger.debug(f'The engine worker on {self.path} is still unavailable, trying again in '
+                                 f'{backoff:.1f}s.')
+                    await asyncio.sleep(backoff)
+                    backoff = min(backoff * 2, self.max_backoff)
+
+    async def _read(self) -> None:
+        try:
+            while True:
+                response = await wire.read_frame(self._reader)
+                if response is None:
+                    break
+                future = self._waiting.pop(response[0], None)
+                if future is not None and not future.done():
+                    future.set_result(response)
+        finally:
+            if not self._closed:
+                logger.error(f'Lost the engine worker on {self.path}, with {len(self._waiting)} request(s) waiting.')
+            for future in self._waiting.values():
+                if not future.done():
+                    future.set_exception(ConnectionError(f'Lost the engine worker on {self.path}.'))
+            self._waiting.clear()
+
+    async def request(self, kind: str, session_key: str, body: Any) -> List[Any]:
+        """ Send a request, see `game.wire`, reconnecting first if the worker went away.
+
+        Returns:
+            the response
+        """
+        if not self.connected:
+            await self._reconnect()
+        request_id = next(self._ids)
+        future = self._waiting[request_id] = asyncio.get_running_loop().create_future()
+        self._writer.write(wire.pack([request_id, kind, session_key, body]))
+        try:
+            await self._writer.drain()
+        except OSError:
+            # the reader was still running when the request went in, so it fails the request's future as it stops
+            pass
+        return await future
+
+    async def close(self) -> None:
+        self._closed = True
+        if self._writer is not None:
+            self._writer.close()
+            await asyncio.gather(self._writer.wait_closed(), self._task, return_exceptions=True)
+            self._writer = None
+
+
+class InProcessConnection(object):
+    """ A worker in this process, standing in for a `SocketConnection`, e.g. for tests.
+
+    Every request and response is encoded and decoded as it would be on a socket, so results come back as views
+    just the same.
+
+    Args:
+        worker: the worker to send requests to
+    """
+    def __init__(self, worker: EngineWorker):
+        self.worker = worker
+        self._ids = itertools.count()
+
+    def __str__(self):
+        return 'in-process'
+
+    async def connect(self) -> None:
+        pass
+
+    async def request(self, kind: str, session_key: str, body: Any) -> List[Any]:
+        """ Send a request, see `game.wire`.
+
+        Returns:
+            the response
+        """
+        request = self._round_trip([next(self._ids), kind, session_key, body])
+        return self._round_trip(await self.worker.handle(request))
+
+    @staticmethod
+    def _round_trip(message: Any) -> Any:
+        return json.loads(wire.pack(message)[wire.LENGTH.size:])
+
+    async def close(self) -> None:
+        pass
+
+
+class Gateway(object):
+    """ Sends a client's events to engine workers.
+
+    Args:
+        connections: the workers to send to, `SocketConnection`s or `InProcessConnection`s
+    """
+    def __init__(self, connections: Sequence[Any]):
+        if not connections:
+            raise ValueError('A gateway needs at least one engine worker.')
+        self.connections = list(connections)
+
+    async def start(self) -> None:
+        """Connect to every worker. Call from inside the running event loop."""
+        await asyncio.gather(*(connection.connect() for connection in self.connections))
+
+    async def close(self) -> None:
+        await asyncio.gather(*(connection.close() for connection in self.connections), return_exceptions=True)
+
+    def connection(self, session_key: str) -> Any:
+        """The connection to the worker a session is played on."""
+        if len(self.connections) == 1:
+            return self.connections[0]
+        return self.connections[zlib.crc32(session_key.encode('utf-8')) % len(self.connections)]
+
+    async def _request(self, kind: str, session_key: str, body: Any) -> Any:
+        connection = self.connection(session_key)
+        response = await connection.request(kind, session_key, body)
+        if len(response) > 2:
+            raise WorkerError(f'The engine worker on {connection} could not process a {kind} request: {response[2]}')
+        return response[1]
+
+    async def process(self, session_key: str, event: GameEvent) -> Optional[GameEvent]:
+        """ Have a session's engine process an event, like `Engine.process_event_async()`.
+
+        Args:
+            session_key: the session the event happened in
+            event: the event to process
+
+        Returns:
+            the result, with views in place of the game's objects, see `game.wire`
+        """
+        result = await self._request('event', session_key, event_to_record(event))
+        return wire.decode_result(result, event.context)
+
+    async def roster(self, session_key: str, members: List[Tuple[str, str]]) -> int:
+        """ Load heroes ahead of their first messages, like `Engine.get_heroes()`.
+
+        Args:
+            session_key: the session they play in
+            members: the (name, discord_client_id) of each hero
+
+        Returns:
+            how many heroes were loaded
+        """
+        return await self._request('roster', session_key, [list(member) for member in members])
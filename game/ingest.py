@@ -0,0 +1,139 @@
+import asyncio
+import logging
+from collections import deque
+from enum import Enum
+from typing import Any, Awaitable, Callable, Deque, Dict, Hashable, List, Optional, Tuple
+
+from game.events import GameEvent, GameEventType, HeroEvent
+
+
+logger = logging.getLogger(__name__)
+
+
+class OverflowPolicy(Enum):
+    """What an `IngestQueue` does with a new event when it is full."""
+    BLOCK = 'block'                # wait for room, slowing down whoever is putting events in
+    DROP_OLDEST = 'drop_oldest'    # make room by dropping the event that has waited longest
+    DROP_NEWEST = 'drop_newest'    # drop the new event
+    MERGE_SEARCH = 'merge_search'  # drop a search from a hero who already has one waiting, else drop the oldest
+
+
+class IngestQueue(object):
+    """ A bounded queue of events waiting for the engine, and the worker tasks that feed them to it.
+
+    Clients put events in as they arrive and get straight back to listening. Workers take them out in order and
+    hand them to `handler`. Events from the same session are handled one at a time in the order they were put in,
+    events from different sessions can be handled at the same time by different workers.
+
+    Args:
+        handler: called with each event and its session, e.g. `GameClient.absorb`
+        maxsize: how many events can wait at once
+        policy: what to do with an event when the queue is full
+        workers: how many events can be handled at the same time
+    """
+    def __init__(self, handler: Callable[[GameEvent, Any], Awaitable],
+                 maxsize: int = 256,
+                 policy: OverflowPolicy = OverflowPolicy.MERGE_SEARCH,
+                 workers: int = 4):
+        self.handler = handler
+        self.maxsize = maxsize
+        self.policy = policy
+        self.workers = workers
+
+        self._items: Deque[Tuple[GameEvent, Any]] = deque()
+        self._changed = asyncio.Condition()
+        self._locks: Dict[Hashable, asyncio.Lock] = {}
+        self._tasks: List[asyncio.Task] = []
+
+        # metrics
+        self.received = 0
+        self.handled = 0
+        self.dropped = 0
+        self.merged = 0
+        self.high_water = 0
+
+    def __len__(self):
+        return len(self._items)
+
+    def stats(self) -> Dict[str, int]:
+        """The queue's counters, and how deep it is right now."""
+        return {
+            'depth': len(self._items),
+            'high_water': self.high_water,
+            'received': self.received,
+            'handled': self.handled,
+            'dropped': self.dropped,
+            'merged': self.merged,
+        }
+
+    def start(self) -> None:
+        """Start the workers. Call from inside the running event loop."""
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._work(), name=f'ingest-{i}') for i in range(self.workers)]
+
+    async def stop(self) -> None:
+        """Stop the workers, dropping anything still waiting."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def put(self, event: GameEvent, session: Any = None) -> bool:
+        """ Queue an event for the engine.
+
+        Args:
+            event: the event
+            session: the session it happened in
+
+        Returns:
+            whether the event was queued, rather than dropped or merged
+        """
+        self.received += 1
+        async with self._changed:
+            if len(self._items) >= self.maxsize and not self._make_room(event, session):
+                return False
+            if len(self._items) >= self.maxsize:
+                # BLOCK
+                await self._changed.wait_for(lambda: len(self._items) < self.maxsize)
+            self._items.append((event, session))
+            self.high_water = max(self.high_water, len(self._items))
+            self._changed.notify_all()
+        return True
+
+    def _make_room(self, event: GameEvent, session: Any) -> bool:
+        """Apply the overflow policy. Returns whether the new event should still go in."""
+        if self.policy is OverflowPolicy.BLOCK:
+            return True
+        if self.policy is OverflowPolicy.DROP_NEWEST:
+            self.dropped += 1
+            return False
+        if self.policy is OverflowPolicy.MERGE_SEARCH and _is_search(event):
+            if any(s is session and _is_search(e) and e.hero == event.hero for e, s in self._items):
+                # the hero's search is already waiting, this one adds nothing but xp
+                self.merged += 1
+                return False
+        dropped, _ = self._items.popleft()
+        self.dropped += 1
+        logger.debug(f'Ingest queue full, dropped {dropped}.')
+        return True
+
+    async def _work(self) -> None:
+        while True:
+            async with self._changed:
+                await self._changed.wait_for(lambda: self._items)
+                event, session = self._items.popleft()
+                self._changed.notify_all()
+
+            # nothing yields between taking the event and queueing on the lock, so the session's events keep
+            # their order
+            lock = self._locks.setdefault(session, asyncio.Lock())
+            async with lock:
+                try:
+                    await self.handler(event, session)
+                except Exception:
+                    logger.exception(f'Failed to handle {event}.')
+                self.handled += 1
+
+
+def _is_search(event: Optional[GameEvent]) -> bool:
+    return isinstance(event, HeroEvent) and event.type is GameEventType.SEARCH
@@ -0,0 +1,317 @@
+"""An append-only record of every event the engine processes, and a tool to replay it.
+
+Each record is a 4-byte big-endian length followed by that many bytes of compact JSON. Every run of the game
+writes into a directory of its own inside the journal directory. Files are rotated once they reach `max_bytes`, and
+runs and files are named so they sort in the order they were written.
+
+The engine rolls its dice from its own `random.Random`, reseeded before every journaled event, and the seed goes in
+the record, along with the result encoded as for the wire (see `game.wire`). The first time a run sees a hero, their
+hp and xp go in a record ahead of the event. Replaying a run from its start into a fresh engine therefore gives the
+same results, whatever the heroes had been through before the run.
+
+    python -m game.journal replay <journal dir, run dirs or files> [--module diablo2]
+
+Replays into an in-memory database and reports any result that came out differently, and how fast it went. Each run
+is replayed into fresh engines, as the game restarted, while the database carries on from the run before.
+"""
+import argparse
+import glob
+import json
+import logging
+import os
+import queue
+import random
+import struct
+import sys
+import threading
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from game import wire
+from game.events import GameEvent, GameEventType, HeroEvent
+from game.objects import Location
+from game.util import ElementalDamageType
+
+
+logger = logging.getLogger(__name__)
+
+LENGTH = struct.Struct('>I')
+
+# results that depend on heroes' history from before the journal, so can't be compared on replay
+UNREPLAYABLE = {GameEventType.SCORE.name, GameEventType.RANK.name}
+
+
+def event_to_record(event: GameEvent) -> Dict[str, Any]:
+    """The parts of an event the engine looks at, as something JSON can hold."""
+    record = {'type': event.type.name}
+    if event.message:
+        record['message'] = event.message
+    if event.augment:
+        record['augment'] = event.augment.name
+    if event.location:
+        record['location'] = event.location.name
+    if isinstance(event, HeroEvent):
+        record['hero'] = [event.hero.name, event.hero.discord_client_id]
+    return record
+
+
+def record_to_event(record: Dict[str, Any], engine) -> GameEvent:
+    """ Rebuild an event from its record.
+
+    Args:
+        record: the `event_to_record()` output
+        engine: the engine to look heroes up in, or anything else with its `get_hero()`
+    """
+    kwargs = {
+        'message': record.get('message'),
+        'augment': ElementalDamageType[record['augment']] if 'augment' in record else None,
+        'location': Location[record['location']] if 'location' in record else None,
+    }
+    t = GameEventType[record['type']]
+    if 'hero' in record:
+        name, discord_client_id = record['hero']
+        return HeroEvent(t, hero=engine.get_hero(name, discord_client_id=discord_client_id), **kwargs)
+    return GameEvent(t, **kwargs)
+
+
+class Journal(object):
+    """ Writes what the engine processes to disk, on a background thread.
+
+    The engine only builds a small dict per event and queues it, the encoding and writing happen elsewhere.
+
+    Args:
+        directory: where to put the journal, each run in a directory of its own inside it
+        max_bytes: start a new file once the current one is this big
+    """
+    PREFIX = 'journal-'
+    SUFFIX = '.bin'
+    RUN_PREFIX = 'run-'
+
+    def __init__(self, directory: str, max_bytes: int = 16 * 1024 * 1024):
+        now = time.time_ns()
+        run = f'{self.RUN_PREFIX}{time.strftime("%Y%m%d-%H%M%S", time.localtime(now // 10 ** 9))}-{now % 10 ** 9:09d}'
+        self.directory = os.path.join(directory, run)
+        self.max_bytes = max_bytes
+        os.makedirs(self.directory, exist_ok=True)
+        self._seeds = random.SystemRandom()
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._file = None
+        self._sequence = 0
+        # the heroes this run has recorded the state of, only touched from the engine thread
+        self._heroes = set()
+        self._thread = threading.Thread(target=self._write, name='journal', daemon=True)
+        self._thread.start()
+
+    @classmethod
+    def files(cls, directory: str) -> List[str]:
+        """The journal files in a directory, oldest first."""
+        return sorted(glob.glob(os.path.join(directory, f'{cls.PREFIX}*{cls.SUFFIX}')))
+
+    @classmethod
+    def runs(cls, paths: Iterable[str]) -> List[List[str]]:
+        """ Group journal files by the run that wrote them, oldest first.
+
+        Args:
+            paths: journal directories, run directories, or files, which are taken to be from one run
+        """
+        runs, files = [], []
+        for path in paths:
+            if not os.path.isdir(path):
+                files.append(path)
+                continue
+            run_directories = sorted(glob.glob(os.path.join(path, f'{cls.RUN_PREFIX}*')))
+            runs.extend(cls.files(d) for d in run_directories)
+            if cls.files(path):
+                # a run directory, or a journal from before runs had their own
+                runs.append(cls.files(path))
+        if files:
+            runs.append(files)
+        return runs
+
+    def next_seed(self) -> int:
+        return self._seeds.getrandbits(32)
+
+    def saw(self, session: str, hero) -> None:
+        """ Queue a record of a hero's hp and xp, if this run hasn't recorded them yet. Call before the hero's event is
+        processed, so replays start them from where they were.
+
+        Args:
+            session: the session the hero's event happened in
+            hero: the hero
+        """
+        if hero.id in self._heroes:
+            return
+        self._heroes.add(hero.id)
+        self._queue.put({
+            'time': time.time(),
+            'session': session,
+            'hero': [hero.name, hero.discord_client_id],
+            'hp': hero.hp,
+            'xp': hero.xp,
+        })
+
+    def record(self, session: str, seed: int, event: GameEvent, result: Optional[GameEvent],
+               quest_index: Optional[int] = None) -> None:
+        """ Queue a record of an event and what came of it.
+
+        Args:
+            session: the session the event happened in
+            seed: what the engine's dice were seeded with for the event
+            event: the event
+            result: what the engine returned for it
+            quest_index: the quest the event started, if it started one
+        """
+        record = {
+            'time': time.time(),
+            'session': session,
+            'seed': seed,
+            'event': event_to_record(event),
+            # encoded now, before the next event changes the game objects in it
+            'result': wire.encode_result(result),
+        }
+        if quest_index is not None:
+            record['quest'] = quest_index
+        self._queue.put(record)
+
+    def close(self) -> None:
+        """Write everything queued so far and stop."""
+        self._queue.put(None)
+        self._thread.join()
+
+    def _open_next(self):
+        if self._file:
+            self._file.close()
+        self._sequence += 1
+        path = os.path.join(self.directory, f'{self.PREFIX}{self._sequence:06d}{self.SUFFIX}')
+        logger.info(f'Journaling to {path}.')
+        self._file = open(path, 'ab')
+
+    def _write(self) -> None:
+        while True:
+            record = self._queue.get()
+            if record is None:
+                break
+            data = json.dumps(record, separators=(',', ':')).encode('utf-8')
+            if self._file is None or self._file.tell() + LENGTH.size + len(data) > self.max_bytes:
+                self._open_next()
+            self._file.write(LENGTH.pack(len(data)) + data)
+            # keep the file current when things are quiet, so a crash loses as little as possible
+            if self._queue.empty():
+                self._file.flush()
+        if self._file:
+            self._file.close()
+            self._file = None
+
+
+def read(paths: Iterable[str]) -> Iterator[Dict[str, Any]]:
+    """ Read the records out of journal files, in order.
+
+    Args:
+        paths: journal files, or directories of them
+    """
+    for path in paths:
+        if os.path.isdir(path):
+            yield from read(Journal.files(path))
+            continue
+        with open(path, 'rb') as f:
+            while True:
+                header = f.read(LENGTH.size)
+                if len(header) < LENGTH.size:
+                    break
+                data = f.read(LENGTH.unpack(header)[0])
+                if len(data) < LENGTH.unpack(header)[0]:
+                    logger.warning(f'{path} ends with a partial record.')
+                    break
+                yield json.loads(data)
+
+
+def _result_type(result: Any) -> Optional[str]:
+    if isinstance(result, list):
+        # journals from before results were encoded for the wire had [type, str(result)]
+        return result[0]
+    return result['t'] if result else None
+
+
+def replay(runs: Iterable[Iterable[Dict[str, Any]]], quests) -> Dict[str, Any]:
+    """ Feed journaled events to fresh engines, checking they come out the same.
+
+    Uses whatever database is configured, which should be an empty one. Each run gets fresh engines, as if the game
+    had restarted, and the database carries on from the run before. Heroes are put back to the hp and xp the run
+    recorded for them before their first event.
+
+    Args:
+        runs: the journal records of each run, in order
+        quests: the quests the journaled engine was playing
+
+    Returns:
+        how many events were replayed, which ones came out differently, and how long it took
+    """
+    from game.database import Game
+    from game.sessions import SessionManager
+
+    replayed, mismatches, elapsed = 0, [], 0.0
+    for records in runs:
+        sessions = SessionManager(quests=quests)
+        for record in records:
+            engine = sessions.open(record['session']).engine
+            if 'event' not in record:
+                # what a hero was like when the run first saw them
+                name, discord_client_id = record['hero']
+                hero = engine.get_hero(name, discord_client_id=discord_client_id)
+                hero.hp, hero.xp = record['hp'], record['xp']
+                sessions.hero_writes.mark(hero, 'hp')
+                sessions.hero_writes.mark(hero, 'xp')
+                sessions.leaderboard.update(hero)
+                continue
+            if 'quest' in record:
+                # the quest the engine started came from its game row, put it back
+                Game.insert(key=engine.session_key, current_quest=record['quest']).on_conflict(
+                    conflict_target=[Game.key], update={Game.current_quest: record['quest']}).execute()
+            event = record_to_event(record['event'], engine)
+
+            start = time.perf_counter()
+            engine.random.seed(record['seed'])
+            result = engine.process_event(event)
+            elapsed += time.perf_counter() - start
+
+            replayed += 1
+            expected = record['result']
+            if isinstance(expected, list):
+                actual = [result.type.name, str(result)] if result is not None else None
+            else:
+                # the journaled result went through JSON, so this one does too
+                actual = json.loads(json.dumps(wire.encode_result(result)))
+            if expected != actual and _result_type(expected) not in UNREPLAYABLE:
+                mismatches.append((replayed, record, actual))
+        sessions.flush()
+    return {'replayed': replayed, 'mismatches': mismatches, 'seconds': elapsed}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay a journal and check the engine does the same thing.')
+    parser.add_argument('command', choices=['replay'])
+    parser.add_argument('paths', nargs='+', help='journal directories, run directories, or one run\'s files')
+    parser.add_argument('--module', default='diablo2',
+                        help='the module with the `quests` list, or a content pack (default: diablo2)')
+    args = parser.parse_args()
+
+    from game.database import db, configure_db, create_tables
+    configure_db(profile='memory')
+    db.connect()
+    create_tables()
+
+    from game.content import load_quests
+    quests = load_quests(args.module)
+    report = replay((read(files) for files in Journal.runs(args.paths)), quests)
+    for n, record, actual in report['mismatches'][:20]:
+        print(f'#{n} {record["event"]}')
+        print(f'  journaled: {record["result"]}')
+        print(f'  replayed:  {actual}')
+    rate = report['replayed'] / report['seconds'] if report['seconds'] else 0
+    print(f'Replayed {report["replayed"]} events, {len(report["mismatches"])} came out differently. '
+          f'{rate:.0f} events/sec.')
+    return 1 if report['mismatches'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
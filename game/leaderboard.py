@@ -0,0 +1,108 @@
+import bisect
+import logging
+from typing import Dict, List, Optional, Tuple
+
+from game.database import Hero
+
+
+logger = logging.getLogger(__name__)
+
+
+class Leaderboard(object):
+    """ The high scores, ranked by xp.
+
+    The first read loads every hero with xp out of the database, ordered by the index on `Hero.xp`. From then on
+    the engine keeps it current by calling `update()` whenever a hero's xp changes, so neither a page of scores nor a
+    hero's rank goes back to the database.
+
+    Positions are 1-based. Heroes with the same xp share a rank and are listed by name.
+    """
+    def __init__(self):
+        # (-xp, name), best first
+        self._ranking: Optional[List[Tuple[int, str]]] = None
+        self._xp: Dict[str, int] = {}
+
+    def __len__(self):
+        return len(self.ranking)
+
+    @property
+    def loaded(self) -> bool:
+        return self._ranking is not None
+
+    @property
+    def ranking(self) -> List[Tuple[int, str]]:
+        if self._ranking is None:
+            self.load()
+        return self._ranking
+
+    def load(self) -> None:
+        """(Re)load every hero that has xp from the database."""
+        query = (Hero.select(Hero.name, Hero.xp)
+                 .where(Hero.xp > 0)
+                 .order_by(Hero.xp.desc(), Hero.name)
+                 .tuples())
+        self._ranking = [(-xp, name) for name, xp in query]
+        self._xp = {name: -xp for xp, name in self._ranking}
+        logger.debug(f'Loaded {len(self._ranking)} heroes into the leaderboard.')
+
+    def update(self, hero: Hero) -> None:
+        """ Move a hero to their place for their current xp.
+
+        Does nothing until the leaderboard has been loaded, the hero is picked up by the load instead.
+
+        Args:
+            hero: the hero whose xp changed
+        """
+        if self._ranking is None:
+            return
+        old = self._xp.get(hero.name)
+        if old == hero.xp:
+            return
+        if old is not None:
+            del self._ranking[bisect.bisect_left(self._ranking, (-old, hero.name))]
+            del self._xp[hero.name]
+        if hero.xp > 0:
+            bisect.insort(self._ranking, (-hero.xp, hero.name))
+            self._xp[hero.name] = hero.xp
+
+    def top(self, limit: int = 10, offset: int = 0) -> List[Tuple[int, str, int]]:
+        """ Get a page of high scores.
+
+        Args:
+            limit: how many heroes to get
+            offset: how many heroes to skip
+
+        Returns:
+            (position, hero name, xp) for each hero on the page
+        """
+        page = self.ranking[offset:offset + limit]
+        return [(offset + i + 1, name, -xp) for i, (xp, name) in enumerate(page)]
+
+    def rank(self, hero: Hero) -> Optional[int]:
+        """ Get a hero's rank, or None if they don't have any xp yet.
+
+        Args:
+            hero: the hero to rank
+        """
+        ranking = self.ranking
+        xp = self._xp.get(hero.name)
+        if xp is None:
+            return None
+        return bisect.bisect_left(ranking, (-xp,)) + 1
+
+    @staticmethod
+    def query_top(limit: int = 10, offset: int = 0) -> List[Tuple[int, str, int]]:
+        """Like `top()`, but straight from the database."""
+        query = (Hero.select(Hero.name, Hero.xp)
+                 .where(Hero.xp > 0)
+                 .order_by(Hero.xp.desc(), Hero.name)
+                 .limit(limit).offset(offset)
+                 .tuples())
+        return [(offset + i + 1, name, xp) for i, (name, xp) in enumerate(query)]
+
+    @staticmethod
+    def query_rank(hero: Hero) -> Optional[int]:
+        """Like `rank()`, but straight from the database."""
+        if hero.xp <= 0:
+            return None
+        return Hero.select().where(Hero.xp > hero.xp).count() + 1
@@ -0,0 +1,318 @@
+"""Counters, gauges and fixed-bucket histograms for watching the game run, in the Prometheus text format.
+
+Recording is a dict lookup and an add or two, cheap enough to leave on everywhere. Nothing is formatted until the
+metrics are read, either over HTTP (`serve()`) or into a file (`Registry.dump()`).
+
+    python main.py --metrics-port 9100 --metrics-file metrics.prom
+
+Updates aren't locked. The engine thread and the event loop each record their own metrics, and a scrape may see
+a histogram partway through an update, which Prometheus copes with.
+"""
+import abc
+import bisect
+import logging
+import os
+import threading
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    from http.server import ThreadingHTTPServer
+
+
+logger = logging.getLogger(__name__)
+
+# seconds, from a tenth of a millisecond to ten seconds
+LATENCY_BUCKETS = (.0001, .00025, .0005, .001, .0025, .005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10)
+# small whole numbers, e.g. API calls per event
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 25)
+
+Labels = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', r'\\').replace('\n', r'\n').replace('"', r'\"')
+
+
+def _format(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric(abc.ABC):
+    """ One named metric, with a value for each combination of its labels.
+
+    Args:
+        name: the metric's name, e.g. 'game_events_total'
+        help: what it measures
+        labels: the names of its labels, whose values are passed positionally when recording
+    """
+    type = 'untyped'
+
+    def __init__(self, name: str, help: str, labels: Iterable[str] = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+
+    def _label_text(self, values: Labels, extra: str = None) -> str:
+        pairs = [f'{k}="{_escape(v)}"' for k, v in zip(self.labels, values)]
+        if extra:
+            pairs.append(extra)
+        return '{' + ','.join(pairs) + '}' if pairs else ''
+
+    @abc.abstractmethod
+    def samples(self) -> Iterable[Tuple[str, str, float]]:
+        """Each sample as (suffix, labels, value)."""
+
+    def render(self) -> str:
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} {self.type}']
+        lines.extend(f'{self.name}{suffix}{labels} {_format(value)}' for suffix, labels, value in self.samples())
+        return '\n'.join(lines)
+
+
+class Counter(Metric):
+    """A count that only goes up."""
+    type = 'counter'
+
+    def __init__(self, name: str, help: str, labels: Iterable[str] = ()):
+        super().__init__(name, help, labels)
+        self._values: Dict[Labels, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0)
+
+    def samples(self):
+        for labels, value in list(self._values.items()):
+            yield '', self._label_text(labels), value
+
+
+class Gauge(Metric):
+    """A value that goes up and down. It can be set, or read from a function whenever the metrics are read."""
+    type = 'gauge'
+
+    def __init__(self, name: str, help: str, labels: Iterable[str] = ()):
+        super().__init__(name, help, labels)
+        self._values: Dict[Labels, float] = {}
+        self._function: Optional[Callable[[], Dict[Labels, float]]] = None
+
+    def set(self, value: float, *labels: str) -> None:
+        self._values[labels] = value
+
+    def track(self, function: Callable[[], Dict[Labels, float]]) -> None:
+        """ Read the gauge's values from a function instead, when the metrics are read.
+
+        Args:
+            function: returns each value, by its labels
+        """
+        self._function = function
+
+    def samples(self):
+        values = self._values
+        if self._function:
+            try:
+                values = self._function()
+            except Exception:
+                logger.exception(f'Could not read {self.name}.')
+                values = {}
+        for labels, value in list(values.items()):
+            yield '', self._label_text(labels), value
+
+
+class Histogram(Metric):
+    """ How values are spread out, counted into fixed buckets.
+
+    Args:
+        buckets: the upper bound of each bucket, in order. values above the last go in +Inf
+    """
+    type = 'histogram'
+
+    def __init__(self, name: str, help: str, labels: Iterable[str] = (),
+                 buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+        # labels -> [count in each bucket (not cumulative), ..., count above the last, sum]
+        self._values: Dict[Labels, List[float]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        counts = self._values.get(labels)
+        if counts is None:
+            counts = self._values[labels] = [0] * (len(self.buckets) + 2)
+        counts[bisect.bisect_left(self.buckets, value)] += 1
+        counts[-1] += value
+
+    def count(self, *labels: str) -> int:
+        counts = self._values.get(labels)
+        return int(sum(counts[:-1])) if counts else 0
+
+    def samples(self):
+        for labels, counts in list(self._values.items()):
+            counts = list(counts)
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float('inf'),), counts):
+                cumulative += n
+                yield '_bucket', self._label_text(labels, f'le="{_format(bound)}"'), cumulative
+            yield '_sum', self._label_text(labels), counts[-1]
+            yield '_count', self._label_text(labels), cumulative
+
+
+class Registry(object):
+    """The metrics to read out together."""
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+
+    def __iter__(self):
+        return iter(list(self._metrics.values()))
+
+    def add(self, metric: Metric) -> Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f'There is already a metric called {metric.name}')
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, labels: Iterable[str] = ()) -> Counter:
+        return self.add(Counter(name, help, labels))
+
+    def gauge(self, name: str, help: str, labels: Iterable[str] = ()) -> Gauge:
+        return self.add(Gauge(name, help, labels))
+
+    def histogram(self, name: str, help: str, labels: Iterable[str] = (),
+                  buckets: Tuple[float, ...] = LATENCY_BUCKETS) -> Histogram:
+        return self.add(Histogram(name, help, labels, buckets))
+
+    def render(self) -> str:
+        """Every metric in the Prometheus text format."""
+        return '\n'.join(metric.render() for metric in self) + '\n'
+
+    def dump(self, path: str) -> None:
+        """ Write every metric to a file, replacing it in one go so readers never see half of it.
+
+        Args:
+            path: the file to write
+        """
+        tmp = f'{path}.tmp'
+        with open(tmp, 'w') as f:
+            f.write(self.render())
+        os.replace(tmp, path)
+
+
+REGISTRY = Registry()
+
+# the engine
+EVENT_SECONDS = REGISTRY.histogram('game_process_event_seconds', 'Time the engine took to process an event.',
+                                   labels=('type',))
+SESSIONS = REGISTRY.gauge('game_sessions', 'Game sessions running.')
+ON_QUEST = REGISTRY.gauge('game_on_quest', 'Whether a session is on a quest, and which.', labels=('session', 'quest'))
+ENEMY_HP = REGISTRY.gauge('game_enemy_hp', "The hp of the enemy a session is fighting.", labels=('session', 'enemy'))
+ENEMIES_LEFT = REGISTRY.gauge('game_enemies_left', 'Enemies left in the area, not counting the boss.',
+                              labels=('session',))
+COMMANDS = REGISTRY.gauge('game_commands', 'Town commands run across every session, and the seconds they took: '
+                          'calls, seconds and max_seconds, see CommandRouter.stats.', labels=('command', 'stat'))
+CONTENT_RELOADS = REGISTRY.counter('game_content_reloads_total', 'Times the quest content changed and was reloaded, '
+                                   'by how it went: ok, invalid or refused.', labels=('result',))
+
+# the database
+DB_QUERIES = REGISTRY.counter('game_db_queries_total', 'SQL statements run, by their first word.', labels=('verb',))
+DB_QUERY_SECONDS = REGISTRY.histogram('game_db_query_seconds', 'Time to run a SQL statement.')
+DB_COMMIT_SECONDS = REGISTRY.histogram('game_db_commit_seconds', 'Time to commit a transaction.')
+
+# the Discord client
+EMIT_SECONDS = REGISTRY.histogram('game_emit_seconds', 'Time to show the result of an event on Discord.',
+                                  labels=('type',))
+API_CALLS = REGISTRY.histogram('game_discord_api_calls', 'Discord API calls made to show an event.',
+                               labels=('type',), buckets=COUNT_BUCKETS)
+INGEST = REGISTRY.gauge('game_ingest', 'The incoming message queue, see IngestQueue.stats().', labels=('stat',))
+
+
+def track_sessions(sessions) -> None:
+    """ Read the quest and enemy gauges from a `SessionManager` whenever the metrics are read.
+
+    Args:
+        sessions: the sessions to watch
+    """
+    SESSIONS.track(lambda: {(): len(sessions)})
+    ON_QUEST.track(lambda: {(s.key, str(s.engine.current_quest or '')): int(s.engine.current_quest is not None)
+                            for s in sessions})
+    ENEMY_HP.track(lambda: {(s.key, s.engine.current_enemy.name): s.engine.current_enemy.hp
+                            for s in sessions if s.engine.current_enemy})
+    ENEMIES_LEFT.track(lambda: {(s.key,): s.engine.current_quest.area.remaining
+                                for s in sessions if s.engine.current_quest})
+    COMMANDS.track(lambda: _command_stats(sessions))
+
+
+def _command_stats(sessions) -> Dict[Labels, float]:
+    values: Dict[Labels, float] = {}
+    for session in sessions:
+        for name, stats in session.engine.commands.stats.items():
+            values[name, 'calls'] = values.get((name, 'calls'), 0) + stats.calls
+            values[name, 'seconds'] = values.get((name, 'seconds'), 0.0) + stats.total
+            values[name, 'max_seconds'] = max(values.get((name, 'max_seconds'), 0.0), stats.max)
+    return values
+
+
+def track_ingest(ingest) -> None:
+    """ Read the ingest gauges from an `IngestQueue` whenever the metrics are read.
+
+    Args:
+        ingest: the queue to watch
+    """
+    INGEST.track(lambda: {(stat,): value for stat, value in ingest.stats().items()})
+
+
+def dump_every(path: str, seconds: float = 15.0, registry: Registry = REGISTRY) -> threading.Event:
+    """ Dump the metrics to a file every so often, on a background thread.
+
+    Args:
+        path: the file to write
+        seconds: how often to write it
+
+    Returns:
+        an event, set it to stop
+    """
+    stop = threading.Event()
+
+    def run():
+        while not stop.wait(seconds):
+            try:
+                registry.dump(path)
+            except OSError:
+                logger.exception(f'Could not write metrics to {path}.')
+
+    threading.Thread(target=run, name='metrics-dump', daemon=True).start()
+    return stop
+
+
+def serve(port: int, host: str = '127.0.0.1', registry: Registry = REGISTRY) -> 'ThreadingHTTPServer':
+    """ Serve the metrics over HTTP at /metrics, on a background thread.
+
+    Args:
+        port: the port to listen on, 0 for any free one
+        host: the address to listen on, only this machine by default
+
+    Returns:
+        the server, `shutdown()` it to stop
+    """
+    # only paid for when metrics are served, http.server takes longer to import than the rest of the game
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?')[0] not in ('/', '/metrics'):
+                self.send_error(404)
+                return
+            body = registry.render().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            logger.debug(f'{self.address_string()} {format % args}')
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, name='metrics', daemon=True).start()
+    logger.info(f'Serving metrics on http://{host}:{server.server_address[1]}/metrics')
+    return server
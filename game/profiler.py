@@ -0,0 +1,219 @@
+"""A profiler that can be switched on in a running game, for finding out why it's slow without restarting it.
+
+While it's on, every Nth event through `GameClient.absorb()` is profiled: the engine's `process_event()` on the
+engine thread, and sending the result on the event loop, each with its own `cProfile.Profile`. With `memory` it also
+traces allocations with tracemalloc. When it's stopped, or its time window runs out, the stats are written to disk:
+
+    profile-<time>-engine.pstats    load with pstats, snakeviz etc.
+    profile-<time>-engine.txt       the top functions by cumulative time
+    profile-<time>-client.pstats
+    profile-<time>-client.txt
+    profile-<time>-memory.txt       the lines that allocated the most, if memory was traced
+
+It's switched on with a spec, from GAME_PROFILE or `--profile` when the bot starts, or the `profile start` town
+command (for server admins), e.g. `every=10 seconds=300 memory dir=profiles`. When it's off, absorbing an event
+costs one attribute check.
+
+Time spent on the event loop is only attributed to whichever events were being profiled, but other coroutines can
+run while they wait, so the client profile includes some of their time too.
+"""
+import asyncio
+import cProfile
+import glob
+import io
+import logging
+import os
+import pstats
+import time
+import tracemalloc
+from concurrent.futures import Executor
+from typing import Any, Callable, Dict, List, Optional
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DIRECTORY = 'profiles'
+# how many lines go in the text reports
+TOP = 40
+
+
+def parse_spec(spec: str) -> Dict[str, Any]:
+    """ Read a profiling spec, e.g. 'every=10 seconds=300 memory dir=profiles' (commas work too).
+
+    Returns:
+        the keyword arguments for `Profiler.start()`
+
+    Raises:
+        ValueError: if part of it isn't understood
+    """
+    options: Dict[str, Any] = {}
+    for part in spec.replace(',', ' ').split():
+        key, _, value = part.partition('=')
+        # only the values are case sensitive, e.g. a directory
+        key = key.lower()
+        if key == 'every':
+            options['every'] = int(value)
+        elif key == 'seconds':
+            options['seconds'] = float(value)
+        elif key == 'memory':
+            options['memory'] = value.lower() not in ('0', 'false', 'no', 'off')
+        elif key == 'dir':
+            options['directory'] = value
+        elif key not in ('1', 'on', 'true', 'yes'):
+            raise ValueError(f'Unknown profiling option "{part}", expected every=N, seconds=S, memory or dir=PATH')
+    return options
+
+
+class Profiler(object):
+    """ Samples absorb cycles with cProfile (and optionally tracemalloc) while it's switched on.
+
+    Args:
+        directory: where reports are written, unless `start()` says otherwise
+    """
+    def __init__(self, directory: str = DEFAULT_DIRECTORY):
+        self.directory = directory
+        self.active = False
+        self.every = 1
+        self.memory = False
+        self.until: Optional[float] = None
+        self.cycles = 0
+        self.sampled = 0
+        self._engine: Optional[cProfile.Profile] = None
+        self._client: Optional[cProfile.Profile] = None
+        self._client_depth = 0
+        self._started: Optional[float] = None
+
+    def __str__(self):
+        if not self.active:
+            return 'profiler off'
+        window = f', {self.until - time.monotonic():.0f}s left' if self.until else ''
+        return f'profiling 1 in {self.every} events ({self.sampled} of {self.cycles} so far){window}'
+
+    @property
+    def expired(self) -> bool:
+        return self.active and self.until is not None and time.monotonic() >= self.until
+
+    def start(self, every: int = 1, seconds: float = None, memory: bool = False, directory: str = None) -> None:
+        """ Start profiling, throwing away anything not yet written.
+
+        Args:
+            every: profile one in this many events
+            seconds: stop on its own after this long
+            memory: trace allocations too, which slows everything down while it's on
+            directory: where to write the reports
+        """
+        if every < 1:
+            raise ValueError('every has to be at least 1')
+        self.every, self.memory = every, memory
+        self.directory = directory or self.directory
+        self.until = time.monotonic() + seconds if seconds else None
+        self.cycles = self.sampled = 0
+        self._engine, self._client, self._client_depth = cProfile.Profile(), cProfile.Profile(), 0
+        self._started = time.time()
+        if memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        self.active = True
+        logger.info(f'Started profiling: {self}.')
+
+    def sample(self) -> bool:
+        """Count a cycle, and say whether to profile it."""
+        if self.expired:
+            return False
+        self.cycles += 1
+        if self.cycles % self.every:
+            return False
+        self.sampled += 1
+        return True
+
+    def call(self, function: Callable, *args, **kwargs) -> Any:
+        """Call a function under the engine profile. Only call this on the engine thread."""
+        try:
+            self._engine.enable()
+        except ValueError:
+            # newer pythons only allow one profiler on at a time, across all threads
+            return function(*args, **kwargs)
+        try:
+            return function(*args, **kwargs)
+        finally:
+            self._engine.disable()
+
+    def client(self) -> '_ClientProfile':
+        """A context manager to profile the event loop side of a cycle. Only use it on the event loop."""
+        return _ClientProfile(self)
+
+    async def stop(self, engine_executor: Executor) -> List[str]:
+        """ Stop profiling and write the reports, off the event loop.
+
+        Args:
+            engine_executor: where the engine runs, so its profile is finished there
+
+        Returns:
+            the files written
+        """
+        if not self.active:
+            return []
+        self.active = False
+        loop = asyncio.get_running_loop()
+        engine, client = self._engine, self._client
+        # runs after any cycle already on the engine thread, so nothing is still using its profile
+        await loop.run_in_executor(engine_executor, engine.create_stats)
+        client.create_stats()
+        snapshot = None
+        if self.memory and tracemalloc.is_tracing():
+            snapshot = tracemalloc.take_snapshot()
+            tracemalloc.stop()
+        prefix = os.path.join(self.directory, time.strftime('profile-%Y%m%d-%H%M%S', time.localtime(self._started)))
+        if glob.glob(f'{prefix}-*'):
+            # started twice in the same second
+            prefix += f'-{int(self._started * 1000) % 1000:03d}'
+        paths = await loop.run_in_executor(None, self._write, prefix, engine, client, snapshot)
+        logger.info(f'Stopped profiling after {self.sampled} of {self.cycles} events, wrote {", ".join(paths)}.')
+        return paths
+
+    @staticmethod
+    def _write(prefix: str, engine: cProfile.Profile, client: cProfile.Profile,
+               snapshot: Optional[tracemalloc.Snapshot]) -> List[str]:
+        os.makedirs(os.path.dirname(prefix) or '.', exist_ok=True)
+        paths = []
+        for name, profile in (('engine', engine), ('client', client)):
+            if not profile.stats:
+                continue
+            profile.dump_stats(f'{prefix}-{name}.pstats')
+            text = io.StringIO()
+            pstats.Stats(profile, stream=text).sort_stats('cumulative').print_stats(TOP)
+            with open(f'{prefix}-{name}.txt', 'w') as f:
+                f.write(text.getvalue())
+            paths += [f'{prefix}-{name}.pstats', f'{prefix}-{name}.txt']
+        if snapshot:
+            # the profiler's own bookkeeping isn't interesting
+            snapshot = snapshot.filter_traces([tracemalloc.Filter(False, m.__file__)
+                                               for m in (cProfile, pstats, tracemalloc)])
+            with open(f'{prefix}-memory.txt', 'w') as f:
+                for stat in snapshot.statistics('lineno')[:TOP]:
+                    f.write(f'{stat}\n')
+            paths.append(f'{prefix}-memory.txt')
+        return paths
+
+
+class _ClientProfile(object):
+    # several cycles can be sending at once, the profile is on while any of them is
+    def __init__(self, profiler: Profiler):
+        self.profiler = profiler
+        self.profile = profiler._client
+
+    def __enter__(self):
+        if self.profiler._client_depth == 0:
+            try:
+                self.profile.enable()
+            except ValueError:
+                # newer pythons only allow one profiler on at a time, across all threads
+                return
+        self.profiler._client_depth += 1
+
+    def __exit__(self, *exc):
+        if self.profile is not self.profiler._client:
+            # profiling was stopped, or restarted, while this cycle was sending
+            return
+        self.profiler._client_depth = max(self.profiler._client_depth - 1, 0)
+        if self.profiler._client_depth == 0:
+            self.profile.disable()
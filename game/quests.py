@@ -1,22 +1,63 @@
-from game.areas import Area
-from game.util import MarkdownStyle, wrap
+from functools import cached_property
+from typing import Dict, Optional, Union
+
+from game.areas import Area, AreaDefinition
+from game.combat import CombatProfile
+from game.util import MarkdownStyle, wrap, ElementalDamageType
 
 
 class Quest(object):
     fancy = MarkdownStyle.UNDERLINE
 
-    def __init__(self, name: str, area: Area, prologue: str = None, epilogue: str = None, xp: int = None):
+    def __init__(self, name: str, area: Union[Area, AreaDefinition], prologue: str = None, epilogue: str = None,
+                 xp: int = None, combat: Dict[Optional[ElementalDamageType], CombatProfile] = None):
+        """ A quest for the heroes to go on.
+
+        Args:
+            name: the name of the quest
+            area: where the quest takes place, or how to make it when it's first needed
+            prologue: the story before the quest
+            epilogue: the story after the quest
+            xp: the xp every hero who helped gets once it's complete
+            combat: combat profiles to use instead of the engine's during this quest
+        """
         self.name = name
-        self.area = area
+        self._area_definition: Optional[AreaDefinition] = None
+        if isinstance(area, AreaDefinition):
+            self._area_definition = area
+        else:
+            self.area = area
         self.prologue = prologue
         self.epilogue = epilogue
         self.xp_upon_completion = xp or 0
+        self.combat_profiles = combat or {}
 
         self.players_participated = set()
 
     def __str__(self):
         return wrap(self.name, w=self.fancy.value)
 
+    def __repr__(self):
+        return self.__str__()
+
+    @cached_property
+    def area(self) -> Area:
+        # built the first time it's needed, after that it's a plain attribute
+        return self._area_definition.build()
+
+    def clone(self):
+        """A fresh copy of this quest to play through, leaving this one untouched."""
+        return self.__class__(
+            name=self.name,
+            # a defined area is built fresh by the copy when it's played, so this quest never builds its own
+            area=self._area_definition or self.area.clone(),
+            prologue=self.prologue,
+            epilogue=self.epilogue,
+            xp=self.xp_upon_completion,
+            combat=self.combat_profiles)
+
     @property
     def complete(self) -> bool:
-        return len(self.area.enemies) == 0 and self.area.boss.dead
+        # checked after every fight, so this reads the count itself rather than through `Area.has_enemies`
+        area = self.area
+        return area.remaining <= 0 and area.boss.dead
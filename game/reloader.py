@@ -0,0 +1,143 @@
+"""Swaps new quest content into a running game when its source changes, without restarting.
+
+The reloader polls the content's file, a content pack or the module with the `quests` list, and once it has changed
+and then settled for one poll, loads it again:
+
+1. The new quests are built on a worker thread, so neither the event loop nor the engine waits on parsing,
+   validating or importing them. If they don't load, the error is logged and the game carries on with what it has.
+2. They're checked against the quests being played. `Game.current_quest` is an index into the list, so quests can
+   be changed or added on the end, but not removed.
+3. They're swapped in on the engine thread, so between events, with one assignment per engine.
+
+Quests in progress, and the enemies in them, are copies and carry on as they were. The next quest each session
+starts comes from the new content.
+
+    python main.py --content packs/diablo2.json --reload
+"""
+import asyncio
+import importlib
+import importlib.util
+import logging
+import os
+import time
+from typing import List, Optional, Tuple
+
+from game import metrics
+from game.content import load
+from game.engine import Engine
+from game.quests import Quest
+from game.sessions import SessionManager
+
+
+logger = logging.getLogger(__name__)
+
+# a file's modification time and size, None if it doesn't exist right now
+Fingerprint = Optional[Tuple[int, int]]
+
+
+class ContentReloader(object):
+    """ Watches where the quests come from, and swaps new ones into every session when it changes.
+
+    Args:
+        source: a content pack's path, or the name of a module with a `quests` list, as for `load_quests()`
+        sessions: the sessions to swap the new quests into
+        interval: how often to check for changes, in seconds
+    """
+    def __init__(self, source: str, sessions: SessionManager, interval: float = 2.0):
+        self.source = source
+        self.sessions = sessions
+        self.interval = interval
+        self.path = source if source.endswith('.json') else importlib.util.find_spec(source).origin
+        self.reloads = 0
+        self._loaded: Fingerprint = self._fingerprint()
+        self._last: Fingerprint = self._loaded
+        self._task: Optional[asyncio.Task] = None
+
+    def _fingerprint(self) -> Fingerprint:
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def start(self) -> None:
+        """Start watching. Call from inside the running event loop."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._watch(), name='content-reloader')
+            logger.info(f'Watching {self.path} for quest changes.')
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _watch(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            fingerprint = self._fingerprint()
+            # wait for it to stop changing, editors don't always write a file in one go
+            if fingerprint is not None and fingerprint != self._loaded and fingerprint == self._last:
+                self._loaded = fingerprint
+                try:
+                    await self.reload()
+                except Exception:
+                    logger.exception(f'Could not reload {self.path}.')
+            self._last = fingerprint
+
+    def _build(self) -> List[Quest]:
+        if self.source.endswith('.json'):
+            return load(self.source).quests
+        return importlib.reload(importlib.import_module(self.source)).quests
+
+    async def reload(self) -> bool:
+        """ Load the content again and swap it into every session.
+
+        Returns:
+            whether the new quests were swapped in
+        """
+        loop = asyncio.get_running_loop()
+        start = time.perf_counter()
+        try:
+            quests = await loop.run_in_executor(None, self._build)
+        except Exception:
+            metrics.CONTENT_RELOADS.inc('invalid')
+            logger.exception(f'Could not load {self.source}, carrying on with the quests already loaded.')
+            return False
+        built = time.perf_counter()
+
+        problem = self.check(self.sessions.quests or [], quests)
+        if problem:
+            metrics.CONTENT_RELOADS.inc('refused')
+            logger.error(f'Not reloading {self.source}: {problem}')
+            return False
+
+        await loop.run_in_executor(Engine.executor, self._swap, quests)
+        self.reloads += 1
+        metrics.CONTENT_RELOADS.inc('ok')
+        swapped = time.perf_counter()
+        logger.info(f'Reloaded {len(quests)} quests from {self.source} '
+                    f'(built in {(built - start) * 1000:.1f}ms, swapped in {(swapped - built) * 1000:.1f}ms).')
+        return True
+
+    @staticmethod
+    def check(old: List[Quest], new: List[Quest]) -> Optional[str]:
+        """ Whether new quests can replace old ones in a running game.
+
+        Returns:
+            why not, or None if they can
+        """
+        if len(new) < len(old):
+            return (f'it has {len(new)} quests instead of {len(old)}. Quests are saved by their place in the list, '
+                    f'so they can be added on the end but not removed.')
+        for i, (before, after) in enumerate(zip(old, new)):
+            if before.name != after.name:
+                logger.warning(f'Quest {i} was "{before.name}" and is now "{after.name}", sessions saved partway '
+                               f'through the campaign will start the new one.')
+        return None
+
+    def _swap(self, quests: List[Quest]) -> None:
+        # on the engine thread, so no engine is partway through an event
+        self.sessions.quests = quests
+        for session in self.sessions:
+            session.engine.replace_quests(quests)
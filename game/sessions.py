@@ -0,0 +1,148 @@
+import asyncio
+import logging
+from typing import Any, Dict, Hashable, Iterator, Optional, Tuple
+
+from game.database import Hero, HeroWriteBehind
+from game.engine import Engine
+from game.journal import Journal
+from game.leaderboard import Leaderboard
+from game.objects import Location
+
+
+logger = logging.getLogger(__name__)
+
+
+class Session(object):
+    """ One game being played: its engine, and where a client shows it.
+
+    Args:
+        key: the name of the session, also used for its `Game` row
+        engine: the engine running the session's game
+    """
+    def __init__(self, key: str, engine: Engine):
+        self.key = key
+        self.engine = engine
+        # set by the client, e.g. to its town and wilderness channels
+        self.town: Any = None
+        self.wilderness: Any = None
+        self.context: Any = None
+
+    def __str__(self):
+        return self.key
+
+
+class SessionManager(object):
+    """ Runs many independent games in one process.
+
+    Every session has its own engine, and so its own quest progress and `Game` row. Sessions share the heroes (one
+    instance of each, with the pending hero writes and leaderboard that go with them) and the quest templates, which
+    each engine clones when it starts a quest.
+
+    Clients bind the places events come from (a channel id, for example) to a session and a location with `bind()`,
+    then find them again per event with `route()`.
+
+    Args:
+        quests: the quest templates every session plays through
+        journal: where every session's engine records what it processes, if anywhere
+    """
+    DEFAULT_SESSION = 'default'
+
+    def __init__(self, quests=None, journal: Journal = None):
+        self.quests = quests
+        self.journal = journal
+        self.hero_writes = HeroWriteBehind()
+        self.leaderboard = Leaderboard()
+        self.hero_map: Dict[int, Hero] = {}
+        self._sessions: Dict[str, Session] = {}
+        self._routes: Dict[Hashable, Tuple[Session, Location]] = {}
+        self._flushing: Optional[asyncio.Task] = None
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def __iter__(self) -> Iterator[Session]:
+        return iter(list(self._sessions.values()))
+
+    def __contains__(self, key: str):
+        return key in self._sessions
+
+    def get(self, key: str) -> Optional[Session]:
+        return self._sessions.get(key)
+
+    def open(self, key: str, engine: Engine = None) -> Session:
+        """ Get a session, starting it if it isn't running yet.
+
+        Args:
+            key: the name of the session
+            engine: an engine to run the session with, instead of making a new one
+        """
+        session = self._sessions.get(key)
+        if session is None:
+            engine = engine or Engine(quests=self.quests, session_key=key,
+                                      hero_writes=self.hero_writes, leaderboard=self.leaderboard,
+                                      journal=self.journal, hero_map=self.hero_map)
+            session = self._sessions[key] = Session(key, engine)
+            logger.info(f'Opened session {key}.')
+        return session
+
+    def close(self, key: str) -> None:
+        """ Stop a session, forgetting everything bound to it.
+
+        Args:
+            key: the name of the session
+        """
+        session = self._sessions.pop(key, None)
+        if session is None:
+            return
+        self._routes = {a: r for a, r in self._routes.items() if r[0] is not session}
+        session.engine.flush()
+        logger.info(f'Closed session {key}.')
+
+    def bind(self, address: Hashable, session: Session, location: Location) -> None:
+        """ Send events from an address to a session, at a location.
+
+        Args:
+            address: where the client receives events from, e.g. a channel id
+            session: the session to send them to
+            location: the location in the game they happen at
+        """
+        self._routes[address] = (session, location)
+
+    def route(self, address: Hashable) -> Optional[Tuple[Session, Location]]:
+        """ Find the session and location bound to an address.
+
+        Args:
+            address: where the client received the event from
+        """
+        return self._routes.get(address)
+
+    def flush(self) -> None:
+        """Write any pending hero changes from every session."""
+        self.hero_writes.flush()
+        for session in self:
+            session.engine.flush()
+
+    def start_flushing(self) -> None:
+        """ Write pending hero changes out every `max_delay` seconds, so they don't wait on the next change to be
+        written when the game goes quiet. Call from inside the running event loop.
+        """
+        if self._flushing is None:
+            self._flushing = asyncio.create_task(self._flush_periodically(), name='hero-writes')
+
+    async def stop_flushing(self) -> None:
+        if self._flushing is not None:
+            self._flushing.cancel()
+            await asyncio.gather(self._flushing, return_exceptions=True)
+            self._flushing = None
+
+    async def _flush_periodically(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.hero_writes.max_delay)
+            # a glance from the event loop, the flush itself happens on the engine thread
+            if not self.hero_writes:
+                continue
+            try:
+                await loop.run_in_executor(Engine.executor, self.hero_writes.flush)
+            except Exception:
+                logger.exception('Could not write the pending hero changes, trying again later.')
@@ -0,0 +1,184 @@
+"""The wire format between a gateway and its engine workers (see `game.gateway` and `game.worker`).
+
+Each frame is a 4-byte big-endian length followed by that many bytes of compact JSON, as in the journal.
+
+    request:   [id, 'event', session, event record]      an event for a session's engine, see `event_to_record()`
+               [id, 'roster', session, [[name, id], ...]] load a guild's heroes, see `Engine.get_heroes()`
+    response:  [id, result]
+               [id, None, error]                           the worker couldn't process it
+
+Results are encoded with `encode_result()`, as dicts with one-letter keys and anything empty left out. The game
+objects in them (quests, enemies, heroes) go over as just the fields the clients show, and come back as the views
+below, which print the same way. Client contexts, such as the Discord message an event came from, never leave the
+gateway: it hands the request's own context back to the search and fight results that had it.
+"""
+import asyncio
+import json
+import struct
+from typing import Any, Dict, NamedTuple, Optional
+
+from game.database import Hero
+from game.enemy import Enemy, EnemyTemplate
+from game.events import (EntityFightContext, FightResultEvent, GameEvent, GameEventType, GameMultiEvent, HeroEvent,
+                         SearchResultEvent)
+from game.objects import Location
+from game.quests import Quest
+from game.util import ElementalDamageType, wrap
+
+
+LENGTH = struct.Struct('>I')
+
+
+class HeroView(NamedTuple):
+    """A hero, as far as a gateway knows it."""
+    name: str
+    discord_client_id: Optional[str] = None
+
+    def __str__(self):
+        return self.name
+
+
+class EnemyView(NamedTuple):
+    """An enemy as it was when the result was made."""
+    name: str
+    hp: int
+    kind: Optional[ElementalDamageType] = None
+
+    def __str__(self):
+        return f'{wrap(self.name, w=Enemy.fancy.value)} [hp: {self.hp}]'
+
+
+class AreaView(NamedTuple):
+    name: str
+    prologue: Optional[str] = None
+    epilogue: Optional[str] = None
+
+
+class QuestView(NamedTuple):
+    """A quest's story, without any of its state."""
+    name: str
+    prologue: Optional[str]
+    epilogue: Optional[str]
+    area: AreaView
+
+    def __str__(self):
+        return wrap(self.name, w=Quest.fancy.value)
+
+
+def pack(message: Any) -> bytes:
+    """A message as a frame."""
+    data = json.dumps(message, separators=(',', ':')).encode('utf-8')
+    return LENGTH.pack(len(data)) + data
+
+
+async def read_frame(reader: asyncio.StreamReader) -> Optional[Any]:
+    """ The next message from a stream.
+
+    Returns:
+        the message, or None once the stream has ended
+    """
+    try:
+        header = await reader.readexactly(LENGTH.size)
+        return json.loads(await reader.readexactly(LENGTH.unpack(header)[0]))
+    except asyncio.IncompleteReadError:
+        return None
+
+
+def _encode_context(value: Any) -> Any:
+    if value is None or isinstance(value, (str, int, float)):
+        return value
+    if isinstance(value, (Quest, QuestView)):
+        area = value.area
+        return {'q': [value.name, value.prologue, value.epilogue, area.name, area.prologue, area.epilogue]}
+    if isinstance(value, (Enemy, EnemyTemplate, EnemyView)):
+        return {'e': [value.name, value.hp, value.kind.name if value.kind else None]}
+    if isinstance(value, (tuple, list)):
+        return {'s': [_encode_context(v) for v in value]}
+    if isinstance(value, (Hero, HeroView)):
+        return {'h': [value.name, value.discord_client_id]}
+    # anything else belongs to the client, e.g. the message an event came from
+    return None
+
+
+def _decode_context(value: Any) -> Any:
+    if not isinstance(value, dict):
+        return value
+    if 'q' in value:
+        name, prologue, epilogue, area, area_prologue, area_epilogue = value['q']
+        return QuestView(name, prologue, epilogue, AreaView(area, area_prologue, area_epilogue))
+    if 'e' in value:
+        name, hp, kind = value['e']
+        return EnemyView(name, hp, ElementalDamageType[kind] if kind else None)
+    if 'h' in value:
+        return HeroView(*value['h'])
+    return tuple(_decode_context(v) for v in value['s'])
+
+
+def encode_result(event: Optional[GameEvent]) -> Optional[Dict[str, Any]]:
+    """ What the engine returned, as something JSON can hold. Only call this on the engine thread, it reads the
+    game's state.
+    """
+    if event is None:
+        return None
+    data: Dict[str, Any] = {'t': event.type.name}
+    if isinstance(event, GameMultiEvent):
+        data['e'] = [encode_result(e) for e in event.events]
+        return data
+    if event.message:
+        data['m'] = event.message
+    if event.location:
+        data['l'] = event.location.name
+    if event.augment:
+        data['a'] = event.augment.name
+    context = _encode_context(event.context)
+    if context is not None:
+        data['c'] = context
+    if isinstance(event, HeroEvent):
+        data['h'] = [event.hero.name, event.hero.discord_client_id]
+    if isinstance(event, SearchResultEvent):
+        # its message is made from the rest
+        data.pop('m', None)
+        data['k'] = 'search'
+        if event.found_enemy:
+            data['f'] = 1
+    elif isinstance(event, FightResultEvent):
+        data['k'] = 'fight'
+        data['v'] = event.verb
+        data['r'] = [[r.hp, int(r.hit), int(r.crit), int(r.weak), int(r.strong), _encode_context(r.context)]
+                     for r in (event.hero_result, event.enemy_result)]
+    return data
+
+
+def decode_result(data: Optional[Dict[str, Any]], client_context: Any = None) -> Optional[GameEvent]:
+    """ Rebuild a result from `encode_result()`.
+
+    Args:
+        data: the encoded result
+        client_context: the context of the event it's the result of, handed back to the results that had it
+    """
+    if data is None:
+        return None
+    t = GameEventType[data['t']]
+    if t is GameEventType.MULTI:
+        return GameMultiEvent([decode_result(e, client_context) for e in data['e']])
+    kwargs = {
+        'message': data.get('m'),
+        'location': Location[data['l']] if 'l' in data else None,
+        'augment': ElementalDamageType[data['a']] if 'a' in data else None,
+        'context': _decode_context(data.get('c')),
+    }
+    kind = data.get('k')
+    if kind == 'search':
+        kwargs['context'] = client_context
+        event = SearchResultEvent(found_enemy=bool(data.get('f')), hero=HeroView(*data['h']), **kwargs)
+    elif kind == 'fight':
+        kwargs['context'] = client_context
+        event = FightResultEvent(0, 0, verb=data['v'], hero=HeroView(*data['h']), **kwargs)
+        event.hero_result, event.enemy_result = (
+            EntityFightContext(hp, bool(hit), bool(crit), bool(weak), bool(strong), _decode_context(context))
+            for hp, hit, crit, weak, strong, context in data['r'])
+    elif 'h' in data:
+        event = HeroEvent(t, hero=HeroView(*data['h']), **kwargs)
+    else:
+        event = GameEvent(t, **kwargs)
+    return event
@@ -0,0 +1,190 @@
+"""An engine worker: runs the game's engines in their own process, for gateways to send events to over a Unix socket.
+
+By default `main.py` runs the Discord client and the engines together, and a slow commit or a big score query on
+the engine thread competes with the gateway connection for the same interpreter. Started with `--engine-socket`,
+the bot only turns messages into events and renders results, and the engine work happens in workers like this
+one, each on its own core (see `game.gateway` and, for the messages, `game.wire`).
+
+    python -m game.worker --socket /tmp/game-engine.sock [--content diablo2] [--reload] [--db-path game.db]
+    python main.py --engine-socket /tmp/game-engine.sock
+
+A worker runs every session a gateway sends it, in the usual order: one at a time, on the engine thread. With more
+than one worker, each session always goes to the same one. Heroes are shared between sessions, and each worker
+keeps its own pending hero writes. Their hp and xp are written as changes (see `HeroWriteBehind`), so a hero playing
+in sessions on several workers keeps what every one of them gave or took. Each worker's heroes, and so its score and
+rank replies, only reflect what happened on that worker until the worker is restarted and loads them again.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+from typing import Any, Dict, List, Tuple
+
+from game import wire
+from game.database import DB_PROFILES, Hero
+from game.engine import Engine
+from game.journal import record_to_event
+from game.sessions import SessionManager
+
+
+logger = logging.getLogger(__name__)
+
+
+class EngineWorker(object):
+    """ Processes events for gateways, with sessions of its own.
+
+    Args:
+        sessions: the sessions to run, opened as gateways ask for them
+    """
+    def __init__(self, sessions: SessionManager):
+        self.sessions = sessions
+        # heroes by Discord id, like the Discord client's member_to_hero. only used on the engine thread
+        self._heroes: Dict[str, Hero] = {}
+        # heroes are shared by every session, so they're looked up outside of any of them
+        self._lookup = Engine(quests=[], hero_writes=sessions.hero_writes, leaderboard=sessions.leaderboard,
+                              hero_map=sessions.hero_map)
+
+    def get_hero(self, name: str, discord_client_id: str = None) -> Hero:
+        """The hero an event is from, as `Engine.get_hero()`. Only call this on the engine thread."""
+        hero = self._heroes.get(discord_client_id) if discord_client_id else None
+        if hero is None:
+            hero = self._lookup.get_hero(name, discord_client_id=discord_client_id)
+            if discord_client_id:
+                self._heroes[discord_client_id] = hero
+        return hero
+
+    def _process(self, session_key: str, record: Dict[str, Any]) -> Any:
+        engine = self.sessions.open(session_key).engine
+        result = engine.process_event(record_to_event(record, self))
+        # the result refers to live game state, so it's encoded here before the next event changes it
+        return wire.encode_result(result)
+
+    def _roster(self, session_key: str, members: List[Tuple[str, str]]) -> int:
+        engine = self.sessions.open(session_key).engine
+        heroes = engine.get_heroes([tuple(member) for member in members])
+        self._heroes.update(heroes)
+        return len(heroes)
+
+    async def handle(self, request: List[Any]) -> List[Any]:
+        """ Carry out a request, see `game.wire`.
+
+        Returns:
+            the response
+        """
+        request_id, kind, session_key, body = request
+        loop = asyncio.get_running_loop()
+        try:
+            if kind == 'event':
+                result = await loop.run_in_executor(Engine.executor, self._process, session_key, body)
+            elif kind == 'roster':
+                result = await loop.run_in_executor(Engine.executor, self._roster, session_key, body)
+            else:
+                raise ValueError(f'Unknown request "{kind}"')
+        except Exception as e:
+            logger.exception(f'Could not handle {kind} request {request_id} for session {session_key}.')
+            return [request_id, None, f'{type(e).__name__}: {e}']
+        return [request_id, result]
+
+    async def serve(self, path: str) -> asyncio.AbstractServer:
+        """ Listen for gateways on a Unix socket.
+
+        Args:
+            path: the socket's path, replaced if it's already there
+        """
+        if os.path.exists(path):
+            os.remove(path)
+        server = await asyncio.start_unix_server(self._connection, path)
+        logger.info(f'Engine worker listening on {path}.')
+        return server
+
+    async def _connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        pending = set()
+
+        async def respond(request):
+            response = await self.handle(request)
+            writer.write(wire.pack(response))
+
+        try:
+            while True:
+                request = await wire.read_frame(reader)
+                if request is None:
+                    break
+                # tasks start in the order they were made, and each gets onto the engine thread before it waits,
+                # so a session's events are processed in the order they arrived
+                task = asyncio.create_task(respond(request))
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+                if writer.transport.get_write_buffer_size() > 1 << 20:
+                    await writer.drain()
+        finally:
+            await asyncio.gather(*pending, return_exceptions=True)
+            writer.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Run the game engine for a gateway, see main.py --engine-socket.')
+    parser.add_argument('--socket', default=os.environ.get('GAME_ENGINE_SOCKET', '/tmp/game-engine.sock'),
+                        help='the Unix socket to listen on (default: /tmp/game-engine.sock)')
+    parser.add_argument('--content', default=os.environ.get('GAME_CONTENT', 'diablo2'),
+                        help='the quests to play: a module with a `quests` list, or a content pack (default: diablo2)')
+    parser.add_argument('--reload', action='store_true', default=bool(os.environ.get('GAME_RELOAD')),
+                        help='watch the content for changes and swap them in without restarting, see game/reloader.py')
+    parser.add_argument('--db-path', default=os.environ.get('GAME_DB_PATH'),
+                        help='the sqlite database file (default: game.db in the project root)')
+    parser.add_argument('--db-profile', default=os.environ.get('GAME_DB_PROFILE'), choices=list(DB_PROFILES),
+                        help='the sqlite connection profile (default: wal)')
+    parser.add_argument('--journal', default=os.environ.get('GAME_JOURNAL'),
+                        help='a directory to record every event the engine processes in, for replaying later')
+    parser.add_argument('--metrics-port', type=int, default=os.environ.get('GAME_METRICS_PORT'),
+                        help='serve metrics in the Prometheus text format on this port, on localhost')
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+    logging.getLogger('peewee').setLevel(logging.INFO)
+
+    from game import metrics
+    from game.content import load_quests
+    from game.database import db, configure_db, create_tables
+    from game.journal import Journal
+    from game.reloader import ContentReloader
+
+    configure_db(path=args.db_path, profile=args.db_profile)
+    db.connect()
+    # makes a fresh database's tables, and brings an older one's up to date
+    create_tables()
+    journal = Journal(args.journal) if args.journal else None
+    sessions = SessionManager(quests=load_quests(args.content), journal=journal)
+    metrics.track_sessions(sessions)
+    metrics_server = metrics.serve(int(args.metrics_port)) if args.metrics_port else None
+    reloader = ContentReloader(args.content, sessions) if args.reload else None
+
+    async def run():
+        server = await EngineWorker(sessions).serve(args.socket)
+        sessions.start_flushing()
+        if reloader:
+            reloader.start()
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            await sessions.stop_flushing()
+            if reloader:
+                await reloader.stop()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        Engine.executor.submit(sessions.flush).result()
+        Engine.executor.shutdown()
+        if journal:
+            journal.close()
+        if metrics_server:
+            metrics_server.shutdown()
+        db.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
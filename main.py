@@ -1,25 +1,116 @@
+import argparse
+import asyncio
 import logging
 import os
 
-from game.database import db
-from game.ext.discord_client import DiscordClient
+from game import metrics
+from game.content import load_quests
+from game.database import db, configure_db, create_tables, DB_PROFILES
 from game.engine import Engine
+from game.ingest import OverflowPolicy
+from game.journal import Journal
+from game.reloader import ContentReloader
+from game.sessions import SessionManager
 
-import diablo2
 
-
-logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
-logging.getLogger('discord').setLevel(logging.INFO)
-logging.getLogger('peewee').setLevel(logging.INFO)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Run the game with the Discord client, or in a terminal.')
+    parser.add_argument('--db-path', default=os.environ.get('GAME_DB_PATH'),
+                        help='the sqlite database file (default: game.db in the project root)')
+    parser.add_argument('--db-profile', default=os.environ.get('GAME_DB_PROFILE'), choices=list(DB_PROFILES),
+                        help='the sqlite connection profile (default: wal)')
+    parser.add_argument('--server', action='append', dest='servers',
+                        help=f'the name of a Discord server to play in, can be repeated '
+                             f'(default: the Discord client\'s SERVER_NAME)')
+    parser.add_argument('--all-servers', action='store_true',
+                        help='play in every server the bot is in that has the game channels and role')
+    parser.add_argument('--content', default=os.environ.get('GAME_CONTENT', 'diablo2'),
+                        help='the quests to play: a module with a `quests` list, or a content pack '
+                             '(default: diablo2, see game/content.py)')
+    parser.add_argument('--reload', action='store_true', default=bool(os.environ.get('GAME_RELOAD')),
+                        help='watch the content for changes and swap them in without restarting, see game/reloader.py')
+    parser.add_argument('--journal', default=os.environ.get('GAME_JOURNAL'),
+                        help='a directory to record every event the engine processes in, for replaying later')
+    parser.add_argument('--queue-size', type=int, default=256,
+                        help='how many messages can wait for the engine before the queue policy kicks in')
+    parser.add_argument('--queue-policy', default=OverflowPolicy.MERGE_SEARCH.value,
+                        choices=[p.value for p in OverflowPolicy],
+                        help='what to do with new messages when the queue is full (default: merge_search)')
+    parser.add_argument('--profile', default=os.environ.get('GAME_PROFILE'),
+                        help='profile the bot from the start, e.g. "every=10 seconds=300 memory", see game/profiler.py '
+                             '(not with --engine-socket, the engine isn\'t here to profile)')
+    parser.add_argument('--metrics-port', type=int, default=os.environ.get('GAME_METRICS_PORT'),
+                        help='serve metrics in the Prometheus text format on this port, on localhost')
+    parser.add_argument('--engine-socket', action='append', dest='engine_sockets',
+                        help='send events to the engine worker on this Unix socket instead of running the engine here, '
+                             'can be repeated (default: GAME_ENGINE_SOCKET, comma separated), see game/worker.py')
+    parser.add_argument('--headless', action='store_true',
+                        help='play in the terminal as --hero instead of on Discord, see game/console.py')
+    parser.add_argument('--hero', default='Hero', help='who to play as with --headless')
+    parser.add_argument('--metrics-file', default=os.environ.get('GAME_METRICS_FILE'),
+                        help='write metrics in the Prometheus text format to this file, every 15s and at exit')
+    args = parser.parse_args()
+    # appending to a default would add the sockets given to the environment's, rather than use them instead
+    if args.engine_sockets is None and not args.headless:
+        args.engine_sockets = [path for path in os.environ.get('GAME_ENGINE_SOCKET', '').split(',') if path] or None
+    if args.engine_sockets and args.profile:
+        parser.error('--profile profiles the engine, which runs in the workers with --engine-socket')
+    if args.engine_sockets and args.headless:
+        parser.error('--headless plays with an engine of its own, not with --engine-socket')
+    return args
 
 
 if __name__ == '__main__':
+    args = parse_args()
+    logging.basicConfig(level=logging.INFO if args.headless else logging.DEBUG)
+    logging.getLogger('discord').setLevel(logging.INFO)
+    logging.getLogger('peewee').setLevel(logging.INFO)
+    configure_db(path=args.db_path, profile=args.db_profile)
     db.connect()
-    engine = Engine(quests=diablo2.quests)
-    bot = DiscordClient(engine=engine)
+    # makes a fresh database's tables, and brings an older one's up to date
+    create_tables()
+    journal = Journal(args.journal) if args.journal else None
+    sessions = SessionManager(quests=load_quests(args.content), journal=journal)
+    # with engine workers these sessions' engines sit idle, so their quests would always read as none. the workers
+    # report the real ones
+    if not args.engine_sockets:
+        metrics.track_sessions(sessions)
+    # with engine workers the quests are theirs to reload
+    reloader = ContentReloader(args.content, sessions) if args.reload and not args.engine_sockets else None
+    if args.headless:
+        from game.console import ConsoleClient
+        client = ConsoleClient(sessions=sessions, profile=args.profile, reloader=reloader)
+    else:
+        # discord.py is slow to import, so only the bot pays for it
+        from game.ext.discord_client import DiscordClient
+        from game.gateway import Gateway, SocketConnection
+        servers = None if args.all_servers else (args.servers or [DiscordClient.SERVER_NAME])
+        gateway = Gateway([SocketConnection(path) for path in args.engine_sockets]) if args.engine_sockets else None
+        client = DiscordClient(sessions=sessions, servers=servers,
+                               queue_size=args.queue_size, queue_policy=OverflowPolicy(args.queue_policy),
+                               profile=args.profile, reloader=reloader, gateway=gateway)
+        metrics.track_ingest(client.ingest)
+    metrics_server = metrics.serve(int(args.metrics_port)) if args.metrics_port else None
+    metrics_dump = metrics.dump_every(args.metrics_file) if args.metrics_file else None
     try:
-        bot.run(os.environ.get('BOT_TOKEN'), reconnect=True)
+        if args.headless:
+            asyncio.run(client.play(args.hero))
+        else:
+            client.run(os.environ.get('BOT_TOKEN'), reconnect=True)
     except KeyboardInterrupt:
-        db.close()
         print('Done!')
+    finally:
+        # the pending hero writes belong to the engine thread, finish them there
+        Engine.executor.submit(sessions.flush).result()
+        Engine.executor.shutdown()
+        if journal:
+            journal.close()
+        if metrics_server:
+            metrics_server.shutdown()
+        if metrics_dump:
+            metrics_dump.set()
+            metrics.REGISTRY.dump(args.metrics_file)
+        db.close()
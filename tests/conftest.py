@@ -0,0 +1,14 @@
+import pytest
+
+from game.database import db, configure_db, create_tables, Game, Hero
+
+
+@pytest.fixture(autouse=True)
+def memory_db():
+    """A shared in-memory database, emptied after each test."""
+    configure_db(profile='memory')
+    db.connect(reuse_if_open=True)
+    create_tables()
+    yield db
+    Hero.delete().execute()
+    Game.delete().execute()
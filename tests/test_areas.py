@@ -0,0 +1,46 @@
+import random
+from collections import Counter
+
+from game.areas import Area, AreaDefinition
+from game.enemy import EnemyTemplate
+
+ZOMBIE = EnemyTemplate('Zombie', hp=5, xp=10)
+FALLEN = EnemyTemplate('Fallen', hp=3, xp=5)
+BLOOD_RAVEN = EnemyTemplate('Blood Raven', hp=50, xp=100)
+
+
+def test_enemies_spawn_by_their_weights():
+    area = Area('Burial Grounds', 10, enemies={ZOMBIE: 3, FALLEN: 1}, boss=BLOOD_RAVEN)
+    rng = random.Random(0)
+    spawned = Counter(area.spawn_random_enemy(rng).name for _ in range(20000))
+    assert set(spawned) == {'Zombie', 'Fallen'}
+    assert abs(spawned['Zombie'] / 20000 - 0.75) < 0.02
+
+
+def test_an_area_runs_out_of_enemies_before_its_boss():
+    area = Area('Burial Grounds', 4, enemies={ZOMBIE: 1}, boss=BLOOD_RAVEN)
+    met = []
+    while area.has_enemies:
+        met.append(area.next_enemy())
+    assert [enemy.name for enemy in met] == ['Zombie'] * 3
+    assert area.next_enemy() is None
+    # each one is an enemy of its own
+    met[0].hp = 0
+    assert met[1].hp == 5
+
+
+def test_a_clone_starts_full():
+    area = Area('Burial Grounds', 4, enemies={ZOMBIE: 1}, boss=BLOOD_RAVEN)
+    area.next_enemy()
+    area.boss.hp = 0
+    clone = area.clone()
+    assert clone.remaining == 3 and not clone.boss.dead
+    assert clone.weights() == area.weights() == {ZOMBIE: 1}
+    area.populate()
+    assert area.remaining == 3 and not area.boss.dead
+
+
+def test_an_area_without_enemies_only_has_its_boss():
+    area = AreaDefinition('Cold Plains', 5, boss=BLOOD_RAVEN).build()
+    assert not area.has_enemies
+    assert area.next_enemy() is None
@@ -0,0 +1,21 @@
+import json
+
+from benchmarks import __main__ as benchmarks
+from benchmarks.suite import Measurement
+
+
+def test_noisy_benchmarks_get_more_room():
+    baselines = {'steady': Measurement(100, 0.02), 'noisy': Measurement(100, 0.3), 'gone': Measurement(100, 0)}
+    results = {'steady': Measurement(130, 0.02), 'noisy': Measurement(150, 0.3), 'new': Measurement(10, 0)}
+    assert benchmarks.regressed(results, baselines, 0.25) == ['steady']
+    assert benchmarks.compare(results, baselines, 0.25) == 1
+
+
+def test_old_baselines_still_load(tmp_path, monkeypatch):
+    path = tmp_path / 'baselines.json'
+    path.write_text(json.dumps({'old': 100.0, 'new': {'ns': 50.0, 'spread': 0.1}}))
+    monkeypatch.setattr(benchmarks, 'BASELINES', str(path))
+    assert benchmarks.load_baselines() == {'old': Measurement(100.0, 0.0), 'new': Measurement(50.0, 0.1)}
+
+    benchmarks.save_baselines({'old': Measurement(90.04, 0.05)})
+    assert json.loads(path.read_text())['old'] == {'ns': 90.0, 'spread': 0.05}
@@ -0,0 +1,35 @@
+import random
+
+from game.combat import COMBAT_PROFILES, CombatProfile, CombatTable
+from game.util import ElementalDamageType
+
+
+def rates(table, damage_type, rolls=20000):
+    rng = random.Random(0)
+    results = [table.roll(damage_type, rng) for _ in range(rolls)]
+    return (sum(hit for _, hit, _ in results) / rolls, sum(crit for _, _, crit in results) / rolls,
+            {verb for verb, _, _ in results})
+
+
+def test_rolls_follow_each_profile():
+    table = CombatTable()
+    for damage_type, profile in COMBAT_PROFILES.items():
+        hit, crit, verbs = rates(table, damage_type)
+        assert abs(hit - profile.hit) < 0.02
+        assert abs(crit - profile.crit) < 0.02
+        assert verbs == set(profile.verbs)
+
+
+def test_a_quest_can_override_a_profile():
+    overrides = {ElementalDamageType.FIRE: CombatProfile(hit=0, crit=1, verbs=('fizzles at',))}
+    table = CombatTable(overrides=overrides)
+    assert table.profile(ElementalDamageType.FIRE) == overrides[ElementalDamageType.FIRE]
+    assert rates(table, ElementalDamageType.FIRE, rolls=100) == (0, 1, {'fizzles at'})
+    assert table.profile(ElementalDamageType.ICE) == COMBAT_PROFILES[ElementalDamageType.ICE]
+    assert CombatTable().profile(ElementalDamageType.FIRE) == COMBAT_PROFILES[ElementalDamageType.FIRE]
+
+
+def test_a_damage_type_without_a_profile_attacks_normally():
+    table = CombatTable({None: CombatProfile(hit=1, crit=0, verbs=('pokes',))})
+    assert table.profile(ElementalDamageType.HOLY) == table.profile(None)
+    assert table.roll(ElementalDamageType.HOLY) == ('pokes', True, False)
@@ -0,0 +1,59 @@
+import pytest
+
+from game import metrics
+from game.commands import Command, CommandRouter
+from game.events import GameEvent, GameEventType
+from game.sessions import SessionManager
+
+import diablo2
+
+
+def handler(engine, event, args):
+    return GameEvent(GameEventType.NOOP, context=args)
+
+
+def test_a_message_runs_the_longest_command_it_starts_with():
+    router = CommandRouter([Command('quest', handler), Command('quest start', handler),
+                            Command('score', handler, takes_args=True)])
+    assert router.resolve('  Quest   START ')[0].name == 'quest start'
+    assert router.resolve('quest')[0].name == 'quest'
+    assert router.resolve('score 3') == (router.resolve('score')[0], '3')
+    # quest doesn't take anything after it
+    assert router.resolve('quest stop') is None
+    assert router.resolve('dance') is None
+
+
+def test_aliases_run_the_same_command():
+    router = CommandRouter([Command('score', handler, aliases=('HIGH  Scores', 'top'), takes_args=True)])
+    assert router.resolve('high scores 2')[0].name == 'score'
+    assert router.resolve('top') == (router.resolve('score')[0], '')
+    assert 'Top' in router
+
+
+def test_re_registering_replaces_a_command_and_its_aliases():
+    router = CommandRouter([Command('score', handler, aliases=('top',))])
+    router.register(Command('score', handler, aliases=('best',)))
+    assert 'top' not in router
+    assert router.resolve('best')[0].name == 'score'
+    assert len(router) == 1
+
+
+def test_a_conflicting_alias_leaves_the_old_command_in_place():
+    router = CommandRouter([Command('score', handler, aliases=('top',)), Command('rank', handler)])
+    with pytest.raises(ValueError):
+        router.register(Command('score', handler, aliases=('rank',)))
+    assert router.resolve('score')[0].aliases == ('top',)
+    assert router.resolve('top')[0].name == 'score'
+    assert router.resolve('rank')[0].name == 'rank'
+
+
+def test_each_command_reports_its_latency():
+    sessions = SessionManager(quests=diablo2.quests)
+    for key in ('a', 'b'):
+        engine = sessions.open(key).engine
+        engine.commands.dispatch(engine, GameEvent(GameEventType.COMMAND, message='quest'))
+    metrics.track_sessions(sessions)
+    samples = {labels: value for _, labels, value in metrics.COMMANDS.samples()}
+    assert samples['{command="quest",stat="calls"}'] == 2
+    assert samples['{command="quest",stat="seconds"}'] > 0
+    assert samples['{command="score",stat="calls"}'] == 0
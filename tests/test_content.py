@@ -0,0 +1,88 @@
+import json
+import os
+
+import pytest
+
+from game import content
+from game.exceptions import ContentError
+
+import diablo2
+
+
+def pack():
+    return {
+        'name': 'test',
+        'enemies': {'fallen': {'name': 'Fallen', 'hp': 1, 'xp': 3, 'kind': 'fire'},
+                    'corpsefire': {'name': 'Corpsefire', 'hp': 8, 'xp': 80}},
+        'quests': [{'name': 'Den of Evil', 'xp': 300,
+                    'area': {'name': 'The Den of Evil', 'enemies': 5, 'spawns': {'fallen': 1}, 'boss': 'corpsefire'},
+                    'combat': {'normal': {'hit': 1, 'crit': 0, 'verbs': ['bonks']}}}],
+    }
+
+
+def write(directory, data, name='pack.json'):
+    path = os.path.join(directory, name)
+    with open(path, 'w') as f:
+        json.dump(data, f)
+    return path
+
+
+def test_a_pack_plays_like_the_module_it_came_from():
+    quests = content.parse(json.dumps(content.export(diablo2.quests)).encode()).quests
+    assert [str(q) for q in quests] == [str(q) for q in diablo2.quests]
+    assert [q.area.weights() for q in quests] == [q.area.weights() for q in diablo2.quests]
+    assert [q.area.boss.name for q in quests] == [q.area.boss.name for q in diablo2.quests]
+
+
+def test_every_problem_is_reported_at_once():
+    data = pack()
+    data['enemies']['fallen']['hp'] = 0
+    data['enemies']['fallen']['kind'] = 'plasma'
+    area = data['quests'][0]['area']
+    area['boss'] = 'diablo'
+    area['spawns'] = {'fallen': 1, 'zombie': 2}
+    data['quests'][0]['combat']['normal']['hit'] = 2
+    with pytest.raises(ContentError) as error:
+        content.parse(json.dumps(data).encode(), source='broken.json')
+    problems = '\n'.join(error.value.problems)
+    for path in ('enemies.fallen.hp', 'enemies.fallen.kind', 'quests[0].area.boss', 'quests[0].area.spawns.zombie',
+                 'quests[0].combat.normal.hit'):
+        assert path in problems
+    assert len(error.value.problems) == 5
+    assert content.validate(pack()) == []
+
+
+def test_invalid_json_is_a_content_error():
+    with pytest.raises(ContentError):
+        content.parse(b'{"enemies": ')
+
+
+def test_a_compiled_pack_is_cached_by_its_contents(tmp_path, monkeypatch):
+    path = write(str(tmp_path), pack())
+    first = content.load(path)
+    cached = os.listdir(tmp_path / content.CACHE_DIRECTORY)
+    assert len(cached) == 1
+
+    # the second load never parses the pack
+    monkeypatch.setattr(content, 'parse', lambda *args, **kwargs: pytest.fail('parsed a cached pack'))
+    second = content.load(path)
+    assert [str(q) for q in second.quests] == [str(q) for q in first.quests]
+    monkeypatch.undo()
+
+    # a changed pack is compiled again, and replaces the old compile
+    data = pack()
+    data['quests'][0]['name'] = 'Den of Good'
+    write(str(tmp_path), data)
+    assert str(content.load(path).quests[0]) == str(content.parse(json.dumps(data).encode()).quests[0])
+    assert len(os.listdir(tmp_path / content.CACHE_DIRECTORY)) == 1
+    assert os.listdir(tmp_path / content.CACHE_DIRECTORY) != cached
+
+
+def test_an_unreadable_cache_is_compiled_again(tmp_path):
+    path = write(str(tmp_path), pack())
+    content.load(path)
+    directory = tmp_path / content.CACHE_DIRECTORY
+    cached = directory / os.listdir(directory)[0]
+    cached.write_bytes(b'not a pickle')
+    assert content.load(path).name == 'test'
+    assert cached.read_bytes() != b'not a pickle'
@@ -0,0 +1,86 @@
+import asyncio
+
+from game.database import db, Hero, HeroWriteBehind, MAX_VARIABLES
+from game.sessions import SessionManager
+
+
+def make_heroes(count):
+    Hero.insert_many([{'name': f'Hero {i}', 'hp': 20} for i in range(count)]).execute()
+    return list(Hero.select().order_by(Hero.id))
+
+
+def test_flush_writes_every_batch():
+    # each hero with one changed field takes 3 variables, so this is just over one statement's worth
+    heroes = make_heroes(MAX_VARIABLES // 3 + 5)
+    writes = HeroWriteBehind(db, max_pending=len(heroes) + 1)
+    for i, hero in enumerate(heroes):
+        hero.xp = i + 1
+        writes.mark(hero, 'xp')
+    assert len(list(writes._batches())) == 2
+    assert writes.flush() == len(heroes)
+    assert len(writes) == 0
+    assert {hero.id: hero.xp for hero in Hero.select()} == {hero.id: i + 1 for i, hero in enumerate(heroes)}
+
+
+def test_batches_count_every_changed_field():
+    heroes = make_heroes(MAX_VARIABLES // 5 + 1)
+    writes = HeroWriteBehind(db, max_pending=len(heroes) + 1)
+    for hero in heroes:
+        hero.xp, hero.hp = 7, 3
+        writes.mark(hero, 'xp', 'hp')
+    batches = list(writes._batches())
+    assert [len(batch) for batch in batches] == [MAX_VARIABLES // 5, 1]
+    writes.flush()
+    assert Hero.select().where((Hero.xp == 7) & (Hero.hp == 3)).count() == len(heroes)
+
+
+def test_flush_waits_until_due():
+    heroes = make_heroes(3)
+    writes = HeroWriteBehind(db, max_pending=3, max_delay=60)
+    for hero in heroes[:2]:
+        hero.xp = 5
+        writes.mark(hero, 'xp')
+    assert writes.pending(heroes[0].id) is heroes[0]
+    assert Hero.select().where(Hero.xp == 5).count() == 0
+    heroes[2].xp = 5
+    writes.mark(heroes[2], 'xp')
+    assert len(writes) == 0
+    assert Hero.select().where(Hero.xp == 5).count() == 3
+
+
+def test_a_quiet_game_still_writes_its_changes():
+    sessions = SessionManager(quests=[])
+    sessions.hero_writes.max_delay = 0.05
+    hero = make_heroes(1)[0]
+    hero.xp = 9
+    sessions.hero_writes.mark(hero, 'xp')
+
+    async def wait():
+        sessions.start_flushing()
+        for _ in range(100):
+            if not sessions.hero_writes:
+                break
+            await asyncio.sleep(0.01)
+        await sessions.stop_flushing()
+
+    asyncio.run(wait())
+    assert Hero.get_by_id(hero.id).xp == 9
+
+
+def test_two_processes_add_to_the_same_hero():
+    Hero.create(name='Kashya', discord_client_id='1', hp=20, xp=100)
+    # two workers, each with heroes and pending writes of their own
+    first, second = (SessionManager(quests=[]).open('a').engine for _ in range(2))
+    mine, theirs = first.get_hero('Kashya', '1'), second.get_hero('Kashya', '1')
+    assert mine is not theirs
+    first.give_xp(mine, 10)
+    mine.hp -= 1
+    first.hero_writes.mark(mine, 'hp')
+    second.give_xp(theirs, 5)
+    first.flush()
+    second.flush()
+    first.give_xp(mine, 1)
+    first.flush()
+
+    hero = Hero.get(Hero.name == 'Kashya')
+    assert (hero.xp, hero.hp) == (116, 19)
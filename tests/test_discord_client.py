@@ -0,0 +1,41 @@
+import asyncio
+
+from benchmarks.fake_discord import FakeDiscord, FakeDiscordClient
+from game.database import Hero
+from game.sessions import SessionManager
+
+import diablo2
+
+
+def test_a_guild_is_played_in_from_when_the_bot_joins_until_it_leaves():
+    discord = FakeDiscord(latency=0, send_limit=None, reaction_limit=None)
+
+    async def play():
+        client = FakeDiscordClient(discord, servers=None, sessions=SessionManager(quests=diablo2.quests))
+        await client.start_offline()
+        guild = discord.guild('Guild 1', heroes=3)
+        await client.on_guild_join(guild)
+        key = client.session_key(guild)
+        joined = key in client.sessions, client.sessions.route(guild.town.id) is not None
+        await client.on_guild_remove(guild)
+        left = key in client.sessions, client.sessions.route(guild.town.id) is not None
+        await client.close()
+        return joined, left
+
+    assert asyncio.run(play()) == ((True, True), (False, False))
+    assert Hero.select().count() == 3
+
+
+def test_only_the_servers_to_play_in_are_joined():
+    discord = FakeDiscord(latency=0, send_limit=None, reaction_limit=None)
+
+    async def play():
+        client = FakeDiscordClient(discord, servers=['Somewhere else'], sessions=SessionManager(quests=diablo2.quests))
+        await client.start_offline()
+        guild = discord.guild('Guild 1', heroes=3)
+        await client.on_guild_join(guild)
+        await client.on_guild_remove(guild)
+        await client.close()
+        return client.session_key(guild) in client.sessions
+
+    assert not asyncio.run(play())
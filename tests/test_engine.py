@@ -0,0 +1,36 @@
+from game.database import Hero
+from game.engine import Engine
+from game.sessions import SessionManager
+
+
+def test_a_roster_loads_each_hero_once():
+    Hero.create(name='Kashya', discord_client_id='1', hp=20, xp=30)
+    Hero.create(name='Charsi', discord_client_id='2', hp=20, xp=10)
+    Hero.create(name='Gheed', discord_client_id='99', hp=20)
+    sessions = SessionManager(quests=[])
+    engine = sessions.open('a').engine
+    known = engine.get_hero('Charsi', discord_client_id='2')
+
+    # Kashya has been renamed on Discord, Akara and Warriv are new, and someone else now goes by Gheed
+    roster = [('Kashya the Rogue', '1'), ('Charsi', '2'), ('Akara', '3'), ('Warriv', '4'), ('Gheed', '5')]
+    heroes = engine.get_heroes(roster)
+
+    assert sorted(heroes) == ['1', '2', '3', '4']
+    assert heroes['1'].xp == 30
+    assert heroes['2'] is known
+    assert Hero.select().count() == 5
+    assert Hero.select().where(Hero.discord_client_id == '1').count() == 1
+
+    # another session, and loading the roster again, hand out the same instances
+    again = sessions.open('b').engine.get_heroes(roster)
+    assert all(again[i] is heroes[i] for i in heroes)
+    assert Hero.select().count() == 5
+    assert engine.get_hero('Akara', discord_client_id='3') is heroes['3']
+
+
+def test_a_roster_sees_pending_writes():
+    engine = Engine(quests=[])
+    hero = engine.get_hero('Akara', discord_client_id='3')
+    engine.hero_map.clear()
+    engine.give_xp(hero, 25)
+    assert engine.get_heroes([('Akara', '3')])['3'] is hero
@@ -0,0 +1,51 @@
+import asyncio
+import os
+
+import pytest
+
+from game import wire
+from game.gateway import SocketConnection
+
+
+async def answer_once(reader, writer):
+    """A worker that answers one request, then goes away."""
+    request = await wire.read_frame(reader)
+    writer.write(wire.pack([request[0], request[3]]))
+    await writer.drain()
+    writer.close()
+
+
+def test_a_lost_worker_is_reconnected_to(tmp_path):
+    path = str(tmp_path / 'worker.sock')
+
+    async def play():
+        server = await asyncio.start_unix_server(answer_once, path)
+        connection = SocketConnection(path, max_backoff=0.05)
+        await connection.connect()
+        first = await connection.request('roster', 'a', 1)
+        # the worker hangs up after every request
+        await asyncio.sleep(0.05)
+        assert not connection.connected
+        second = await connection.request('roster', 'a', 2)
+        await connection.close()
+        server.close()
+        return first, second
+
+    assert asyncio.run(play()) == ([0, 1], [1, 2])
+
+
+def test_a_worker_that_stays_away_fails_requests(tmp_path):
+    path = str(tmp_path / 'worker.sock')
+
+    async def play():
+        server = await asyncio.start_unix_server(answer_once, path)
+        connection = SocketConnection(path, max_backoff=0.05, give_up_after=0.2)
+        await connection.connect()
+        await connection.request('roster', 'a', 1)
+        server.close()
+        await server.wait_closed()
+        os.remove(path)
+        with pytest.raises(ConnectionError):
+            await connection.request('roster', 'a', 2)
+
+    asyncio.run(play())
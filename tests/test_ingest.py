@@ -0,0 +1,108 @@
+import asyncio
+
+from game.events import GameEventType, HeroEvent
+from game.ingest import IngestQueue, OverflowPolicy
+from game.objects import Location
+from game.wire import HeroView
+
+
+def search(name):
+    return HeroEvent(GameEventType.SEARCH, hero=HeroView(name), message=name, location=Location.WILDERNESS)
+
+
+def command(name, text):
+    return HeroEvent(GameEventType.COMMAND, hero=HeroView(name), message=text, location=Location.TOWN)
+
+
+def fill(policy, events, maxsize=2):
+    """ Put events in a queue with no workers running, then let it drain.
+
+    Returns:
+        the queue, what `put()` returned for each event, and the messages of the events handled in order
+    """
+    handled = []
+
+    async def handle(event, session):
+        handled.append(event.message)
+
+    async def run():
+        queue = IngestQueue(handle, maxsize=maxsize, policy=policy, workers=1)
+        queued = [await queue.put(event) for event in events]
+        waiting = len(queue)
+        queue.start()
+        while queue.handled < waiting:
+            await asyncio.sleep(0)
+        await queue.stop()
+        return queue, queued
+
+    queue, queued = asyncio.run(run())
+    return queue, queued, handled
+
+
+def test_drop_newest():
+    queue, queued, handled = fill(OverflowPolicy.DROP_NEWEST, [search('a'), search('b'), search('c')])
+    assert queued == [True, True, False]
+    assert handled == ['a', 'b']
+    assert queue.stats()['dropped'] == 1
+
+
+def test_drop_oldest():
+    queue, queued, handled = fill(OverflowPolicy.DROP_OLDEST, [search('a'), search('b'), search('c')])
+    assert queued == [True, True, True]
+    assert handled == ['b', 'c']
+    assert queue.stats()['dropped'] == 1
+
+
+def test_merge_search():
+    events = [search('a'), command('b', 'rank'), search('a'), command('c', 'score')]
+    queue, queued, handled = fill(OverflowPolicy.MERGE_SEARCH, events)
+    # a's second search is merged into the first, c's command has to drop the oldest
+    assert queued == [True, True, False, True]
+    assert handled == ['rank', 'score']
+    stats = queue.stats()
+    assert (stats['merged'], stats['dropped'], stats['high_water']) == (1, 1, 2)
+
+
+def test_block():
+    handled = []
+
+    async def handle(event, session):
+        handled.append(event.message)
+
+    async def run():
+        queue = IngestQueue(handle, maxsize=2, policy=OverflowPolicy.BLOCK, workers=1)
+        await queue.put(search('a'))
+        await queue.put(search('b'))
+        blocked = asyncio.create_task(queue.put(search('c')))
+        await asyncio.sleep(0.01)
+        assert not blocked.done()
+        queue.start()
+        assert await asyncio.wait_for(blocked, 1)
+        while queue.handled < 3:
+            await asyncio.sleep(0)
+        await queue.stop()
+        return queue
+
+    queue = asyncio.run(run())
+    assert handled == ['a', 'b', 'c']
+    assert queue.stats()['dropped'] == 0
+
+
+def test_a_sessions_events_keep_their_order():
+    handled = []
+
+    async def handle(event, session):
+        await asyncio.sleep(0.01 if event.message == 'a1' else 0)
+        handled.append(event.message)
+
+    async def run():
+        queue = IngestQueue(handle, maxsize=10, workers=4)
+        queue.start()
+        for message, session in [('a1', 'a'), ('a2', 'a'), ('b1', 'b')]:
+            await queue.put(search(message), session)
+        while queue.handled < 3:
+            await asyncio.sleep(0.001)
+        await queue.stop()
+
+    asyncio.run(run())
+    assert handled == ['b1', 'a1', 'a2']
@@ -0,0 +1,33 @@
+import random
+
+from game.content import load_quests
+from game.database import Game, Hero
+from game.events import GameEvent, GameEventType, HeroEvent
+from game.journal import Journal, read, replay
+from game.sessions import SessionManager
+
+
+def test_a_run_replays_on_a_database_with_other_heroes(tmp_path):
+    quests = load_quests('diablo2')
+    Hero.create(name='Kashya', discord_client_id='1', hp=0, xp=120)
+    Hero.create(name='Charsi', discord_client_id='2', hp=3, xp=45)
+    journal = Journal(str(tmp_path))
+    sessions = SessionManager(quests=quests, journal=journal)
+    engine = sessions.open('a').engine
+    heroes = [engine.get_hero('Kashya', '1'), engine.get_hero('Charsi', '2'), engine.get_hero('Akara', '3')]
+    engine.process_event(GameEvent(GameEventType.COMMAND, message='quest'))
+    dice = random.Random(3)
+    for _ in range(200):
+        kind = dice.choice([GameEventType.SEARCH, GameEventType.FIGHT])
+        engine.process_event(HeroEvent(kind, hero=dice.choice(heroes)))
+    sessions.flush()
+    journal.close()
+
+    # replayed somewhere that has never heard of these heroes
+    Hero.delete().execute()
+    Game.delete().execute()
+    report = replay((read(files) for files in Journal.runs([str(tmp_path)])), quests)
+
+    assert report['replayed'] == 201
+    assert report['mismatches'] == []
+    assert Hero.get(Hero.name == 'Kashya').xp >= 120
@@ -0,0 +1,43 @@
+import random
+
+from game.database import Hero
+from game.engine import Engine
+from game.leaderboard import Leaderboard
+
+
+def make_heroes(xps):
+    Hero.insert_many([{'name': f'Hero {i}', 'hp': 20, 'xp': xp} for i, xp in enumerate(xps)]).execute()
+    return list(Hero.select().order_by(Hero.id))
+
+
+def test_matches_the_database_as_xp_changes():
+    heroes = make_heroes(random.Random(0).choices(range(0, 50), k=200))
+    leaderboard = Leaderboard()
+    leaderboard.load()
+    changes = random.Random(1)
+    for _ in range(300):
+        hero = changes.choice(heroes)
+        hero.xp = max(0, hero.xp + changes.randint(-20, 20))
+        hero.save()
+        leaderboard.update(hero)
+    for offset in (0, 10, 190):
+        assert leaderboard.top(10, offset) == Leaderboard.query_top(10, offset)
+    for hero in heroes:
+        assert leaderboard.rank(hero) == Leaderboard.query_rank(hero)
+
+
+def test_ties_share_a_rank_and_are_listed_by_name():
+    b, a, c, nobody = make_heroes([10, 10, 5, 0])
+    a.name, b.name = 'Akara', 'Blacksmith'
+    a.save(), b.save()
+    leaderboard = Leaderboard()
+    assert leaderboard.top() == [(1, 'Akara', 10), (2, 'Blacksmith', 10), (3, c.name, 5)]
+    assert [leaderboard.rank(hero) for hero in (a, b, c, nobody)] == [1, 1, 3, None]
+
+
+def test_score_includes_xp_not_written_yet():
+    engine = Engine(quests=[])
+    hero = engine.get_hero('Wirt')
+    engine.give_xp(hero, 40)
+    assert engine.score().context == [(1, 'Wirt', 40)]
+    assert engine.rank(hero).context == (1, 40)
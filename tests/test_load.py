@@ -0,0 +1,14 @@
+from benchmarks import load
+
+
+def test_a_run_that_keeps_up_exits_cleanly(capsys):
+    assert load.main(['--seconds', '0.5', '--rate', '20', '--heroes', '20', '--drain', '10', '--latency', '0',
+                      '--send-limit', 'none', '--reaction-limit', 'none']) == 0
+    assert 'saturated' not in capsys.readouterr().out
+
+
+def test_an_unfinished_run_exits_with_1(capsys):
+    assert load.main(['--seconds', '1', '--rate', '60', '--heroes', '20', '--drain', '0']) == 1
+    out = capsys.readouterr().out
+    assert 'saturated' in out
+    assert 'still waiting' in out
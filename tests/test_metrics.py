@@ -0,0 +1,31 @@
+import pytest
+
+from game.metrics import Counter, Gauge, Histogram, Metric, Registry
+
+
+def test_a_registry_renders_every_metric():
+    registry = Registry()
+    events = registry.counter('events_total', 'Events.', labels=('type',))
+    depth = registry.gauge('depth', 'Depth.')
+    seconds = registry.histogram('seconds', 'Seconds.', buckets=(0.1, 1))
+    events.inc('fight')
+    events.inc('fight', amount=2)
+    depth.track(lambda: {(): 4})
+    for value in (0.05, 0.5, 5):
+        seconds.observe(value)
+    assert registry.render().splitlines() == [
+        '# HELP events_total Events.', '# TYPE events_total counter', 'events_total{type="fight"} 3',
+        '# HELP depth Depth.', '# TYPE depth gauge', 'depth 4',
+        '# HELP seconds Seconds.', '# TYPE seconds histogram',
+        'seconds_bucket{le="0.1"} 1', 'seconds_bucket{le="1"} 2', 'seconds_bucket{le="+Inf"} 3',
+        'seconds_sum 5.55', 'seconds_count 3',
+    ]
+
+
+def test_a_metric_has_to_say_what_its_samples_are():
+    class Unfinished(Metric):
+        pass
+
+    with pytest.raises(TypeError):
+        Unfinished('unfinished', 'Never gets samples.')
+    assert all(issubclass(kind, Metric) for kind in (Counter, Gauge, Histogram))
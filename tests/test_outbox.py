@@ -0,0 +1,52 @@
+from discord import Embed
+
+from game.ext.discord_client import Outbox
+
+
+def test_lines_for_a_channel_are_one_message():
+    outbox = Outbox()
+    outbox.say('town', 'one')
+    outbox.say('wilderness', 'two')
+    outbox.say('town', 'three')
+    assert list(outbox.messages()) == [('town', 'one\nthree', []), ('wilderness', 'two', [])]
+
+
+def test_text_after_an_embed_is_said_after_it():
+    first, second = Embed(title='first'), Embed(title='second')
+    outbox = Outbox()
+    outbox.say('town', 'before')
+    outbox.say('town', embed=first)
+    outbox.say('town', 'after', embed=second)
+    outbox.say('town', 'last')
+    assert list(outbox.messages()) == [('town', 'before', [first]), ('town', 'after', [second]),
+                                       ('town', 'last', [])]
+
+
+def test_long_text_is_split_at_the_limit():
+    outbox = Outbox()
+    outbox.say('town', 'a' * (Outbox.MAX_CONTENT - 30))
+    outbox.say('town', 'b' * 20)
+    outbox.say('town', 'c' * 20)
+    outbox.say('town', 'd' * (Outbox.MAX_CONTENT + 5))
+    contents = [content for _, content, _ in outbox.messages()]
+    assert contents == ['a' * (Outbox.MAX_CONTENT - 30) + '\n' + 'b' * 20, 'c' * 20, 'd' * Outbox.MAX_CONTENT,
+                        'd' * 5]
+    assert all(len(content) <= Outbox.MAX_CONTENT for content in contents)
+
+
+def test_embeds_are_split_at_the_limit_and_ride_with_the_last_text():
+    embeds = [Embed(title=str(i)) for i in range(Outbox.MAX_EMBEDS + 3)]
+    outbox = Outbox()
+    outbox.say('town', 'x' * (Outbox.MAX_CONTENT + 1))
+    for embed in embeds:
+        outbox.say('town', embed=embed)
+    assert list(outbox.messages()) == [('town', 'x' * Outbox.MAX_CONTENT, []),
+                                       ('town', 'x', embeds[:Outbox.MAX_EMBEDS]),
+                                       ('town', None, embeds[Outbox.MAX_EMBEDS:])]
+
+
+def test_each_reaction_is_sent_once():
+    outbox = Outbox()
+    for emoji in ['a', 'b', 'a']:
+        outbox.react('message', emoji)
+    assert outbox.reactions == {'message': ['a', 'b']}
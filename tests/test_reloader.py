@@ -0,0 +1,76 @@
+import asyncio
+import itertools
+import json
+import os
+
+from game import content
+from game.reloader import ContentReloader
+from game.sessions import SessionManager
+
+import diablo2
+
+
+# seconds to push each write's modification time on by, so it's later than the last however coarse the clock is
+_later = itertools.count(1)
+
+
+def write(path, pack):
+    with open(path, 'w') as f:
+        json.dump(pack, f)
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9 * next(_later)))
+
+
+def setup(tmp_path):
+    path = str(tmp_path / 'pack.json')
+    pack = content.export(diablo2.quests, name='pack')
+    write(path, pack)
+    sessions = SessionManager(quests=content.load(path).quests)
+    engine = sessions.open('a').engine
+    engine.start_quest()
+    return path, pack, sessions, engine
+
+
+def test_a_changed_pack_is_swapped_in_between_quests(tmp_path):
+    path, pack, sessions, engine = setup(tmp_path)
+    playing = engine.current_quest
+    pack['quests'][0]['name'] = 'Den of Good'
+    write(path, pack)
+
+    assert asyncio.run(ContentReloader(path, sessions).reload())
+    assert engine.current_quest is playing
+    assert engine.quests[0].name == sessions.quests[0].name == 'Den of Good'
+    assert sessions.open('b').engine.quests is sessions.quests
+
+
+def test_content_that_cant_replace_the_old_is_refused(tmp_path):
+    path, pack, sessions, engine = setup(tmp_path)
+    quests = sessions.quests
+    reloader = ContentReloader(path, sessions)
+
+    removed = dict(pack, quests=pack['quests'][:-1])
+    write(path, removed)
+    assert not asyncio.run(reloader.reload())
+    with open(path, 'w') as f:
+        f.write('{"quests": [')
+    assert not asyncio.run(reloader.reload())
+    assert engine.quests is sessions.quests is quests
+
+
+def test_the_watcher_reloads_once_a_change_settles(tmp_path):
+    path, pack, sessions, engine = setup(tmp_path)
+    reloader = ContentReloader(path, sessions, interval=0.01)
+
+    async def run():
+        reloader.start()
+        pack['quests'].append(dict(pack['quests'][0], name='The Cow Level'))
+        write(path, pack)
+        for _ in range(500):
+            if reloader.reloads:
+                break
+            await asyncio.sleep(0.01)
+        await reloader.stop()
+
+    asyncio.run(run())
+    assert reloader.reloads == 1
+    assert engine.quests[-1].name == 'The Cow Level'
@@ -0,0 +1,95 @@
+import asyncio
+import json
+
+from game import wire
+from game.database import Game, Hero
+from game.events import GameEventType, HeroEvent
+from game.gateway import Gateway, InProcessConnection
+from game.objects import Location
+from game.sessions import SessionManager
+from game.util import ElementalDamageType
+from game.worker import EngineWorker
+
+import diablo2
+
+
+def play(hero):
+    """A quest started, fought through with searches and elements, and then asked about in town."""
+    yield HeroEvent(GameEventType.COMMAND, hero=hero, message='quest start', location=Location.TOWN)
+    for i in range(300):
+        augment = list(ElementalDamageType)[i % len(ElementalDamageType)] if i % 3 == 0 else None
+        yield HeroEvent(GameEventType.SEARCH, hero=hero, message='attack', augment=augment,
+                        location=Location.WILDERNESS)
+    for command in ['quest', 'score', 'rank', 'help']:
+        yield HeroEvent(GameEventType.COMMAND, hero=hero, message=command, location=Location.TOWN)
+
+
+def played_directly(seed):
+    sessions = SessionManager(quests=diablo2.quests)
+    engine = sessions.open('direct').engine
+    engine.random.seed(seed)
+    hero = engine.get_hero('Wirt', discord_client_id='1')
+    return [wire.encode_result(engine.process_event(event)) for event in play(hero)]
+
+
+def played_through_gateway(seed):
+    sessions = SessionManager(quests=diablo2.quests)
+    sessions.open('gateway').engine.random.seed(seed)
+    gateway = Gateway([InProcessConnection(EngineWorker(sessions))])
+
+    async def run():
+        await gateway.start()
+        try:
+            return [await gateway.process('gateway', event) for event in play(wire.HeroView('Wirt', '1'))]
+        finally:
+            await gateway.close()
+
+    return asyncio.run(run())
+
+
+def kinds(data):
+    """The types of result in an encoded result, and in the results it's made of."""
+    if data is None:
+        return set()
+    return {data['t']}.union(*(kinds(e) for e in data.get('e', [])))
+
+
+def forget_heroes():
+    Hero.delete().execute()
+    Game.delete().execute()
+
+
+def test_decoding_then_encoding_gives_the_same_result():
+    for data in played_directly(seed=1):
+        data = json.loads(json.dumps(data))
+        assert wire.encode_result(wire.decode_result(data)) == data
+
+
+def test_gateway_results_match_the_engine():
+    expected = played_directly(seed=2)
+    forget_heroes()
+    results = played_through_gateway(seed=2)
+    assert [wire.encode_result(result) for result in results] == expected
+    assert {'FIGHT', 'ENEMY_XP', 'QUEST_COMPLETE', 'QUEST_XP'} <= set().union(*map(kinds, expected))
+
+
+def test_views_print_like_the_game_objects():
+    engine = SessionManager(quests=diablo2.quests).open('direct').engine
+    hero = engine.get_hero('Wirt', discord_client_id='1')
+    started = engine.process_event(HeroEvent(GameEventType.COMMAND, hero=hero, message='quest start',
+                                             location=Location.TOWN))
+    view = wire.decode_result(json.loads(json.dumps(wire.encode_result(started))))
+    assert isinstance(view.context, wire.QuestView)
+    assert str(view.context) == str(started.context)
+    assert view.context.area.prologue == started.context.area.prologue
+    assert str(wire.decode_result(wire.encode_result(HeroEvent(GameEventType.SEARCH, hero=hero))).hero) == str(hero)
+
+
+def test_client_context_stays_with_the_gateway():
+    engine = SessionManager(quests=diablo2.quests).open('direct').engine
+    context = object()
+    result = engine.process_event(HeroEvent(GameEventType.SEARCH, hero=engine.get_hero('Wirt'), message='attack',
+                                            location=Location.WILDERNESS, context=context))
+    data = wire.encode_result(result)
+    assert 'c' not in data['e'][0]
+    assert wire.decode_result(data, context).events[0].context is context